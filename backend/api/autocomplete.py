@@ -0,0 +1,156 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from hashlib import md5
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db.models import Count
+
+from api.cache import cached_per_process
+from recipes.models import Ingredient
+
+# символ больше любого символа в названиях, ограничивает диапазон префикса
+PREFIX_END = chr(0x10FFFF)
+# разделитель названий в общей строке для поиска подстроки
+SEPARATOR = '\n'
+
+# лёгкая замена модели для сериализатора ответа
+IngredientEntry = namedtuple('IngredientEntry', 'id name measurement_unit')
+
+
+def normalize(value):
+    """Приводит строку к виду для поиска: регистр, ё -> е, пробелы."""
+    return ' '.join(value.casefold().replace('ё', 'е').split())
+
+
+class IngredientIndex:
+    """
+    Индекс названий ингредиентов для автодополнения.
+
+    Нормализованные названия хранятся отсортированным списком:
+    совпадения по префиксу находятся бинарным поиском, по подстроке -
+    поиском в одной строке из всех названий. Ингредиенты и частота
+    их использования в рецептах лежат в параллельных массивах.
+
+    Частота нужна только для порядка подсказок, поэтому она
+    пересчитывается отдельно от названий, не чаще раза
+    в INGREDIENT_USAGE_TIMEOUT секунд.
+    """
+
+    def __init__(self, rows, usage, version=None):
+        rows = sorted(
+            (normalize(name), pk, name, unit) for pk, name, unit in rows
+        )
+        self.version = version
+        self.keys = [key for key, *_ in rows]
+        self.entries = [IngredientEntry(*row) for _, *row in rows]
+        self.set_usage(usage)
+        self.text = SEPARATOR.join(self.keys)
+        self.offsets = array('q')
+        offset = 0
+        for key in self.keys:
+            self.offsets.append(offset)
+            offset += len(key) + len(SEPARATOR)
+
+    @classmethod
+    def from_db(cls, version=None):
+        rows = Ingredient.objects.order_by().values_list(
+            'pk', 'name', 'measurement_unit'
+        )
+        return cls(rows, load_usage(), version)
+
+    def set_usage(self, usage):
+        """
+        Заменяет частоты целиком: параллельные запросы видят либо
+        старый, либо новый массив.
+        """
+        self.usage = array(
+            'q', (usage.get(entry.id, 0) for entry in self.entries)
+        )
+        # одинаков во всех процессах с одинаковыми частотами
+        self.usage_digest = md5(self.usage.tobytes()).hexdigest()
+        self.usage_loaded_at = monotonic()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix_positions(self, query):
+        start = bisect_left(self.keys, query)
+        end = bisect_right(self.keys, query + PREFIX_END, lo=start)
+        return range(start, end)
+
+    def substring_positions(self, query):
+        positions = set()
+        find = self.text.find
+        found = find(query)
+        while found != -1:
+            position = bisect_right(self.offsets, found) - 1
+            positions.add(position)
+            # следующее название начинается после разделителя
+            if position + 1 < len(self.offsets):
+                found = find(query, self.offsets[position + 1])
+            else:
+                found = -1
+        return positions
+
+    def rank(self, positions):
+        usage = self.usage
+        return sorted(
+            positions,
+            key=lambda position: (-usage[position], self.keys[position]),
+        )
+
+    def search(self, query, limit=None):
+        """
+        Возвращает ингредиенты, название которых содержит query:
+        сначала совпавшие по префиксу, затем по подстроке,
+        внутри группы - по частоте использования в рецептах.
+        """
+        query = normalize(query)
+        prefix = self.prefix_positions(query)
+        substring = self.substring_positions(query).difference(prefix)
+        positions = self.rank(prefix) + self.rank(substring)
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.entries[position] for position in positions]
+
+
+def load_usage():
+    """Возвращает {id ингредиента: число рецептов с ним}."""
+    return dict(
+        Ingredient.objects.annotate(
+            usage=Count('recipes')
+        ).filter(usage__gt=0).values_list('pk', 'usage')
+    )
+
+
+@cached_per_process('ingredients')
+def get_ingredient_names_index(version):
+    """
+    Возвращает индекс ингредиентов процесса, перестраивая его
+    при смене версии кэша ингредиентов.
+    """
+    return IngredientIndex.from_db(version)
+
+
+usage_lock = Lock()
+
+
+def get_ingredient_index():
+    """
+    Возвращает индекс ингредиентов процесса с частотами не старше
+    INGREDIENT_USAGE_TIMEOUT секунд. Пока один поток пересчитывает
+    частоты, остальные ищут по прежним.
+    """
+    index = get_ingredient_names_index()
+    age = monotonic() - index.usage_loaded_at
+    if age >= settings.INGREDIENT_USAGE_TIMEOUT and usage_lock.acquire(
+        blocking=False
+    ):
+        try:
+            index.set_usage(load_usage())
+        finally:
+            usage_lock.release()
+    return index
@@ -0,0 +1,185 @@
+from functools import wraps
+from hashlib import md5
+from threading import Lock, local
+from time import time_ns
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.models import CacheVersion
+
+VERSION_KEY = 'api:{namespace}:version'
+RESPONSE_KEY = 'api:{namespace}:{version}:{digest}'
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+# пространства имён, версии которых сменятся после фиксации транзакции
+pending_bumps = local()
+
+
+def get_namespace_version(namespace):
+    """
+    Возвращает текущую версию пространства имён кэша. Версия хранится
+    в БД и кэшируется на CACHE_VERSION_TIMEOUT секунд: изменения
+    из других процессов видны не позже этого срока и при кэше,
+    не разделяемом между процессами.
+    """
+    key = VERSION_KEY.format(namespace=namespace)
+    version = cache.get(key)
+    if version is None:
+        version = CacheVersion.objects.get_or_create(
+            namespace=namespace, defaults={'version': time_ns()}
+        )[0].version
+        cache.set(key, version, settings.CACHE_VERSION_TIMEOUT)
+    return version
+
+
+def bump_namespace_version(*namespaces):
+    """
+    Инвалидирует кэш пространств имён, меняя их версию в БД и в кэше.
+    Старые записи перестают читаться и вытесняются по таймауту.
+    """
+    version = time_ns()
+    updated = CacheVersion.objects.filter(
+        namespace__in=namespaces
+    ).update(version=version)
+    if updated < len(set(namespaces)):
+        CacheVersion.objects.bulk_create(
+            (
+                CacheVersion(namespace=namespace, version=version)
+                for namespace in namespaces
+            ),
+            ignore_conflicts=True,
+        )
+    cache.set_many(
+        {
+            VERSION_KEY.format(namespace=namespace): version
+            for namespace in namespaces
+        },
+        settings.CACHE_VERSION_TIMEOUT,
+    )
+
+
+def bump_pending_versions():
+    namespaces = getattr(pending_bumps, 'namespaces', set())
+    pending_bumps.namespaces = set()
+    if namespaces:
+        bump_namespace_version(*sorted(namespaces))
+
+
+def bump_namespace_version_on_commit(*namespaces):
+    """
+    Меняет версии пространств имён после фиксации текущей транзакции:
+    иначе параллельный запрос успеет закэшировать под новой версией
+    данные до изменения, а строка версии останется заблокированной
+    до конца транзакции. Все вызовы за транзакцию дают одну смену версий.
+    """
+    if not hasattr(pending_bumps, 'namespaces'):
+        pending_bumps.namespaces = set()
+    pending_bumps.namespaces.update(namespaces)
+    transaction.on_commit(bump_pending_versions)
+
+
+def cached_per_process(*namespaces):
+    """
+    Кэширует результат функции в памяти процесса до смены версий
+    пространств имён кэша. Функция получает кортеж этих версий.
+    Изменения из других процессов сбрасывают результат не позже
+    чем через CACHE_VERSION_TIMEOUT секунд.
+    """
+
+    def decorator(func):
+        state = {}
+        lock = Lock()
+
+        @wraps(func)
+        def wrapper():
+            version = tuple(
+                get_namespace_version(namespace) for namespace in namespaces
+            )
+            cached = state.get('value')
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            with lock:
+                cached = state.get('value')
+                if cached is None or cached[0] != version:
+                    cached = state['value'] = (version, func(version))
+            return cached[1]
+
+        return wrapper
+
+    return decorator
+
+
+class AnonymousCacheMixin:
+    """
+    Кэширует ответы list и retrieve для неавторизованных пользователей.
+
+    Ключ строится из адреса и нормализованной строки запроса;
+    запросы с параметрами вне cache_query_params не кэшируются.
+    Вместе с данными сохраняются заголовки ETag и Last-Modified,
+    чтобы отвечать 304 из кэша.
+    """
+
+    cache_namespace = None
+    cache_query_params = ()
+
+    def get_response_cache_key(self, request):
+        params = request.query_params
+        if not set(params) <= set(self.cache_query_params):
+            return None
+        query = urlencode(sorted({
+            (name, value)
+            for name in params
+            for value in params.getlist(name)
+        }))
+        digest = md5(
+            f'{request.build_absolute_uri(request.path)}?{query}'.encode()
+        ).hexdigest()
+        return RESPONSE_KEY.format(
+            namespace=self.cache_namespace,
+            version=get_namespace_version(self.cache_namespace),
+            digest=digest,
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated or not settings.API_CACHE_TIMEOUT:
+            return handler(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            return get_conditional_response(
+                request._request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    headers.get('Last-Modified')
+                ),
+                response=Response(data, headers=headers),
+            )
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {
+                header: response[header]
+                for header in VALIDATOR_HEADERS
+                if header in response
+            }
+            cache.set(
+                key, (response.data, headers), settings.API_CACHE_TIMEOUT
+            )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
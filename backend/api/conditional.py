@@ -0,0 +1,147 @@
+from functools import partial
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+
+from api.cache import get_namespace_version
+
+
+def set_validators(response, etag, last_modified):
+    """Добавляет к ответу заголовки ETag и Last-Modified."""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def get_not_modified_response(request, etag, last_modified):
+    """
+    Возвращает ответ 304 (или 412 для If-Match), если условные
+    заголовки запроса совпали с валидаторами, иначе None.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        return None
+    return set_validators(response, etag, last_modified)
+
+
+class ConditionalGetMixin:
+    """
+    Добавляет к ответам list и retrieve валидаторы ETag и Last-Modified
+    и отвечает 304 на условные запросы.
+
+    Валидаторы вычисляются одним агрегирующим запросом по отфильтрованной
+    выборке: количество строк и дата последнего изменения.
+    Тело ответа для этого не сериализуется. Результат кэшируется
+    до смены версий пространств имён кэша вьюсета.
+    """
+
+    def get_validators_base_queryset(self):
+        """Выборка для валидаторов до фильтрации."""
+        return self.get_queryset()
+
+    def get_validators_queryset(self):
+        queryset = self.filter_queryset(
+            self.get_validators_base_queryset()
+        ).order_by()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        return queryset
+
+    def get_validator_aggregates(self):
+        return {
+            'count': Count('pk'),
+            'last_modified': Max('updated_at'),
+        }
+
+    def get_validators_cache_namespaces(self):
+        """
+        Пространства имён, смена версий которых меняет состояние выборки;
+        без них состояние не кэшируется.
+        """
+        namespace = getattr(self, 'cache_namespace', None)
+        return (namespace,) if namespace else ()
+
+    def get_validators_versions(self):
+        return [
+            (namespace, get_namespace_version(namespace))
+            for namespace in self.get_validators_cache_namespaces()
+        ]
+
+    def compute_validators_state(self, queryset):
+        return queryset.aggregate(**self.get_validator_aggregates())
+
+    def get_validators_state(self):
+        """
+        Возвращает состояние выборки, от которого зависит ответ.
+        Состояние кэшируется, как количество в режиме cached пагинатора.
+        """
+        queryset = self.get_validators_queryset()
+        namespaces = self.get_validators_cache_namespaces()
+        if not namespaces:
+            return self.compute_validators_state(queryset)
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return self.compute_validators_state(queryset)
+        key = 'api:validators:' + md5(repr((
+            sql, params, sorted(self.get_validator_aggregates()),
+            self.get_validators_versions(),
+        )).encode()).hexdigest()
+        return cache.get_or_set(
+            key, partial(self.compute_validators_state, queryset),
+            settings.API_CACHE_TIMEOUT,
+        )
+
+    def get_validators(self, request):
+        """Возвращает пару (etag, last_modified) для запроса."""
+        state = self.get_validators_state()
+        last_modified = state.pop('last_modified', None)
+        query = sorted(
+            (name, value)
+            for name in request.query_params
+            for value in request.query_params.getlist(name)
+        )
+        etag = md5(repr((
+            request.path,
+            request.accepted_renderer.format,
+            query,
+            last_modified and last_modified.isoformat(),
+            sorted(state.items()),
+        )).encode()).hexdigest()
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        return quote_etag(etag), last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_not_modified_response(
+            request._request, etag, last_modified
+        )
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_validators(response, etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
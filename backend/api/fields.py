@@ -0,0 +1,135 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from core.constraints import MAX_IMAGE_PIXELS
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список ключей, объекты по которым загружаются одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            if isinstance(item, bool):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+            try:
+                pks.append(pk_field.to_python(item))
+            except DjangoValidationError:
+                child.fail('incorrect_type', data_type=type(item).__name__)
+        objects = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Ключ связанного объекта. С many=True все объекты списка
+    загружаются одним запросом, а не отдельным запросом на ключ.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class RecipeImageField(Base64ImageField):
+    """
+    Картинка рецепта: base64-строка из JSON или файл из
+    multipart/form-data. Размеры картинки проверяются по заголовку
+    файла до декодирования пикселей.
+    """
+
+    def check_dimensions(self, file):
+        too_large = serializers.ValidationError(
+            f'Картинка больше {MAX_IMAGE_PIXELS} пикселей'
+        )
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            raise too_large
+        except (UnidentifiedImageError, OSError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        finally:
+            file.seek(0)
+        if width * height > MAX_IMAGE_PIXELS:
+            raise too_large
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            self.check_dimensions(data)
+            return serializers.ImageField.to_internal_value(self, data)
+        file = super().to_internal_value(data)
+        if file is not None:
+            self.check_dimensions(file)
+        return file
+
+
+class ImportedImageField(RecipeImageField):
+    """
+    Картинка импортируемого рецепта: base64-строка или имя файла,
+    уже лежащего в хранилище. Для имени возвращается строка.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and not data.startswith('data:'):
+            try:
+                if default_storage.exists(data):
+                    return data
+            except SuspiciousFileOperation:
+                raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        return super().to_internal_value(data)
+
+
+class ImageSrcsetField(serializers.Field):
+    """
+    Уменьшенные копии изображения рецепта в виде значений srcset
+    по форматам: {"webp": "<url> 320w, <url> 640w", ...}.
+    Пока копии не готовы, отдаётся {"original": "<url>"}.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def build_url(self, storage, name):
+        url = storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return {}
+        storage = recipe.image.storage
+        variants = dict(recipe.image_variants)
+        if variants.pop('source', None) != recipe.image.name or not variants:
+            return {'original': self.build_url(storage, recipe.image.name)}
+        return {
+            name: ', '.join(
+                f'{self.build_url(storage, path)} {width}w'
+                for width, path in sorted(
+                    files.items(), key=lambda item: int(item[0])
+                )
+            )
+            for name, files in variants.items()
+        }
@@ -1,6 +1,63 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Recipe
+from api.cache import cached_per_process
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+
+# режимы фильтра по нескольким тегам
+TAGS_ANY = 'any'
+TAGS_ALL = 'all'
+
+# сортировки рецептов по предрассчитанным рейтингам
+ORDERING_CHOICES = (
+    ('popular', 'Популярные'),
+    ('trending', 'Набирающие популярность'),
+)
+
+
+@cached_per_process('tags')
+def get_tag_ids(version):
+    """Возвращает словарь слаг -> id тегов, закэшированный в процессе."""
+    return dict(Tag.objects.values_list('slug', 'id'))
+
+
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    """
+    Фильтр по слагам тегов. Слаги проверяются по закэшированному
+    набору тегов, а выборка фильтруется по их id без JOIN с тегами.
+
+    Условие - коррелированный EXISTS по таблице связей, поэтому рецепты
+    не дублируются и DISTINCT не нужен. Режим берётся из параметра
+    mode_param: any - хотя бы один из тегов, all - все теги сразу.
+    """
+
+    def __init__(self, *args, mode_param=None, **kwargs):
+        kwargs.setdefault('choices', lambda: [
+            (slug, slug) for slug in get_tag_ids()
+        ])
+        self.mode_param = mode_param
+        super().__init__(*args, **kwargs)
+
+    def get_mode(self):
+        if self.mode_param is None:
+            return TAGS_ANY
+        return self.parent.form.cleaned_data.get(self.mode_param) or TAGS_ANY
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        tag_ids = get_tag_ids()
+        ids = {tag_ids[slug] for slug in value if slug in tag_ids}
+        field = qs.model._meta.get_field(self.field_name)
+        target = field.m2m_reverse_field_name()
+        links = field.remote_field.through.objects.filter(
+            **{field.m2m_field_name(): OuterRef('pk')}
+        )
+        if self.get_mode() == TAGS_ALL:
+            for tag_id in sorted(ids):
+                qs = qs.filter(Exists(links.filter(**{target: tag_id})))
+            return qs
+        return qs.filter(Exists(links.filter(**{f'{target}__in': ids})))
 
 
 class IngredientFilter(FilterSet):
@@ -16,26 +73,68 @@ class IngredientFilter(FilterSet):
 class RecipeFilter(FilterSet):
     """Фильтрация рецептов."""
 
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    tags = TagSlugFilter(field_name='tags', mode_param='tags_mode')
+    tags_mode = filters.ChoiceFilter(
+        choices=((TAGS_ANY, 'Любой из тегов'), (TAGS_ALL, 'Все теги')),
+        method='filter_tags_mode',
     )
+    search = filters.CharFilter(method='filter_search')
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited'
     )
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    ordering = filters.ChoiceFilter(
+        choices=ORDERING_CHOICES,
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        # ordering последним: сортировка заменяет порядок поиска
+        fields = [
+            'author', 'tags', 'tags_mode', 'search', 'is_favorited',
+            'is_in_shopping_cart', 'ordering',
+        ]
 
-    def filter_is_favorited(self, queryset, name, value):
-        if value and self.request.user.is_authenticated:
-            return queryset.filter(favorites__user=self.request.user)
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск с сортировкой по релевантности;
+        при keyset-пагинации порядок остаётся по дате публикации.
+        """
+        return queryset.search(value)
+
+    def filter_tags_mode(self, queryset, name, value):
+        """Режим применяется фильтром tags."""
         return queryset
 
-    def filter_is_in_shopping_cart(self, queryset, name, value):
+    def filter_user_relation(self, queryset, model, value):
+        """
+        Рецепты, для которых у пользователя есть запись model.
+
+        Подзапрос IN, а не EXISTS: записей пользователя мало, и выборка
+        строится от них по индексу (user, recipe), а не проверкой
+        каждого рецепта. Дубликатов, как и у EXISTS, нет.
+        """
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_carts__user=self.request.user)
+            return queryset.filter(pk__in=model.objects.filter(
+                user=self.request.user
+            ).values('recipe_id'))
         return queryset
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_relation(queryset, ShoppingCart, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        Сортировка по рейтингу из RecipeScore - чтение по индексу без
+        подсчёта избранного в запросе; при keyset-пагинации порядок
+        остаётся по дате публикации.
+        """
+        return queryset.filter(score__isnull=False).order_by(
+            f'-score__{value}', '-score__recipe_id'
+        )
@@ -0,0 +1,267 @@
+import json
+from collections import namedtuple
+from functools import partial
+from itertools import islice
+
+from django.db import DatabaseError, connections, router, transaction
+from rest_framework.exceptions import ValidationError
+
+from api.cache import bump_namespace_version
+from api.serializers import RecipeImportSerializer
+from core.counters import change_counter
+from core.db import insert_rows, last_issued_pk
+from recipes.feed import schedule_fan_out
+from recipes.images import schedule_variants
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, RecipeScore,
+                            Tag)
+from recipes.similarity import refresh_signatures
+from users.models import CustomUser
+
+# ошибка строки файла импорта: номер строки и ошибки в формате DRF
+LineError = namedtuple('LineError', 'line errors')
+
+# рецепт, готовый к записи: модель без id, id тегов и (id, количество)
+PendingRecipe = namedtuple('PendingRecipe', 'line recipe tags ingredients')
+
+
+class RecipeImporter:
+    """
+    Импорт рецептов из JSON Lines, по рецепту в строке.
+
+    Строки читаются пачками по batch_size: теги и ингредиенты ищутся
+    по названиям одним запросом на пачку, рецепты, их ингредиенты и
+    теги записываются через bulk_create в отдельной транзакции.
+    Ошибочные строки попадают в errors и не мешают остальным.
+    """
+
+    def __init__(self, author, batch_size=500):
+        self.author = author
+        self.batch_size = batch_size
+        self.created = 0
+        self.errors = []
+        self.serializer = RecipeImportSerializer()
+        self.tags = None
+        # название -> {единица измерения: id}
+        self.ingredients = {}
+        # имя картинки -> импортированные рецепты с ней
+        self.images = {}
+        # импорт остановлен на строке не в кодировке UTF-8
+        self.interrupted = False
+
+    def run(self, lines):
+        numbered = enumerate(lines, start=1)
+        while True:
+            chunk = list(islice(numbered, self.batch_size))
+            if not chunk:
+                break
+            chunk, error = self.decode(chunk)
+            self.import_chunk(chunk)
+            if error is not None:
+                # неверная кодировка относится ко всему файлу,
+                # следующие строки не читаются
+                self.errors.append(error)
+                self.interrupted = True
+                break
+        self.schedule_variants()
+        return self
+
+    def decode(self, chunk):
+        """
+        Декодирует строки пачки из UTF-8. Возвращает строки до первой
+        недекодируемой и ошибку этой строки или None.
+        """
+        decoded = []
+        for line, text in chunk:
+            if isinstance(text, bytes):
+                try:
+                    text = text.decode()
+                except UnicodeDecodeError as error:
+                    return decoded, LineError(
+                        line, [f'Строка не в кодировке UTF-8: {error}']
+                    )
+            decoded.append((line, text))
+        return decoded, None
+
+    def import_chunk(self, chunk):
+        errors = []
+        self.import_lines(chunk, errors)
+        self.errors.extend(sorted(errors, key=lambda error: error.line))
+
+    def import_lines(self, chunk, errors):
+        parsed = []
+        for line, text in chunk:
+            if not text.strip():
+                continue
+            try:
+                parsed.append((line, self.parse(text)))
+            except ValidationError as error:
+                errors.append(LineError(line, error.detail))
+
+        self.load_ingredients(
+            ingredient['name']
+            for _, data in parsed
+            for ingredient in data['ingredients']
+        )
+        pending = []
+        for line, data in parsed:
+            try:
+                pending.append(self.resolve(line, data))
+            except ValidationError as error:
+                errors.append(LineError(line, error.detail))
+        if not pending:
+            return
+
+        try:
+            with transaction.atomic():
+                self.save(pending)
+        except DatabaseError as error:
+            errors.extend(
+                LineError(item.line, [str(error)]) for item in pending
+            )
+            return
+        self.created += len(pending)
+
+    def schedule_variants(self):
+        """
+        Копии картинок создаются после загрузки всех пачек, по разу
+        на картинку, чтобы не конкурировать с импортом за запись в БД.
+        """
+        for recipes in self.images.values():
+            transaction.on_commit(partial(
+                schedule_variants,
+                recipes[0],
+                [recipe.pk for recipe in recipes],
+            ))
+        self.images = {}
+
+    def parse(self, text):
+        try:
+            data = json.loads(text)
+        except ValueError as error:
+            raise ValidationError([f'Некорректный JSON: {error}'])
+        return self.serializer.run_validation(data)
+
+    def get_tags(self):
+        if self.tags is None:
+            self.tags = {}
+            for pk, name, slug in Tag.objects.values_list(
+                'pk', 'name', 'slug'
+            ):
+                self.tags[name] = self.tags[slug] = pk
+        return self.tags
+
+    def load_ingredients(self, names):
+        missing = set(names).difference(self.ingredients)
+        if not missing:
+            return
+        for name in missing:
+            self.ingredients[name] = {}
+        rows = Ingredient.objects.filter(name__in=missing).values_list(
+            'pk', 'name', 'measurement_unit'
+        )
+        for pk, name, measurement_unit in rows:
+            self.ingredients[name][measurement_unit] = pk
+
+    def get_ingredient_id(self, name, measurement_unit=None):
+        units = self.ingredients.get(name, {})
+        if measurement_unit is not None:
+            if measurement_unit not in units:
+                raise ValidationError(
+                    [f'Нет ингредиента {name} ({measurement_unit})']
+                )
+            return units[measurement_unit]
+        if not units:
+            raise ValidationError([f'Нет ингредиента {name}'])
+        if len(units) > 1:
+            raise ValidationError(
+                [f'Для ингредиента {name} нужна единица измерения']
+            )
+        return next(iter(units.values()))
+
+    def resolve(self, line, data):
+        tags = self.get_tags()
+        unknown = [tag for tag in data['tags'] if tag not in tags]
+        if unknown:
+            raise ValidationError(
+                {'tags': [f'Нет тегов: {", ".join(unknown)}']}
+            )
+        tag_ids = {tags[tag] for tag in data['tags']}
+        try:
+            ingredients = [
+                (
+                    self.get_ingredient_id(
+                        ingredient['name'], ingredient['measurement_unit']
+                    ),
+                    ingredient['amount'],
+                )
+                for ingredient in data['ingredients']
+            ]
+        except ValidationError as error:
+            raise ValidationError({'ingredients': error.detail})
+        if len({pk for pk, _ in ingredients}) != len(ingredients):
+            raise ValidationError(
+                {'ingredients': ['Требуются неповторяющиеся ингредиенты']}
+            )
+        recipe = Recipe(
+            author=self.author,
+            name=data['name'],
+            text=data['text'],
+            cooking_time=data['cooking_time'],
+        )
+        image = data['image']
+        if isinstance(image, str):
+            recipe.image = image
+        else:
+            # хранилище адресует файлы по содержимому: повторный импорт
+            # той же картинки не создаёт копию
+            recipe.image.save(image.name, image, save=False)
+        return PendingRecipe(line, recipe, tag_ids, ingredients)
+
+    def save(self, pending):
+        recipes = [item.recipe for item in pending]
+        connection = connections[router.db_for_write(Recipe)]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # без INSERT ... RETURNING id назначаются заранее,
+            # в транзакции после последнего выданного БД
+            start = last_issued_pk(Recipe) + 1
+            for pk, recipe in enumerate(recipes, start=start):
+                recipe.pk = pk
+        Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+        # строк связей на порядок больше, чем рецептов: они пишутся
+        # executemany без создания объектов моделей
+        insert_rows(
+            IngredientRecipe, ('recipe', 'ingredient', 'amount'),
+            (
+                (item.recipe.pk, ingredient_id, amount)
+                for item in pending
+                for ingredient_id, amount in item.ingredients
+            ),
+        )
+        insert_rows(
+            Recipe.tags.through, ('recipe', 'tag'),
+            (
+                (item.recipe.pk, tag_id)
+                for item in pending
+                for tag_id in sorted(item.tags)
+            ),
+        )
+        # подписи для похожих рецептов, как при сохранении через API
+        refresh_signatures(recipe.pk for recipe in recipes)
+        # bulk_create не отправляет сигналы: рейтинги, счётчик рецептов
+        # автора, версия кэша, поисковый индекс, ленты подписчиков и копии
+        # картинок обновляются импортёром
+        RecipeScore.objects.bulk_create(
+            RecipeScore(recipe=recipe) for recipe in recipes
+        )
+        change_counter(
+            CustomUser, self.author.pk, 'recipes_count', len(recipes)
+        )
+        Recipe.objects.update_search_index(recipe.pk for recipe in recipes)
+        # версия меняется после фиксации: иначе параллельный запрос
+        # успеет закэшировать под новой версией данные без пачки
+        transaction.on_commit(partial(bump_namespace_version, 'recipes'))
+        transaction.on_commit(partial(
+            schedule_fan_out, [recipe.pk for recipe in recipes]
+        ))
+        for recipe in recipes:
+            self.images.setdefault(recipe.image.name, []).append(recipe)
@@ -0,0 +1,164 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import CustomUser
+
+
+def walk_plan(node):
+    """Обходит узлы плана PostgreSQL в формате JSON."""
+    yield node
+    for child in node.get('Plans', ()):
+        yield from walk_plan(child)
+
+
+def explain_postgresql(cursor, sql):
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+    plan = cursor.fetchone()[0][0]['Plan']
+    issues = []
+    for node in walk_plan(plan):
+        if node['Node Type'] == 'Seq Scan':
+            issues.append(f'полный просмотр {node["Relation Name"]}')
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            keys = ', '.join(node.get('Sort Key', ()))
+            issues.append(f'сортировка по {keys}')
+    return issues
+
+
+def explain_sqlite(cursor, sql):
+    tables = set(connection.introspection.table_names(cursor))
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+    issues = []
+    for *_, detail in cursor.fetchall():
+        # просмотр подзапроса или поиск MATCH по FTS5 - не полный
+        # просмотр таблицы
+        words = detail.split()
+        if (
+            words[0] == 'SCAN' and words[1] in tables
+            and 'USING' not in words and 'VIRTUAL' not in words
+        ):
+            issues.append(f'полный просмотр {words[1]}')
+        elif detail.startswith('USE TEMP B-TREE'):
+            issues.append(f'сортировка: {detail}')
+    return issues
+
+
+EXPLAINERS = {
+    'postgresql': explain_postgresql,
+    'sqlite': explain_sqlite,
+}
+
+
+def measure(cursor, sql, repeat):
+    """Лучшее время выполнения запроса в миллисекундах."""
+    best = None
+    for _ in range(repeat):
+        started = perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        elapsed = (perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет GET-запросы к основным эндпоинтам API, перехватывает '
+        'их SQL и показывает планы EXPLAIN: полные просмотры таблиц и '
+        'сортировки без индекса отмечаются как замечания.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Логин или email пользователя, от имени которого '
+                 'выполняются запросы. По умолчанию - подписчик '
+                 'с наибольшим числом подписок.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Количество замеров времени каждого запроса.',
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если есть замечания.',
+        )
+
+    def handle(self, *args, user, repeat, strict, **options):
+        explain = EXPLAINERS.get(connection.vendor)
+        if explain is None:
+            raise CommandError(
+                f'EXPLAIN для {connection.vendor} не поддерживается.'
+            )
+        user = self.get_user(user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        flagged = total = 0
+        # ответы для авторизованных не кэшируются, кэш не влияет на SQL
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for url in self.get_urls():
+                with CaptureQueriesContext(connection) as context:
+                    response = client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.stdout.write(f'GET {url} -> {response.status_code}')
+                for query in context.captured_queries:
+                    sql = query['sql']
+                    if not sql.lstrip().upper().startswith('SELECT'):
+                        continue
+                    with connection.cursor() as cursor:
+                        issues = explain(cursor, sql)
+                        elapsed = measure(cursor, sql, repeat)
+                    total += 1
+                    flagged += bool(issues)
+                    self.stdout.write(f'  {elapsed:8.2f} мс  {sql[:100]}')
+                    for issue in issues:
+                        self.stdout.write(f'      ! {issue}')
+        self.stdout.write(
+            f'Запросов: {total}, с замечаниями: {flagged}'
+        )
+        if strict and flagged:
+            raise CommandError('Есть запросы с замечаниями.')
+
+    def get_user(self, login):
+        if login is not None:
+            user = CustomUser.objects.filter(
+                Q(username=login) | Q(email=login)
+            ).first()
+            if user is None:
+                raise CommandError(f'Пользователь {login} не найден.')
+            return user
+        user = CustomUser.objects.annotate(
+            subscriptions_total=Count('subscriptions')
+        ).order_by('-subscriptions_total', 'pk').first()
+        if user is None:
+            raise CommandError('Нет пользователей: сначала загрузите данные.')
+        return user
+
+    def get_urls(self):
+        urls = [
+            '/api/recipes/',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?is_in_shopping_cart=1',
+            '/api/recipes/?pagination=cursor',
+            '/api/recipes/?search=суп',
+            '/api/users/subscriptions/',
+            '/api/recipes/download_shopping_cart/',
+        ]
+        recipe = Recipe.objects.order_by('-pk').first()
+        if recipe is not None:
+            urls += [
+                f'/api/recipes/{recipe.pk}/',
+                f'/api/recipes/?author={recipe.author_id}',
+                f'/api/users/{recipe.author_id}/',
+            ]
+        tag = Tag.objects.order_by('pk').first()
+        if tag is not None:
+            urls.append(f'/api/recipes/?tags={tag.slug}')
+        return urls
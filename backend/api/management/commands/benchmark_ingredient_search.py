@@ -0,0 +1,62 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.autocomplete import IngredientIndex
+from api.filters import IngredientFilter
+from recipes.models import Ingredient
+
+QUERIES = ('а', 'мо', 'сах', 'кури', 'лук', 'соус', 'молоко', 'ябл')
+
+
+def measure(func, repeat):
+    """Возвращает среднее время вызова func в микросекундах."""
+    started = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - started) / repeat * 10 ** 6
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время поиска ингредиентов по названию через ORM '
+        '(icontains) и через индекс в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queries', nargs='*', default=QUERIES,
+            help='Строки поиска.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=100,
+            help='Количество повторов каждого запроса.',
+        )
+
+    def handle(self, *args, queries, repeat, **options):
+        if not Ingredient.objects.exists():
+            raise CommandError('Нет ингредиентов: сначала загрузите данные.')
+        started = perf_counter()
+        index = IngredientIndex.from_db()
+        self.stdout.write(
+            f'Построение индекса на {len(index)} ингредиентов: '
+            f'{(perf_counter() - started) * 1000:.1f} мс'
+        )
+        self.stdout.write(
+            f'{"запрос":<10}{"ORM, мкс":>12}{"индекс, мкс":>14}'
+            f'{"найдено ORM/индекс":>22}'
+        )
+        for query in queries:
+            def orm_search(query=query):
+                return list(IngredientFilter(
+                    {'name': query}, queryset=Ingredient.objects.all()
+                ).qs)
+
+            def index_search(query=query):
+                return index.search(query)
+
+            self.stdout.write(
+                f'{query:<10}{measure(orm_search, repeat):>12.1f}'
+                f'{measure(index_search, repeat):>14.1f}'
+                f'{len(orm_search()):>14}/{len(index_search())}'
+            )
@@ -0,0 +1,89 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from api.pantry import PantryIndex
+from core.constraints import PAGE_SIZE
+from recipes.models import Ingredient, Recipe
+
+
+def measure(func, repeat):
+    """Возвращает среднее время вызова func в миллисекундах."""
+    started = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - started) / repeat * 1000
+
+
+def match_in_db(ingredient_ids, limit):
+    """Подбор запросом: GROUP BY по строкам состава рецептов."""
+    return list(
+        Recipe.objects.annotate(
+            total=Count('ingredientes'),
+            matched=Count(
+                'ingredientes',
+                filter=Q(ingredientes__ingredient__in=ingredient_ids),
+            ),
+        ).filter(matched__gt=0).annotate(
+            coverage=Cast('matched', FloatField()) / F('total'),
+            missing=F('total') - F('matched'),
+        ).order_by('-coverage', 'missing', '-pk').values_list(
+            'pk', 'matched', 'total'
+        )[:limit]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает подбор рецептов по имеющимся ингредиентам запросом '
+        'с GROUP BY и через инвертированный индекс в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[3, 10, 30],
+            help='Количества ингредиентов в запросах.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Количество повторов каждого запроса.',
+        )
+
+    def handle(self, *args, sizes, repeat, **options):
+        ingredient_ids = list(
+            Ingredient.objects.filter(
+                recipes__isnull=False
+            ).distinct().values_list('pk', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError('Нет рецептов: сначала загрузите данные.')
+        started = perf_counter()
+        index = PantryIndex.from_db()
+        self.stdout.write(
+            f'Построение индекса на {len(index)} рецептов: '
+            f'{(perf_counter() - started) * 1000:.1f} мс'
+        )
+        self.stdout.write(
+            f'{"ингредиентов":<14}{"запрос, мс":>12}{"индекс, мс":>12}'
+            f'{"совпадает":>11}'
+        )
+        generator = random.Random(0)
+        for size in sizes:
+            query = generator.sample(
+                ingredient_ids, min(size, len(ingredient_ids))
+            )
+            in_db = match_in_db(query, PAGE_SIZE)
+            in_index = [tuple(match) for match in index.match(
+                query, PAGE_SIZE
+            )]
+            db_time = measure(lambda: match_in_db(query, PAGE_SIZE), repeat)
+            index_time = measure(
+                lambda: index.match(query, PAGE_SIZE), repeat
+            )
+            self.stdout.write(
+                f'{size:<14}{db_time:>12.1f}{index_time:>12.2f}'
+                f'{"да" if in_db == in_index else "нет":>11}'
+            )
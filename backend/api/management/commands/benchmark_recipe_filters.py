@@ -0,0 +1,98 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory
+
+from api.filters import TAGS_ALL, TAGS_ANY, RecipeFilter
+from recipes.models import Recipe, Tag
+from users.models import CustomUser
+
+PAGE_SIZE = 6
+
+
+def measure(func, repeat):
+    """Возвращает среднее время вызова func в миллисекундах."""
+    started = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - started) / repeat * 1000
+
+
+def first_page(queryset):
+    """Запросы пагинатора: количество и id первой страницы."""
+    return queryset.count(), list(
+        queryset.values_list('pk', flat=True)[:PAGE_SIZE]
+    )
+
+
+def join_by_tags(tag_ids, mode):
+    """Прежняя фильтрация: JOIN с таблицей связей и DISTINCT."""
+    queryset = Recipe.objects.all()
+    if mode == TAGS_ALL:
+        for tag_id in tag_ids:
+            queryset = queryset.filter(tags=tag_id)
+    else:
+        queryset = queryset.filter(tags__in=tag_ids)
+    return queryset.distinct()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает фильтрацию рецептов по тегам и избранному через '
+        'JOIN с DISTINCT и через подзапросы RecipeFilter.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tags', type=int, default=3,
+            help='Количество тегов в фильтре.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Количество повторов каждого запроса.',
+        )
+
+    def handle(self, *args, tags, repeat, **options):
+        tag_ids = dict(Tag.objects.values_list('slug', 'id')[:tags])
+        user = CustomUser.objects.annotate(
+            favorites_total=Count('favorites')
+        ).order_by('-favorites_total', 'pk').first()
+        if not tag_ids or user is None:
+            raise CommandError('Нет данных: сначала загрузите рецепты.')
+        request = RequestFactory().get('/api/recipes/')
+        request.user = user
+
+        def filter_recipes(params):
+            return RecipeFilter(
+                params, queryset=Recipe.objects.all(), request=request
+            ).qs
+
+        cases = [
+            (
+                f'tags={mode}',
+                join_by_tags(list(tag_ids.values()), mode),
+                filter_recipes({'tags': list(tag_ids), 'tags_mode': mode}),
+            )
+            for mode in (TAGS_ANY, TAGS_ALL)
+        ]
+        cases.append((
+            'is_favorited',
+            Recipe.objects.filter(favorites__user=user).distinct(),
+            filter_recipes({'is_favorited': 1}),
+        ))
+        self.stdout.write(
+            f'Рецептов: {Recipe.objects.count()}, '
+            f'тегов в фильтре: {len(tag_ids)}'
+        )
+        self.stdout.write(
+            f'{"фильтр":<14}{"JOIN, мс":>12}{"подзапрос, мс":>15}'
+            f'{"найдено JOIN/подзапрос":>26}'
+        )
+        for name, joined, filtered in cases:
+            self.stdout.write(
+                f'{name:<14}'
+                f'{measure(lambda: first_page(joined), repeat):>12.1f}'
+                f'{measure(lambda: first_page(filtered), repeat):>15.1f}'
+                f'{first_page(joined)[0]:>18}/{first_page(filtered)[0]}'
+            )
@@ -0,0 +1,99 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.constraints import PAGE_SIZE
+from recipes.models import Recipe, RecipeSignature
+from recipes.similarity import find_similar, recipe_tokens
+
+BATCH_SIZE = 10000
+
+
+def load_tokens():
+    """Множества всех рецептов: id рецепта -> frozenset."""
+    tokens = {}
+    recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_tokens(recipe_ids[start:start + BATCH_SIZE])
+        tokens.update(
+            (recipe_id, frozenset(items))
+            for recipe_id, items in batch.items() if items
+        )
+    return tokens
+
+
+def find_exact(tokens, recipe_id, limit, threshold):
+    """Похожие рецепты полным перебором с точным коэффициентом Жаккара."""
+    target = tokens[recipe_id]
+    scored = []
+    for other_id, other in tokens.items():
+        if other_id == recipe_id:
+            continue
+        common = len(target & other)
+        if common:
+            similarity = common / (len(target) + len(other) - common)
+            if similarity >= threshold:
+                scored.append((-similarity, -other_id))
+    return [-other_id for _, other_id in sorted(scored)[:limit]]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск похожих рецептов по LSH-индексу MinHash-подписей '
+        'с полным перебором: время ответа и полноту выдачи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sample', type=int, default=50,
+            help='Количество рецептов, для которых ищутся похожие.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=PAGE_SIZE,
+            help='Количество похожих рецептов в выдаче.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.5,
+            help='Коэффициент Жаккара, начиная с которого рецепты '
+                 'считаются похожими при подсчёте полноты.',
+        )
+
+    def handle(self, *args, sample, limit, threshold, **options):
+        signed = list(RecipeSignature.objects.values_list(
+            'recipe_id', flat=True
+        ))
+        if not signed:
+            raise CommandError(
+                'Нет подписей: сначала выполните rebuild_recipe_signatures.'
+            )
+        tokens = load_tokens()
+        recipe_ids = random.Random(0).sample(signed, min(sample, len(signed)))
+        exact_time = index_time = 0
+        relevant = found = 0
+        for recipe_id in recipe_ids:
+            started = perf_counter()
+            exact = find_exact(tokens, recipe_id, limit, threshold)
+            exact_time += perf_counter() - started
+            started = perf_counter()
+            similar = find_similar(recipe_id, limit)
+            index_time += perf_counter() - started
+            relevant += len(exact)
+            found += len(
+                set(exact) & {item.recipe_id for item in similar}
+            )
+        self.stdout.write(
+            f'Рецептов: {len(tokens)}, подписей: {len(signed)}, '
+            f'выборка: {len(recipe_ids)}'
+        )
+        self.stdout.write(
+            f'Перебор: {exact_time / len(recipe_ids) * 1000:.1f} мс, '
+            f'LSH: {index_time / len(recipe_ids) * 1000:.1f} мс'
+        )
+        recall = found / relevant if relevant else 1
+        self.stdout.write(
+            f'Полнота top-{limit} при сходстве от {threshold}: '
+            f'{recall:.2f} ({found} из {relevant})'
+        )
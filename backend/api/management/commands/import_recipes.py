@@ -0,0 +1,64 @@
+import json
+import sys
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from api.importer import RecipeImporter
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует рецепты из файла JSON Lines (рецепт в строке). '
+        'Теги и ингредиенты указываются названиями, ошибочные строки '
+        'пропускаются и выводятся в stderr.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или "-" для чтения из stdin.',
+        )
+        parser.add_argument(
+            '--author', required=True,
+            help='Логин или email автора импортируемых рецептов.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество строк, записываемых за одну транзакцию.',
+        )
+
+    def handle(self, *args, path, author, batch_size, **options):
+        user = CustomUser.objects.filter(
+            Q(username=author) | Q(email=author)
+        ).first()
+        if user is None:
+            raise CommandError(f'Пользователь {author} не найден.')
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+
+        started = perf_counter()
+        importer = RecipeImporter(user, batch_size)
+        if path == '-':
+            importer.run(sys.stdin.buffer)
+        else:
+            try:
+                with open(path, 'rb') as lines:
+                    importer.run(lines)
+            except OSError as error:
+                raise CommandError(error)
+        elapsed = perf_counter() - started
+
+        for error in importer.errors:
+            self.stderr.write(
+                f'Строка {error.line}: '
+                f'{json.dumps(error.errors, ensure_ascii=False)}'
+            )
+        self.stdout.write(
+            f'Импортировано рецептов: {importer.created}, '
+            f'ошибок: {len(importer.errors)}, '
+            f'{importer.created / max(elapsed, 1e-9):.0f} рецептов/с'
+        )
+        if importer.interrupted:
+            raise CommandError('Импорт прерван: файл не в кодировке UTF-8.')
@@ -0,0 +1,150 @@
+import csv
+import json
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import bump_namespace_version
+from recipes.models import Ingredient
+
+DEFAULT_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+
+# размер куска файла при потоковом разборе JSON-массива
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """Строки CSV без заголовка: название, единица измерения."""
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1] if len(row) > 1 else ''
+
+
+def read_json(file):
+    """
+    Объекты JSON-массива [{"name": ..., "measurement_unit": ...}, ...]
+    по одному, не загружая файл целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and (
+                buffer[position].isspace() or buffer[position] in ',['
+            ):
+                if buffer[position] == '[':
+                    started = True
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            if position == len(buffer):
+                break
+            if not started:
+                raise ValueError('Ожидается JSON-массив')
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                # объект разрезан границей куска: дочитываем файл
+                break
+            yield item.get('name', ''), item.get('measurement_unit', '')
+        if not chunk:
+            if started:
+                raise ValueError('JSON-массив не закрыт')
+            return
+
+
+READERS = {'csv': read_csv, 'json': read_json}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV (название, единица измерения) или '
+        'JSON-массива. Повторы по (название, единица измерения) '
+        'пропускаются, уже загруженные ингредиенты не меняются, поэтому '
+        'команду можно запускать повторно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DEFAULT_PATH),
+            help='Путь к файлу, по умолчанию data/ingredients.csv.',
+        )
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Формат файла, по умолчанию - по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT.',
+        )
+
+    def handle(self, *args, path, format, batch_size, **options):
+        path = Path(path)
+        format = format or path.suffix.lstrip('.').lower()
+        if format not in READERS:
+            raise CommandError(
+                f'Неизвестный формат {format}: укажите --format.'
+            )
+        started = perf_counter()
+        try:
+            with open(path, encoding='utf-8') as file:
+                read, skipped, created = self.load(
+                    READERS[format](file), batch_size
+                )
+        except OSError as error:
+            raise CommandError(error)
+        except (ValueError, AttributeError) as error:
+            raise CommandError(f'Некорректный файл {path}: {error}')
+        self.stdout.write(
+            f'Прочитано строк: {read}, пропущено: {skipped}, '
+            f'добавлено ингредиентов: {created} '
+            f'за {(perf_counter() - started) * 1000:.0f} мс'
+        )
+
+    @transaction.atomic
+    def load(self, rows, batch_size):
+        """
+        Вставляет уникальные ингредиенты пачками через
+        INSERT ... ON CONFLICT DO NOTHING.
+        """
+        seen = set()
+        counts = {'read': 0, 'skipped': 0}
+
+        def unique_ingredients():
+            for name, measurement_unit in rows:
+                counts['read'] += 1
+                key = (name.strip(), measurement_unit.strip())
+                if not all(key) or key in seen:
+                    counts['skipped'] += 1
+                    continue
+                seen.add(key)
+                yield Ingredient(name=key[0], measurement_unit=key[1])
+
+        before = Ingredient.objects.count()
+        ingredients = unique_ingredients()
+        while True:
+            batch = list(islice(ingredients, batch_size))
+            if not batch:
+                break
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        created = Ingredient.objects.count() - before
+        if created:
+            # bulk_create не отправляет сигналы сброса кэша; версия
+            # пишется в БД после фиксации, и сервер перечитает её
+            # за CACHE_VERSION_TIMEOUT
+            transaction.on_commit(
+                partial(bump_namespace_version, 'ingredients')
+            )
+        return counts['read'], counts['skipped'], created
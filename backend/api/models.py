@@ -0,0 +1,27 @@
+from django.db import models
+
+from core.constraints import MAX_NAME_LENGTH
+
+
+class CacheVersion(models.Model):
+    """
+    Версия пространства имён кэша. Хранится в БД, чтобы изменения из
+    management-команд и других воркеров видели все процессы, даже
+    если кэш Django у каждого процесса свой.
+    """
+
+    namespace = models.CharField(
+        verbose_name='Пространство имён',
+        max_length=MAX_NAME_LENGTH,
+        primary_key=True,
+    )
+    version = models.BigIntegerField(
+        verbose_name='Версия',
+    )
+
+    class Meta:
+        verbose_name = 'Версия кэша'
+        verbose_name_plural = 'Версии кэша'
+
+    def __str__(self):
+        return f'{self.namespace}: {self.version}'
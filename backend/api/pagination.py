@@ -1,6 +1,90 @@
-from rest_framework.pagination import PageNumberPagination
+from functools import partial
+from hashlib import md5
 
-from core.constraints import PAGE_SIZE
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+from api.cache import get_namespace_version
+from core.constraints import ESTIMATED_COUNT_THRESHOLD, PAGE_SIZE
+
+
+class CountModePaginator(Paginator):
+    """
+    Пагинатор с настраиваемым подсчётом количества объектов.
+
+    exact - COUNT(*) на каждый запрос;
+    cached - COUNT(*) кэшируется до смены версий пространств имён кэша;
+    estimated - для больших выборок на PostgreSQL берётся оценка
+    планировщика, для остальных - точный COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, count_mode='exact',
+                 cache_namespaces=(), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_mode = count_mode
+        self.cache_namespaces = cache_namespaces
+        self.is_estimated = False
+
+    @cached_property
+    def count(self):
+        if self.count_mode == 'cached':
+            return self.get_cached_count()
+        if self.count_mode == 'estimated':
+            return self.get_estimated_count()
+        return self.get_exact_count()
+
+    def get_exact_count(self):
+        return self.object_list.count()
+
+    def get_cached_count(self):
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        versions = [
+            get_namespace_version(namespace)
+            for namespace in self.cache_namespaces
+        ]
+        key = 'api:count:' + md5(
+            repr((sql, params, versions)).encode()
+        ).hexdigest()
+        return cache.get_or_set(
+            key, self.get_exact_count, settings.API_CACHE_TIMEOUT
+        )
+
+    def get_estimated_count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return self.get_exact_count()
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            estimate = cursor.fetchone()[0][0]['Plan']['Plan Rows']
+        if estimate < ESTIMATED_COUNT_THRESHOLD:
+            return self.get_exact_count()
+        self.is_estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # оценка может быть меньше точного количества,
+            # поэтому страницы за пределами num_pages не считаются ошибкой
+            if self.is_estimated and int(number) > self.num_pages:
+                return int(number)
+            raise
 
 
 class LimitPageNumberPagination(PageNumberPagination):
@@ -8,3 +92,111 @@ class LimitPageNumberPagination(PageNumberPagination):
 
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
+    count_mode = 'exact'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        namespaces = []
+        if getattr(view, 'cache_namespace', None):
+            namespaces.append(view.cache_namespace)
+        if request.user.is_authenticated:
+            namespaces.append(f'user:{request.user.pk}')
+        self.django_paginator_class = partial(
+            CountModePaginator,
+            count_mode=self.count_mode,
+            cache_namespaces=namespaces,
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipePageNumberPagination(LimitPageNumberPagination):
+    """
+    Постраничная пагинация рецептов; способ подсчёта количества
+    задаётся настройкой RECIPES_COUNT_MODE.
+    """
+
+    count_mode = settings.RECIPES_COUNT_MODE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация рецептов (и записей ленты подписок) по
+    (-pub_date, -id) без подсчёта количества.
+
+    Курсор непрозрачен для клиента и хранит дату публикации и id
+    крайнего рецепта страницы, поэтому глубина прокрутки не влияет
+    на стоимость запроса.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        if self.cursor is not None:
+            pub_date, pk = self.decode_position(self.cursor.position)
+            if reverse:
+                queryset = queryset.filter(pub_date__gte=pub_date).exclude(
+                    pub_date=pub_date, pk__lte=pk
+                )
+            else:
+                queryset = queryset.filter(pub_date__lte=pub_date).exclude(
+                    pub_date=pub_date, pk__gte=pk
+                )
+        queryset = queryset.order_by(
+            *(('pub_date', 'id') if reverse else self.ordering)
+        )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def encode_position(self, recipe):
+        return f'{recipe.pub_date.isoformat()}|{recipe.pk}'
+
+    def decode_position(self, position):
+        try:
+            pub_date, pk = position.split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False,
+            position=self.encode_position(self.page[-1]),
+        ))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True,
+            position=self.encode_position(self.page[0]),
+        ))
+
+
+def is_cursor_request(request):
+    """Клиент выбирает keyset-пагинацию параметром pagination=cursor."""
+    return (
+        request.query_params.get('pagination') == 'cursor'
+        or 'cursor' in request.query_params
+    )
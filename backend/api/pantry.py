@@ -0,0 +1,198 @@
+from collections import namedtuple
+from datetime import timedelta
+from threading import Lock
+
+import numpy as np
+from django.utils import timezone
+
+from api.cache import get_namespace_version
+from core.constraints import PANTRY_OVERLAY_LIMIT, PANTRY_SYNC_OVERLAP
+from recipes.models import IngredientRecipe, Recipe
+
+# рецепт в выдаче: сколько его ингредиентов есть и сколько всего
+PantryMatch = namedtuple('PantryMatch', 'recipe_id matched total')
+
+_index = None
+_lock = Lock()
+
+
+def as_ids(values):
+    return np.fromiter(values, dtype=np.int64)
+
+
+class PantryIndex:
+    """
+    Инвертированный индекс ингредиент -> рецепты для подбора рецептов
+    по имеющимся ингредиентам.
+
+    Пары (ингредиент, рецепт) хранятся двумя массивами NumPy,
+    отсортированными по ингредиенту и рецепту: рецепты ингредиента -
+    отсортированный срез, границы которого находятся бинарным поиском.
+    Id рецептов и количество их ингредиентов лежат в параллельных
+    массивах, совпадения считаются одним np.bincount.
+
+    Изменённые рецепты не перестраивают массивы: их строки помечаются
+    устаревшими, а новый состав хранится в словаре overlay, пока таких
+    рецептов не станет больше PANTRY_OVERLAY_LIMIT.
+    """
+
+    def __init__(self, ingredient_ids, recipe_ids, version=None):
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        order = np.lexsort((recipe_ids, ingredient_ids))
+        self.ingredients = ingredient_ids[order]
+        self.postings = recipe_ids[order]
+        self.recipes, self.sizes = np.unique(recipe_ids, return_counts=True)
+        self.alive = np.ones(len(self.recipes), dtype=bool)
+        self.overlay = {}
+        self.version = version
+        self.synced_at = timezone.now()
+        self.lock = Lock()
+
+    @classmethod
+    def from_db(cls, version=None):
+        rows = IngredientRecipe.objects.order_by().values_list(
+            'ingredient_id', 'recipe_id'
+        )
+        pairs = as_ids(
+            pk for row in rows.iterator(chunk_size=10000) for pk in row
+        ).reshape(-1, 2)
+        return cls(pairs[:, 0], pairs[:, 1], version)
+
+    def __len__(self):
+        return int(self.alive.sum()) + len(self.overlay)
+
+    def positions(self, recipe_ids):
+        """Позиции рецептов в self.recipes; -1 для отсутствующих."""
+        if not len(self.recipes):
+            return np.full(len(recipe_ids), -1)
+        positions = np.searchsorted(self.recipes, recipe_ids)
+        positions[positions == len(self.recipes)] = 0
+        found = self.recipes[positions] == recipe_ids
+        return np.where(found, positions, -1)
+
+    def update(self, recipes):
+        """
+        Заменяет составы рецептов: словарь id рецепта -> id ингредиентов.
+        Рецепт с пустым составом удаляется из индекса.
+        """
+        with self.lock:
+            positions = self.positions(as_ids(recipes))
+            self.alive[positions[positions >= 0]] = False
+            for recipe_id, ingredient_ids in recipes.items():
+                if ingredient_ids:
+                    self.overlay[recipe_id] = frozenset(ingredient_ids)
+                else:
+                    self.overlay.pop(recipe_id, None)
+            if len(self.overlay) > PANTRY_OVERLAY_LIMIT:
+                self.merge()
+
+    def remove(self, recipe_ids):
+        self.update(dict.fromkeys(recipe_ids, ()))
+
+    def merge(self):
+        """Переносит составы из overlay в отсортированные массивы."""
+        keep = self.alive[np.searchsorted(self.recipes, self.postings)]
+        overlay = [
+            (ingredient_id, recipe_id)
+            for recipe_id, ingredient_ids in self.overlay.items()
+            for ingredient_id in ingredient_ids
+        ]
+        added = np.array(overlay, dtype=np.int64).reshape(-1, 2)
+        merged = PantryIndex(
+            np.concatenate((self.ingredients[keep], added[:, 0])),
+            np.concatenate((self.postings[keep], added[:, 1])),
+        )
+        for name in ('ingredients', 'postings', 'recipes', 'sizes', 'alive'):
+            setattr(self, name, getattr(merged, name))
+        self.overlay = {}
+
+    def refresh(self, version):
+        """
+        Применяет изменения рецептов с прошлой синхронизации. Берутся
+        рецепты, изменённые с запасом PANTRY_SYNC_OVERLAP: так не
+        теряются транзакции, зафиксированные позже даты изменения.
+        """
+        synced_at = timezone.now()
+        changed = list(Recipe.objects.filter(
+            updated_at__gte=self.synced_at - timedelta(
+                seconds=PANTRY_SYNC_OVERLAP
+            )
+        ).values_list('pk', flat=True))
+        recipes = {recipe_id: [] for recipe_id in changed}
+        rows = IngredientRecipe.objects.filter(
+            recipe__in=changed
+        ).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            recipes[recipe_id].append(ingredient_id)
+        self.update(recipes)
+        self.synced_at = synced_at
+        self.version = version
+
+    def count_overlay(self, ingredient_ids):
+        counts = {}
+        for recipe_id, recipe_ingredients in self.overlay.items():
+            matched = len(recipe_ingredients & ingredient_ids)
+            if matched:
+                counts[recipe_id] = (matched, len(recipe_ingredients))
+        return counts
+
+    def match(self, ingredient_ids, limit):
+        """
+        Возвращает до limit рецептов хотя бы с одним из ingredient_ids:
+        по убыванию доли имеющихся ингредиентов, затем по количеству
+        недостающих и от новых рецептов к старым.
+        """
+        query = np.unique(as_ids(ingredient_ids))
+        with self.lock:
+            starts = np.searchsorted(self.ingredients, query, side='left')
+            ends = np.searchsorted(self.ingredients, query, side='right')
+            hits = np.concatenate([
+                self.postings[start:end] for start, end in zip(starts, ends)
+            ] or [np.empty(0, dtype=np.int64)])
+            matched = np.bincount(
+                np.searchsorted(self.recipes, hits),
+                minlength=len(self.recipes),
+            )
+            matched[~self.alive] = 0
+            found = np.flatnonzero(matched)
+            overlay = self.count_overlay(frozenset(query.tolist()))
+            recipe_ids = np.concatenate(
+                (self.recipes[found], as_ids(overlay))
+            )
+            matched = np.concatenate((
+                matched[found],
+                as_ids(count for count, _ in overlay.values()),
+            ))
+            totals = np.concatenate((
+                self.sizes[found],
+                as_ids(total for _, total in overlay.values()),
+            ))
+        order = np.lexsort((-recipe_ids, totals - matched, -matched / totals))
+        return [
+            PantryMatch(*row) for row in zip(
+                recipe_ids[order[:limit]].tolist(),
+                matched[order[:limit]].tolist(),
+                totals[order[:limit]].tolist(),
+            )
+        ]
+
+
+def get_pantry_index():
+    """
+    Возвращает индекс процесса. При смене версии кэша рецептов индекс
+    дополняется изменёнными рецептами, при смене версии ингредиентов
+    (удаление ингредиента меняет составы без даты изменения рецептов)
+    строится заново.
+    """
+    global _index
+    version = (
+        get_namespace_version('ingredients'),
+        get_namespace_version('recipes'),
+    )
+    with _lock:
+        if _index is None or _index.version[0] != version[0]:
+            _index = PantryIndex.from_db(version)
+        elif _index.version != version:
+            _index.refresh(version)
+        return _index
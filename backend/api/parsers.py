@@ -0,0 +1,92 @@
+import json
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParser as DjangoParser
+from django.http.multipartparser import MultiPartParserError
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+from core.constraints import MAX_IMAGE_UPLOAD_SIZE
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = (
+        f'Размер запроса превышает {MAX_IMAGE_UPLOAD_SIZE // 2 ** 20} МБ'
+    )
+    default_code = 'request_too_large'
+
+
+class UploadedFiles(MultiValueDict):
+    """
+    Файлы запроса. DRF объединяет данные и файлы через dict.update;
+    для MultiValueDict без своего __iter__ он скопировал бы внутренние
+    списки значений вместо самих файлов.
+    """
+
+    def __iter__(self):
+        return super().__iter__()
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загружаемые файлы сразу во временный файл на диске
+    и прерывает загрузку, как только запрос превышает лимит:
+    по заявленному Content-Length или по фактически принятым байтам.
+    """
+
+    max_size = MAX_IMAGE_UPLOAD_SIZE
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_size:
+            raise RequestTooLarge()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            raise RequestTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """
+    Разбирает multipart/form-data: файлы потоком пишутся во временные
+    файлы, а поля из multipart_json_fields представления передаются
+    как JSON и декодируются, чтобы сериализатор получил те же данные,
+    что и из тела application/json.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        try:
+            data, files = DjangoParser(
+                meta,
+                stream,
+                [LimitedTemporaryFileUploadHandler(request)],
+                parser_context.get('encoding', settings.DEFAULT_CHARSET),
+            ).parse()
+        except MultiPartParserError as exc:
+            raise ParseError(f'Ошибка разбора multipart: {exc}')
+        view = parser_context.get('view')
+        json_fields = getattr(view, 'multipart_json_fields', ())
+        result = {}
+        for name in data:
+            values = data.getlist(name)
+            if name not in json_fields:
+                result[name] = values[0] if len(values) == 1 else values
+                continue
+            try:
+                result[name] = json.loads(values[0])
+            except ValueError:
+                raise ParseError(f'Поле {name} должно содержать JSON')
+        return DataAndFiles(result, UploadedFiles(files))
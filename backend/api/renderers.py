@@ -0,0 +1,76 @@
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+
+from rest_framework.renderers import BaseRenderer
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, metaclass=ABCMeta):
+    """
+    Рендерер списка покупок. Строки (название, единица измерения,
+    количество) формируются по одной, чтобы ответ можно было отдавать
+    потоком через StreamingHttpResponse.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # через render проходят только ответы с ошибками,
+        # список покупок отдаётся потоком из stream
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+    @abstractmethod
+    def stream(self, rows):
+        """Возвращает итератор строк ответа по строкам списка покупок."""
+
+    @property
+    def content_type(self):
+        return f'{self.media_type}; charset={self.charset}'
+
+    @property
+    def filename(self):
+        return f'shopping_list.{self.format}'
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield 'Список покупок\n'
+        for i, (name, unit, amount) in enumerate(rows, start=1):
+            yield f'{i}. {name.capitalize()} ({unit}) - {amount}\n'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        separator = ''
+        yield '['
+        for name, unit, amount in rows:
+            yield separator + json.dumps(
+                {'name': name, 'measurement_unit': unit, 'amount': amount},
+                ensure_ascii=False,
+            )
+            separator = ','
+        yield ']'
@@ -1,10 +1,17 @@
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.fields import (BulkPrimaryKeyRelatedField, ImageSrcsetField,
+                        ImportedImageField, RecipeImageField)
+from core.constraints import (MAX_AMOUNT, MAX_COOKING_TIME, MAX_NAME_LENGTH,
+                              MIN_AMOUNT, MIN_COOKING_TIME, PAGE_SIZE,
+                              PANTRY_MAX_RESULTS, SIMILAR_MAX_RESULTS)
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.similarity import get_tokens, save_signatures
 from users.models import CustomUser, Subscription
 
 
@@ -29,7 +36,14 @@ class UserSerializer(serializers.ModelSerializer):
         Возвращает True, если подписка существует,
         пользователь авторизован и существует реквест.
         В остальных случаях возвращает False.
+
+        Если выборка аннотирована признаком is_subscribed,
+        значение берётся из аннотации без дополнительного запроса.
         """
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
+
         request = self.context.get('request')
 
         return bool(
@@ -39,11 +53,19 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
 
+def get_recipes_limit(request):
+    """Возвращает значение параметра recipes_limit или None."""
+    limit = request.GET.get('recipes_limit')
+    if limit and limit.isdigit():
+        return int(limit)
+    return None
+
+
 class SubscribeSerializer(UserSerializer):
     """Сериализатор для подписки."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = CustomUser
@@ -54,21 +76,19 @@ class SubscribeSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         """Возвращает список рецептов."""
-        request = self.context['request']
-        limit = request.GET.get('recipes_limit')
-        queryset = obj.recipes.all()
-        if limit and limit.isdigit():
-            queryset = queryset[:int(limit)]
+        queryset = getattr(obj, 'recipes_preview', None)
+        if queryset is None:
+            request = self.context['request']
+            limit = get_recipes_limit(request)
+            queryset = obj.recipes.all()
+            if limit is not None:
+                queryset = queryset[:limit]
         return AbridgedRecipeSerializer(
             queryset,
             many=True,
             context=self.context
         ).data
 
-    def get_recipes_count(self, obj):
-        """Возвращает количество рецептов."""
-        return obj.recipes.count()
-
 
 class SubscribeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания подписки."""
@@ -167,6 +187,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_srcset = ImageSrcsetField()
 
     class Meta:
         model = Recipe
@@ -179,6 +200,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_srcset',
             'text',
             'cooking_time',
         )
@@ -189,6 +211,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         пользователь авторизован и существует реквест.
 
         В остальных случаях возвращает False.
+        Если выборка аннотирована, значение берётся из аннотации.
 
         Args:
             obj (Recipe): Экземпляр рецепта.
@@ -197,6 +220,10 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             bool: True, если рецепт находится в избранном, False - в противном
             случае.
         """
+        is_favorited = getattr(obj, 'is_favorited', None)
+        if is_favorited is not None:
+            return is_favorited
+
         request = self.context.get('request')
 
         return bool(
@@ -211,6 +238,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         пользователь авторизован и существует реквест.
 
         В остальных случаях возвращает False.
+        Если выборка аннотирована, значение берётся из аннотации.
 
         Args:
             obj (Recipe): Экземпляр рецепта.
@@ -219,6 +247,10 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             bool: True, если рецепт находится в корзине, False - в противном
             случае.
         """
+        is_in_shopping_cart = getattr(obj, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
+
         request = self.context.get('request')
 
         return bool(
@@ -228,10 +260,36 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
+class PantryRecipeSerializer(RecipeReadSerializer):
+    """Рецепт в подборе по ингредиентам с долей имеющихся."""
+
+    coverage = serializers.FloatField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            'coverage', 'missing_count'
+        )
+
+
+class PantryQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=PANTRY_MAX_RESULTS, default=PAGE_SIZE
+    )
+
+
 class IngredientCreateInRecipeSerializer(serializers.ModelSerializer):
-    """Сериализатор для ингредиентов."""
+    """
+    Сериализатор для ингредиентов. Ингредиенты по id загружает
+    сериализатор рецепта одним запросом на весь список.
+    """
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientRecipe
@@ -245,6 +303,7 @@ class AbridgedRecipeSerializer(serializers.ModelSerializer):
     """Сокращенный сериализатор рецепта."""
 
     image = Base64ImageField(read_only=True)
+    image_srcset = ImageSrcsetField()
 
     class Meta:
         model = Recipe
@@ -252,16 +311,34 @@ class AbridgedRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_srcset',
             'cooking_time',
         )
 
 
+class SimilarRecipeSerializer(AbridgedRecipeSerializer):
+    """Похожий рецепт с оценкой сходства."""
+
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(AbridgedRecipeSerializer.Meta):
+        fields = AbridgedRecipeSerializer.Meta.fields + ('similarity',)
+
+
+class SimilarQuerySerializer(serializers.Serializer):
+    """Параметры выдачи похожих рецептов."""
+
+    limit = serializers.IntegerField(
+        min_value=1, max_value=SIMILAR_MAX_RESULTS, default=PAGE_SIZE
+    )
+
+
 class RecipeCreateAndUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и обновления рецепта."""
 
-    image = Base64ImageField(represent_in_base64=True)
+    image = RecipeImageField(represent_in_base64=True)
     ingredients = IngredientCreateInRecipeSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all()
     )
     author = UserSerializer(read_only=True)
@@ -289,6 +366,27 @@ class RecipeCreateAndUpdateSerializer(serializers.ModelSerializer):
             for ingredient_data in ingredients_data
         )
 
+    def validate_ingredients(self, ingredients):
+        """Заменяет id ингредиентов объектами, загруженными одним запросом."""
+        found = Ingredient.objects.in_bulk(
+            {ingredient['id'] for ingredient in ingredients}
+        )
+        does_not_exist = serializers.PrimaryKeyRelatedField(
+            read_only=True
+        ).error_messages['does_not_exist']
+        errors = [
+            {} if ingredient['id'] in found else {'id': [
+                does_not_exist.format(pk_value=ingredient['id'])
+            ]}
+            for ingredient in ingredients
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [
+            {**ingredient, 'id': found[ingredient['id']]}
+            for ingredient in ingredients
+        ]
+
     def validate(self, data):
         ingredients = data.get('ingredients')
         cooking_time = data.get('cooking_time')
@@ -322,6 +420,7 @@ class RecipeCreateAndUpdateSerializer(serializers.ModelSerializer):
 
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
@@ -329,21 +428,172 @@ class RecipeCreateAndUpdateSerializer(serializers.ModelSerializer):
                                        **validated_data)
         self.create_ingredients(recipe, ingredients_data)
         recipe.tags.set(tags_data)
+        save_signatures({recipe.pk: get_tokens(
+            [ingredient_data['id'].pk for ingredient_data in ingredients_data],
+            [tag.pk for tag in tags_data],
+        )})
         return recipe
 
+    def update_ingredients(self, recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к ingredients_data: добавляет
+        новые, меняет изменившиеся количества и удаляет лишние строки.
+        Возвращает словари id ингредиента -> количество до и после.
+        """
+        rows = {
+            row.ingredient_id: row
+            for row in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        before = {pk: row.amount for pk, row in rows.items()}
+        after = {
+            ingredient_data['id'].pk: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+        changed = []
+        for pk, amount in after.items():
+            row = rows.get(pk)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        removed = [row.pk for pk, row in rows.items() if pk not in after]
+        if removed:
+            IngredientRecipe.objects.filter(pk__in=removed).delete()
+        self.create_ingredients(recipe, [
+            ingredient_data for ingredient_data in ingredients_data
+            if ingredient_data['id'].pk not in rows
+        ])
+        return before, after
+
+    def update_tags(self, recipe, tags_data):
+        """Приводит теги рецепта к tags_data, возвращает id тегов до."""
+        # строки связи пишутся напрямую: сохранение рецепта в конце
+        # обновления само сбрасывает кэш и дату изменения
+        through = Recipe.tags.through
+        current = set(
+            through.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
+            )
+        )
+        wanted = {tag.pk for tag in tags_data}
+        if current - wanted:
+            through.objects.filter(
+                recipe=recipe, tag_id__in=current - wanted
+            ).delete()
+        if wanted - current:
+            through.objects.bulk_create(
+                through(recipe=recipe, tag_id=pk)
+                for pk in sorted(wanted - current)
+            )
+        return current
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
+        # одновременные правки одного рецепта выполняются по очереди
+        Recipe.objects.select_for_update().filter(pk=instance.pk).exists()
 
-        instance.ingredients.clear()
-
-        self.create_ingredients(instance, ingredients_data)
-        instance.tags.set(tags_data)
+        before, after = self.update_ingredients(instance, ingredients_data)
+        ShoppingListItem.objects.apply_recipe_change(
+            instance.pk, before, after
+        )
+        tags_before = self.update_tags(instance, tags_data)
+        tags_after = {tag.pk for tag in tags_data}
+        if before.keys() != after.keys() or tags_before != tags_after:
+            save_signatures({instance.pk: get_tokens(after, tags_after)})
 
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
-        return RecipeReadSerializer(instance, context=self.context).data
+        # рецепт перечитывается с подгрузкой связей, как при чтении,
+        # чтобы ответ не загружал ингредиенты по одному
+        recipe = Recipe.objects.for_read(
+            self.context.get('request').user
+        ).get(pk=instance.pk)
+        return RecipeReadSerializer(recipe, context=self.context).data
+
+
+class IngredientImportField(serializers.Field):
+    """
+    Ингредиент импортируемого рецепта: название, необязательная единица
+    измерения и количество. Проверяется без вложенного сериализатора:
+    ингредиентов в файле импорта в разы больше, чем рецептов.
+    """
+
+    default_error_messages = {
+        'invalid': 'Ожидается объект с полями name, measurement_unit '
+                   'и amount.',
+        'amount': f'Количество должно быть целым числом от {MIN_AMOUNT} '
+                  f'до {MAX_AMOUNT}.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            self.fail('invalid')
+        name = data.get('name')
+        measurement_unit = data.get('measurement_unit')
+        amount = data.get('amount')
+        if not (
+            isinstance(name, str)
+            and 0 < len(name) <= MAX_NAME_LENGTH
+            and (
+                measurement_unit is None
+                or isinstance(measurement_unit, str)
+                and len(measurement_unit) <= MAX_NAME_LENGTH
+            )
+        ):
+            self.fail('invalid')
+        if (
+            not isinstance(amount, int) or isinstance(amount, bool)
+            or not MIN_AMOUNT <= amount <= MAX_AMOUNT
+        ):
+            self.fail('amount')
+        return {
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        }
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    """
+    Строка файла импорта рецептов. Проверяет только саму строку:
+    теги и ингредиенты по названиям ищет импортёр пачками.
+    """
+
+    name = serializers.CharField(max_length=MAX_NAME_LENGTH)
+    text = serializers.CharField()
+    cooking_time = serializers.IntegerField(
+        min_value=MIN_COOKING_TIME, max_value=MAX_COOKING_TIME
+    )
+    image = ImportedImageField()
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=MAX_NAME_LENGTH),
+        allow_empty=False,
+    )
+    ingredients = serializers.ListField(
+        child=IngredientImportField(), allow_empty=False
+    )
+
+    def validate_tags(self, tags):
+        if len(tags) != len(set(tags)):
+            raise serializers.ValidationError(
+                'Требуются неповторяющиеся теги'
+            )
+        return tags
+
+    def validate_ingredients(self, ingredients):
+        keys = {
+            (ingredient['name'], ingredient['measurement_unit'])
+            for ingredient in ingredients
+        }
+        if len(keys) != len(ingredients):
+            raise serializers.ValidationError(
+                'Требуются неповторяющиеся ингредиенты'
+            )
+        return ingredients
 
 
 class BaseUserRecipeSerializer(serializers.ModelSerializer):
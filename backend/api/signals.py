@@ -0,0 +1,53 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import bump_namespace_version_on_commit
+from recipes.images import variants_saved
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag, ingredient_rows_deleted)
+from recipes.scores import scores_updated
+from users.models import CustomUser, Subscription
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(ingredient_rows_deleted)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+@receiver(variants_saved)
+@receiver(scores_updated)
+def invalidate_recipes(**kwargs):
+    bump_namespace_version_on_commit('recipes')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(**kwargs):
+    bump_namespace_version_on_commit('tags', 'recipes')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(**kwargs):
+    bump_namespace_version_on_commit('ingredients', 'recipes')
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_authors(update_fields=None, **kwargs):
+    """Данные автора входят в ответы рецептов; вход в систему не в счёт."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_namespace_version_on_commit('recipes')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_user(instance, **kwargs):
+    """Списки и подписки пользователя влияют на его количества рецептов."""
+    bump_namespace_version_on_commit(f'user:{instance.user_id}')
@@ -1,23 +1,41 @@
 import django_filters
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (Count, Max, Prefetch, Value,
+                              prefetch_related_objects)
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from api.autocomplete import get_ingredient_index
+from api.cache import AnonymousCacheMixin
+from api.conditional import ConditionalGetMixin
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import LimitPageNumberPagination
+from api.importer import RecipeImporter
+from api.pagination import (LimitPageNumberPagination, RecipeCursorPagination,
+                            RecipePageNumberPagination, is_cursor_request)
+from api.pantry import get_pantry_index
+from api.parsers import MultiPartJSONParser
 from api.permissions import IsAuthorOrReadOnly
+from api.renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                           ShoppingListTextRenderer)
 from api.serializers import (FavoriteCreateSerializer, IngredientSerializer,
+                             PantryQuerySerializer, PantryRecipeSerializer,
                              RecipeCreateAndUpdateSerializer,
                              RecipeReadSerializer,
                              ShoppingCartCreateSerializer,
-                             SubscribeCreateSerializer, TagSerializer)
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from users.models import Subscription
+                             SimilarQuerySerializer, SimilarRecipeSerializer,
+                             SubscribeCreateSerializer, SubscribeSerializer,
+                             TagSerializer, get_recipes_limit)
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.similarity import find_similar
+from recipes.units import AGGREGATE_CHUNK_SIZE, unit_registry
+from users.models import CustomUser, Subscription
 
 
 class UserSubscriptionViewSet(UserViewSet):
@@ -31,6 +49,9 @@ class UserSubscriptionViewSet(UserViewSet):
             return [IsAuthenticated()]
         return super(UserSubscriptionViewSet, self).get_permissions()
 
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(self.request.user)
+
     @action(
         detail=True,
         methods=['POST'],
@@ -45,7 +66,8 @@ class UserSubscriptionViewSet(UserViewSet):
             context={'request': request},
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=user, author=author)
+        with transaction.atomic():
+            serializer.save(user=user, author=author)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
@@ -69,33 +91,113 @@ class UserSubscriptionViewSet(UserViewSet):
         permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request):
-        queryset = Subscription.objects.filter(user=request.user)
-        pages = self.paginate_queryset(queryset)
-        serializer = SubscribeCreateSerializer(
-            pages,
+        queryset = CustomUser.objects.filter(
+            subscribers__user=request.user
+        ).annotate(is_subscribed=Value(True))
+        authors = self.paginate_queryset(queryset)
+        # превью рецептов всех авторов страницы загружаются одним запросом
+        prefetch_related_objects(authors, Prefetch(
+            'recipes',
+            queryset=Recipe.objects.previews(
+                [author.pk for author in authors],
+                get_recipes_limit(request),
+            ),
+            to_attr='recipes_preview',
+        ))
+        serializer = SubscribeSerializer(
+            authors,
             many=True,
             context={'request': request},
         )
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(AnonymousCacheMixin, ConditionalGetMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Вьюсет для получения тегов."""
 
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousCacheMixin, ConditionalGetMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
 
+    cache_namespace = 'recipes'
+    cache_query_params = (
+        'tags', 'tags_mode', 'author', 'ordering', 'page', 'limit',
+        'pagination', 'cursor',
+    )
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthorOrReadOnly]
-    pagination_class = LimitPageNumberPagination
+    parser_classes = [JSONParser, MultiPartJSONParser]
+    multipart_json_fields = ('ingredients', 'tags')
     filter_backends = [django_filters.rest_framework.DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    @property
+    def pagination_class(self):
+        request = getattr(self, 'request', None)
+        if request is not None and is_cursor_request(request):
+            return RecipeCursorPagination
+        return RecipePageNumberPagination
+
+    def get_queryset(self):
+        return Recipe.objects.for_read(self.request.user)
+
+    def get_validators_base_queryset(self):
+        # без аннотаций и подгрузок выборки для чтения
+        return Recipe.objects.all()
+
+    def get_validator_aggregates(self):
+        aggregates = super().get_validator_aggregates()
+        if self.request.query_params.get('ordering'):
+            # рейтинги меняют порядок, не меняя дат изменения рецептов
+            aggregates['scores_updated_at'] = Max('score__updated_at')
+        return aggregates
+
+    def get_validators_cache_namespaces(self):
+        namespaces = super().get_validators_cache_namespaces()
+        if self.request.user.is_authenticated:
+            return (*namespaces, f'user:{self.request.user.pk}')
+        return namespaces
+
+    def compute_validators_state(self, queryset):
+        """
+        Для пользователя добавляет количество и последний id его записей
+        избранного, корзины и подписок: по индексу на пользователя,
+        без подзапросов на каждый рецепт выборки.
+        """
+        state = super().compute_validators_state(queryset)
+        user = self.request.user
+        if user.is_authenticated:
+            for name, model in (('favorite', Favorite),
+                                ('shopping_cart', ShoppingCart),
+                                ('subscription', Subscription)):
+                state.update(model.objects.filter(user=user).aggregate(**{
+                    f'{name}_count': Count('pk'),
+                    f'{name}_max': Max('pk'),
+                }))
+        return state
+
+    def get_validators_state(self):
+        if is_cursor_request(self.request):
+            # keyset-страница не агрегирует выборку: её содержимое меняется
+            # только вместе с версиями пространств имён рецептов и пользователя
+            return {'versions': self.get_validators_versions()}
+        return super().get_validators_state()
+
+    def get_validators(self, request):
+        etag, last_modified = super().get_validators(request)
+        if request.user.is_authenticated:
+            # избранное, корзина и подписки не хранят дату изменения,
+            # поэтому для авторизованных пользователей остаётся только ETag
+            return etag, None
+        return etag, last_modified
+
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
             return RecipeReadSerializer
@@ -113,7 +215,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data={'recipe': pk}, context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_item(self, model, request, pk):
@@ -158,47 +261,176 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.delete_item(ShoppingCart, request, pk)
 
     def get_shopping_list_data(self, user):
-        return (
-            ShoppingCart.objects.filter(user=user)
-            .values('recipe')
-            .values_list(
-                'recipe__ingredients__name',
-                'recipe__ingredients__measurement_unit',
-            )
-            .annotate(total_amount=Sum('recipe__ingredientes__amount'))
+        """
+        Читает материализованный список покупок пользователя,
+        упорядоченный по названию ингредиента на стороне БД, и сводит
+        количества одного ингредиента в разных единицах (г и кг,
+        ст. л. и мл) к канонической единице пачками по мере чтения.
+        """
+        return unit_registry.aggregate(
+            ShoppingListItem.objects.filter(user=user).values_list(
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'total_amount',
+            ).order_by(
+                'ingredient__name', 'ingredient__measurement_unit'
+            ).iterator(chunk_size=AGGREGATE_CHUNK_SIZE)
         )
 
-    def format_shopping_list(self, ingredients):
-        shopping_list = ['Список покупок\n']
-        for i, ingredient in enumerate(ingredients, start=1):
-            shopping_list.append(
-                f'{i}. {ingredient[0].capitalize()} '
-                f'({ingredient[1]}) - {ingredient[2]}\n'
-            )
-        return ''.join(shopping_list)
-
     @action(
         detail=False,
         methods=['GET'],
         url_path='download_shopping_cart',
         url_name='download_shopping_cart',
         permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer,
+        ],
     )
     def download_shopping_cart(self, request):
-        ingredients = self.get_shopping_list_data(request.user)
-        shopping_list_text = self.format_shopping_list(ingredients)
-
-        response = HttpResponse(shopping_list_text, content_type='text/plain')
+        """Отдаёт список покупок потоком в формате из ?format=txt|csv|json."""
+        renderer = request.accepted_renderer
+        rows = self.get_shopping_list_data(request.user)
+        response = StreamingHttpResponse(
+            renderer.stream(rows), content_type=renderer.content_type
+        )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="{renderer.filename}"'
         )
-
         return response
 
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        """
+        Новые рецепты авторов из подписок пользователя. Страница
+        выбирается из ленты по индексу (пользователь, дата публикации)
+        keyset-пагинацией, затем загружаются рецепты страницы.
+        """
+        paginator = RecipeCursorPagination()
+        entries = paginator.paginate_queryset(
+            FeedEntry.objects.filter(user=request.user), request, view=self
+        )
+        recipes = Recipe.objects.for_read(request.user).in_bulk(
+            [entry.recipe_id for entry in entries]
+        )
+        serializer = RecipeReadSerializer(
+            [
+                recipes[entry.recipe_id] for entry in entries
+                if entry.recipe_id in recipes
+            ],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk=None):
+        """
+        Рецепты с похожим набором ингредиентов и тегов по убыванию
+        оценки коэффициента Жаккара по MinHash-подписям.
+        """
+        params = SimilarQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        recipe = self.get_object()
+        # None - у рецепта нет подписи: не обработан командой пересборки
+        similar = find_similar(
+            recipe.pk, params.validated_data['limit']
+        ) or []
+        recipes = Recipe.objects.in_bulk(
+            [item.recipe_id for item in similar]
+        )
+        for item in similar:
+            if item.recipe_id in recipes:
+                recipes[item.recipe_id].similarity = item.similarity
+        serializer = SimilarRecipeSerializer(
+            [
+                recipes[item.recipe_id] for item in similar
+                if item.recipe_id in recipes
+            ],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def pantry(self, request):
+        """
+        Рецепты, которые можно приготовить из имеющихся ингредиентов,
+        по убыванию доли имеющихся. Рецепты подбираются индексом
+        в памяти процесса, из БД загружаются только рецепты ответа.
+        """
+        params = PantryQuerySerializer(data={
+            **request.query_params.dict(),
+            'ingredients': request.query_params.getlist('ingredients'),
+        })
+        params.is_valid(raise_exception=True)
+        index = get_pantry_index()
+        while True:
+            matches = index.match(
+                params.validated_data['ingredients'],
+                params.validated_data['limit'],
+            )
+            recipes = Recipe.objects.for_read(request.user).in_bulk(
+                [match.recipe_id for match in matches]
+            )
+            # удалённые рецепты убираются из индекса при первой встрече
+            deleted = [
+                match.recipe_id for match in matches
+                if match.recipe_id not in recipes
+            ]
+            if not deleted:
+                break
+            index.remove(deleted)
+        for match in matches:
+            recipe = recipes[match.recipe_id]
+            recipe.coverage = match.matched / match.total
+            recipe.missing_count = match.total - match.matched
+        serializer = PantryRecipeSerializer(
+            [recipes[match.recipe_id] for match in matches],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(
+        detail=False,
+        methods=['POST'],
+        url_path='import',
+        url_name='import',
+        permission_classes=[IsAdminUser],
+    )
+    def import_recipes(self, request):
+        """
+        Импортирует рецепты из тела запроса в формате JSON Lines
+        от имени администратора. Тело читается построчно, не целиком.
+        """
+        importer = RecipeImporter(request.user)
+        if request.stream is not None:
+            importer.run(request.stream)
+        return Response(
+            {
+                'created': importer.created,
+                'errors': [error._asdict() for error in importer.errors],
+            },
+            status=(
+                status.HTTP_400_BAD_REQUEST if importer.interrupted
+                else status.HTTP_200_OK
+            ),
+        )
+
+
+class IngredientViewSet(AnonymousCacheMixin, ConditionalGetMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Вьюсет для получения ингредиентов."""
 
+    cache_namespace = 'ingredients'
+    cache_query_params = ('name',)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [IsAuthorOrReadOnly]
@@ -206,3 +438,22 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [django_filters.rest_framework.DjangoFilterBackend]
     filterset_class = IngredientFilter
     search_fields = ('name',)
+
+    def is_search_request(self):
+        return self.action == 'list' and bool(
+            self.request.query_params.get('name')
+        )
+
+    def filter_queryset(self, queryset):
+        """Поиск по названию обслуживается индексом в памяти без БД."""
+        if self.is_search_request():
+            return get_ingredient_index().search(
+                self.request.query_params['name']
+            )
+        return super().filter_queryset(queryset)
+
+    def get_validators_state(self):
+        if self.is_search_request():
+            index = get_ingredient_index()
+            return {'index': index.version, 'usage': index.usage_digest}
+        return super().get_validators_state()
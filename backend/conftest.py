@@ -0,0 +1,7 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('DATABASE_TYPE', 'sqlite3')
+django.setup()
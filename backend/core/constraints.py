@@ -18,6 +18,60 @@ MAX_COOKING_TIME = MAX_AMOUNT = 32000
 # количество элементов, возвращаемых на страницу в постраничном ответе
 PAGE_SIZE = 6
 
+# оценка планировщика, начиная с которой не выполняется точный COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+# ширины уменьшенных копий изображений рецептов, пиксели
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+
+# качество сжатия уменьшенных копий изображений
+IMAGE_VARIANT_QUALITY = 80
+
+# максимальный размер тела запроса с картинкой в multipart/form-data, байты
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# максимальное количество пикселей картинки рецепта
+MAX_IMAGE_PIXELS = 40_000_000
+
+# количество подписчиков, в ленты которых рецепт добавляется одним INSERT
+FEED_BATCH_SIZE = 1000
+
+# вклад добавления рецепта в избранное и в корзину в рейтинги рецептов
+SCORE_FAVORITE_WEIGHT = 1.0
+SCORE_CART_WEIGHT = 2.0
+
+# период полураспада вклада события в трендовый рейтинг, часы
+TRENDING_HALF_LIFE_HOURS = 24
+
+# сколько секунд запись избранного или корзины не учитывается
+# в рейтингах: транзакции, начатые до пересчёта, успевают зафиксироваться
+SCORE_COMMIT_DELAY = 60
+
+# через сколько периодов полураспада трендовые рейтинги приводятся
+# к новой опорной дате, чтобы множитель 2 ** t не переполнял float
+TRENDING_REBASE_HALF_LIVES = 64
+
+# количество изменённых рецептов, после которого индекс подбора рецептов
+# по ингредиентам пересобирает отсортированные массивы
+PANTRY_OVERLAY_LIMIT = 1000
+
+# запас при поиске рецептов, изменённых с прошлой синхронизации индекса
+# подбора рецептов, секунды
+PANTRY_SYNC_OVERLAP = 60
+
+# максимальное количество рецептов в ответе подбора по ингредиентам
+PANTRY_MAX_RESULTS = 100
+
+# MinHash-подписи рецептов: полос LSH и значений подписи в полосе;
+# после изменения параметров подписи пересобираются командой
+# rebuild_recipe_signatures
+SIGNATURE_BANDS = 20
+SIGNATURE_BAND_ROWS = 3
+SIGNATURE_SEED = 1
+
+# максимальное количество похожих рецептов в ответе
+SIMILAR_MAX_RESULTS = 100
+
 # максимальная длина строки для отображения объекта
 MAX_STR_LENGTH = 30
 
@@ -0,0 +1,12 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Атомарно изменяет денормализованный счётчик строки на delta
+    выражением F(), не опускаясь ниже нуля.
+    """
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
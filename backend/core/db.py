@@ -0,0 +1,38 @@
+from django.db import connections, router
+from django.db.models import Max
+
+
+def insert_rows(model, fields, rows):
+    """Вставляет кортежи значений полей fields в таблицу model."""
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(field).column) for field in fields
+    )
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+            f'VALUES ({placeholders})',
+            list(rows),
+        )
+
+
+def last_issued_pk(model):
+    """
+    Последний первичный ключ, выданный таблице model. На SQLite
+    автоинкремент хранится в sqlite_sequence и не опускается при
+    удалении записей, поэтому ключи удалённых строк не выдаются снова.
+    """
+    last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            last_pk = max(last_pk, row[0])
+    return last_pk
@@ -0,0 +1,53 @@
+"""
+Обработка изображений в отдельных процессах.
+
+Модуль не импортирует Django, чтобы его функции можно было
+выполнять в пуле процессов, запущенных методом spawn.
+"""
+import os
+from uuid import uuid4
+
+from PIL import Image, ImageOps, features
+
+# формат: (формат Pillow, расширение файла)
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def available_formats():
+    """Возвращает форматы копий, поддерживаемые сборкой Pillow."""
+    return tuple(
+        name for name in FORMATS
+        if name != 'webp' or features.check('webp')
+    )
+
+
+def render_variants(source, directory, stem, widths, formats, quality):
+    """
+    Сохраняет в directory уменьшенные копии изображения source
+    заданных ширин (не больше исходной) во всех форматах formats.
+
+    Возвращает словарь {формат: {ширина: имя файла}}.
+    """
+    variants = {name: {} for name in formats}
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        for width in sorted({min(width, image.width) for width in widths}):
+            height = max(round(image.height * width / image.width), 1)
+            resized = image.resize((width, height), Image.LANCZOS)
+            for name in formats:
+                pillow_format, extension = FORMATS[name]
+                frame = resized
+                if pillow_format == 'JPEG' and frame.mode != 'RGB':
+                    frame = frame.convert('RGB')
+                filename = f'{stem}-{width}.{extension}'
+                path = os.path.join(directory, filename)
+                # копия может уже отдаваться клиентам: новая подменяет
+                # её целиком, а не перезаписывается на месте
+                temporary = f'{path}.{uuid4().hex}.tmp'
+                frame.save(temporary, format=pillow_format, quality=quality)
+                os.replace(temporary, path)
+                variants[name][width] = filename
+    return variants
@@ -30,3 +30,16 @@ class BaseUserModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class BaseUpdatedAtModel(models.Model):
+    """Базовая модель с общим полем 'дата изменения'."""
+
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+
+    class Meta:
+        abstract = True
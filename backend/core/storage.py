@@ -0,0 +1,88 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.crypto import get_random_string
+from django.utils.deconstruct import deconstructible
+
+# длина имени файла: шестнадцатеричный SHA-256
+CONTENT_HASH_LENGTH = 64
+
+
+def is_content_name(name):
+    """Проверяет, что имя файла построено из хэша содержимого."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return len(stem) == CONTENT_HASH_LENGTH and all(
+        char in '0123456789abcdef' for char in stem
+    )
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, называющее файлы по SHA-256 содержимого.
+
+    Файл с уже сохранённым содержимым повторно не записывается,
+    а содержимое по одному имени никогда не меняется, поэтому
+    такие файлы можно кэшировать у клиентов бессрочно.
+    Файлы, на которые больше никто не ссылается, удаляет
+    команда gc_media.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f'{digest.hexdigest()}{extension}')
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, content)
+        path = self.path(name)
+        if self.exists(name):
+            try:
+                # свежая дата изменения не даёт gc_media удалить файл,
+                # пока новая ссылка на него ещё не сохранена в БД
+                os.utime(path)
+                return name
+            except FileNotFoundError:
+                # файл удалили между проверкой и обновлением даты
+                pass
+        self.make_directory(os.path.dirname(path))
+        # содержимое пишется во временный файл того же каталога и
+        # атомарно подменяет итоговый: читатели не видят недописанный
+        # файл, а одновременные загрузки того же содержимого пишут
+        # одно и то же
+        temporary = os.path.join(
+            os.path.dirname(path),
+            f'.{os.path.basename(path)}.{get_random_string(8)}.tmp',
+        )
+        try:
+            fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                         0o666)
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+    def make_directory(self, directory):
+        if self.directory_permissions_mode is None:
+            os.makedirs(directory, exist_ok=True)
+            return
+        # как FileSystemStorage: права каталогов не зависят от umask
+        old_umask = os.umask(0)
+        try:
+            os.makedirs(
+                directory, self.directory_permissions_mode, exist_ok=True
+            )
+        finally:
+            os.umask(old_umask)
@@ -71,6 +71,9 @@ if database_type == 'sqlite3':
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    # INCLUDE покрывающих индексов поддерживает только PostgreSQL,
+    # на SQLite такие индексы создаются без неключевых столбцов
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
 else:
     DATABASES = {
         'default': {
@@ -83,6 +86,39 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        # LocMemCache не разделяется между процессами: при нескольких
+        # воркерах gunicorn укажите общий бэкенд, например memcached
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+# сколько секунд процесс не перечитывает из БД версии пространств имён
+# кэша: за этот срок до него доходят сбросы кэша из других процессов
+CACHE_VERSION_TIMEOUT = int(os.getenv('CACHE_VERSION_TIMEOUT', 5))
+
+# время жизни кэша ответов API для анонимных пользователей, 0 - отключить
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 60 * 5))
+
+# как часто (в секундах) процесс пересчитывает частоту использования
+# ингредиентов в рецептах, по которой упорядочены подсказки
+INGREDIENT_USAGE_TIMEOUT = int(os.getenv('INGREDIENT_USAGE_TIMEOUT', 60 * 5))
+
+# подсчёт количества рецептов при постраничной пагинации:
+# exact, cached или estimated
+RECIPES_COUNT_MODE = os.getenv('RECIPES_COUNT_MODE', 'cached')
+
+# число процессов для уменьшенных копий изображений рецептов,
+# 0 - создавать копии сразу в процессе запроса
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+
+# число потоков, добавляющих новые рецепты в ленты подписчиков,
+# 0 - сразу в процессе запроса после фиксации транзакции
+FEED_FANOUT_WORKERS = int(os.getenv('FEED_FANOUT_WORKERS', 1))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,6 +150,7 @@ STATIC_ROOT = '/app/static/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/app/media/'
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
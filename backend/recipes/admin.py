@@ -1,9 +1,9 @@
 from django.contrib import admin
-from django.db.models import Count
 from import_export.admin import ImportExportModelAdmin
 
 from core.resources import IngredientResource
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
 
 
 class TagInline(admin.StackedInline):
@@ -47,8 +47,10 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
-        'favorite_count',
+        'favorites_count',
+        'in_carts_count',
     )
+    list_select_related = ('author',)
     search_fields = (
         'name',
         'author__username',
@@ -63,14 +65,14 @@ class RecipeAdmin(admin.ModelAdmin):
         TagInline,
     )
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(favorite_count=Count('favorites'))
-        return queryset
-
-    @admin.display(description='В избранном')
-    def favorite_count(self, obj):
-        return obj.favorite_count
+    def save_related(self, request, form, formsets, change):
+        """Переносит правку ингредиентов в списки покупок."""
+        recipe = form.instance
+        amounts_before = recipe.get_ingredient_amounts() if change else {}
+        super().save_related(request, form, formsets, change)
+        ShoppingListItem.objects.apply_recipe_change(
+            recipe.pk, amounts_before, recipe.get_ingredient_amounts()
+        )
 
 
 @admin.register(ShoppingCart)
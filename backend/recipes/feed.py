@@ -0,0 +1,53 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+
+from recipes.models import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = Lock()
+
+
+def get_executor():
+    """Возвращает пул потоков для рассылки рецептов по лентам."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.FEED_FANOUT_WORKERS,
+                thread_name_prefix='feed',
+            )
+        return _executor
+
+
+def fan_out(recipe_ids):
+    try:
+        FeedEntry.objects.fan_out(recipe_ids)
+    except Exception:
+        logger.exception('Не удалось разослать рецепты %s', recipe_ids)
+
+
+def fan_out_in_thread(recipe_ids):
+    # поток пула открывает своё соединение с БД и закрывает его
+    # после рассылки
+    try:
+        fan_out(recipe_ids)
+    finally:
+        connection.close()
+
+
+def schedule_fan_out(recipe_ids):
+    """
+    Ставит в очередь добавление рецептов в ленты подписчиков.
+    Вызывается после фиксации транзакции, в которой созданы рецепты.
+    """
+    recipe_ids = list(recipe_ids)
+    if not settings.FEED_FANOUT_WORKERS:
+        fan_out(recipe_ids)
+        return
+    get_executor().submit(fan_out_in_thread, recipe_ids)
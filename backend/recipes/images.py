@@ -0,0 +1,106 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.constraints import IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_WIDTHS
+from core.images import available_formats, render_variants
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIRECTORY = 'recipes/images/variants'
+
+# копии сохранены через UPDATE, без post_save: аргумент recipe_ids
+variants_saved = Signal()
+
+_executor = None
+_lock = Lock()
+
+
+def get_executor():
+    """Возвращает пул процессов для обработки изображений."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                mp_context=get_context('spawn'),
+            )
+        return _executor
+
+
+def schedule_variants(recipe, recipe_ids=None):
+    """
+    Ставит в очередь создание уменьшенных копий изображения рецепта.
+    Пока копии не готовы, клиентам отдаётся исходное изображение.
+    recipe_ids - все рецепты с этой картинкой, копии для них создаются
+    один раз; по умолчанию только сам recipe.
+    """
+    if recipe_ids is None:
+        recipe_ids = [recipe.pk]
+    storage = recipe.image.storage
+    source = recipe.image.name
+    directory = storage.path(VARIANTS_DIRECTORY)
+    os.makedirs(directory, exist_ok=True)
+    task = partial(
+        render_variants,
+        storage.path(source),
+        directory,
+        # имя исходника - хэш содержимого, копии одинаковых картинок общие
+        os.path.splitext(os.path.basename(source))[0],
+        IMAGE_VARIANT_WIDTHS,
+        available_formats(),
+        IMAGE_VARIANT_QUALITY,
+    )
+    if not settings.IMAGE_VARIANT_WORKERS:
+        try:
+            variants = task()
+        except Exception:
+            logger.exception('Не удалось создать копии %s', source)
+            return
+        save_variants(recipe_ids, source, variants)
+        return
+    get_executor().submit(task).add_done_callback(
+        partial(save_variants_from_future, recipe_ids, source)
+    )
+
+
+def save_variants_from_future(recipe_ids, source, future):
+    # вызывается в служебном потоке пула: своё соединение с БД
+    # закрывается после записи
+    try:
+        save_variants(recipe_ids, source, future.result())
+    except Exception:
+        logger.exception('Не удалось создать копии %s', source)
+    finally:
+        connection.close()
+
+
+def save_variants(recipe_ids, source, variants):
+    """
+    Сохраняет копии рецептам, изображение которых с тех пор
+    не менялось, одним UPDATE.
+    """
+    updated = Recipe.objects.filter(pk__in=recipe_ids, image=source).update(
+        image_variants={
+            'source': source,
+            **{
+                name: {
+                    width: f'{VARIANTS_DIRECTORY}/{filename}'
+                    for width, filename in files.items()
+                }
+                for name, files in variants.items()
+            },
+        },
+        updated_at=timezone.now(),
+    )
+    if updated:
+        variants_saved.send(sender=Recipe, recipe_ids=recipe_ids)
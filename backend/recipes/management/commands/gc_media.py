@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.images import VARIANTS_DIRECTORY
+from recipes.models import Recipe
+
+IMAGES_DIRECTORY = Recipe._meta.get_field('image').upload_to
+
+
+def referenced_files(batch_size):
+    """Собирает имена файлов, на которые ссылаются рецепты."""
+    names = set()
+    rows = Recipe.objects.values_list('image', 'image_variants').iterator(
+        chunk_size=batch_size
+    )
+    for image, variants in rows:
+        names.add(image)
+        for name, files in variants.items():
+            if name != 'source':
+                names.update(files.values())
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы картинок рецептов и их копий, на которые '
+        'не ссылается ни один рецепт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Количество рецептов, читаемых из БД за один запрос.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60,
+            help=(
+                'Не трогать файлы моложе указанного числа минут: '
+                'их рецепт может быть ещё не сохранён.'
+            ),
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только вывести, что будет удалено.',
+        )
+
+    def handle(self, *args, batch_size, min_age, dry_run, **options):
+        referenced = referenced_files(batch_size)
+        threshold = timezone.now() - timedelta(minutes=min_age)
+        removed = size = 0
+        for directory in (IMAGES_DIRECTORY, VARIANTS_DIRECTORY):
+            if not default_storage.exists(directory):
+                continue
+            for filename in default_storage.listdir(directory)[1]:
+                name = f'{directory}/{filename}'
+                if name in referenced or (
+                    default_storage.get_modified_time(name) > threshold
+                ):
+                    continue
+                removed += 1
+                size += default_storage.size(name)
+                if dry_run:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+        action = 'Будет удалено' if dry_run else 'Удалено'
+        self.stdout.write(
+            f'{action} файлов: {removed}, {size / 2 ** 20:.1f} МБ'
+        )
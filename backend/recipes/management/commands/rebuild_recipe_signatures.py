@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.similarity import refresh_signatures
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает MinHash-подписи и полосы LSH всех рецептов '
+        'для поиска похожих рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество рецептов, пересчитываемых за один проход.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        checked = signed = 0
+        last_pk = 0
+        while True:
+            recipe_ids = list(
+                Recipe.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            last_pk = recipe_ids[-1]
+            checked += len(recipe_ids)
+            with transaction.atomic():
+                signed += refresh_signatures(recipe_ids)
+        self.stdout.write(
+            f'Проверено рецептов: {checked}, подписей: {signed}'
+        )
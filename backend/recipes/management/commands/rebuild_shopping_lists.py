@@ -0,0 +1,94 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from users.models import CustomUser
+
+
+def expected_items(user_ids):
+    """Собирает списки покупок пользователей заново из корзин."""
+    items = defaultdict(dict)
+    rows = (
+        ShoppingCart.objects.filter(
+            user_id__in=user_ids, recipe__ingredientes__isnull=False
+        )
+        .order_by()
+        .values_list('user_id', 'recipe__ingredientes__ingredient_id')
+        .annotate(total_amount=Sum('recipe__ingredientes__amount'))
+    )
+    for user_id, ingredient_id, total_amount in rows:
+        items[user_id][ingredient_id] = total_amount
+    return items
+
+
+def stored_items(user_ids):
+    items = defaultdict(dict)
+    rows = ShoppingListItem.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'ingredient_id', 'total_amount'
+    )
+    for user_id, ingredient_id, total_amount in rows:
+        items[user_id][ingredient_id] = total_amount
+    return items
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет материализованные списки покупок с корзинами и '
+        'пересобирает списки пользователей с расхождениями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество пользователей, проверяемых за один проход.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, ничего не меняя.',
+        )
+
+    def handle(self, *args, batch_size, check, **options):
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            user_ids = list(
+                CustomUser.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+            checked += len(user_ids)
+            drifted += self.rebuild(user_ids, check)
+        action = 'найдено расхождений' if check else 'пересобрано'
+        self.stdout.write(
+            f'Проверено пользователей: {checked}, {action}: {drifted}'
+        )
+
+    @transaction.atomic
+    def rebuild(self, user_ids, check):
+        expected = expected_items(user_ids)
+        stored = stored_items(user_ids)
+        drifted = [
+            user_id for user_id in user_ids
+            if expected.get(user_id, {}) != stored.get(user_id, {})
+        ]
+        if drifted and not check:
+            ShoppingListItem.objects.filter(user_id__in=drifted).delete()
+            ShoppingListItem.objects.bulk_create(
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total_amount,
+                )
+                for user_id in drifted
+                for ingredient_id, total_amount in expected[user_id].items()
+            )
+        return len(drifted)
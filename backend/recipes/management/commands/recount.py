@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Subscription
+
+# (модель со счётчиком, поле счётчика, подсчитываемая модель, внешний ключ)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (CustomUser, 'recipes_count', Recipe, 'author'),
+    (CustomUser, 'subscribers_count', Subscription, 'author'),
+)
+
+
+def count_subquery(model, field):
+    """Подзапрос с количеством строк model, ссылающихся на внешнюю строку."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики избранного, корзин, '
+        'рецептов и подписчиков пачками и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк, проверяемых за один запрос.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        for model, field, counted_model, foreign_key in COUNTERS:
+            fixed = self.recount(
+                model, field, count_subquery(counted_model, foreign_key),
+                batch_size,
+            )
+            self.stdout.write(
+                f'{model._meta.label}.{field}: исправлено {fixed}'
+            )
+
+    def recount(self, model, field, actual, batch_size):
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .annotate(actual=actual)
+                .only('pk', field)[:batch_size]
+            )
+            if not batch:
+                return fixed
+            last_pk = batch[-1].pk
+            drifted = [
+                obj.pk for obj in batch if getattr(obj, field) != obj.actual
+            ]
+            if drifted:
+                # пересчёт в самом UPDATE не теряет параллельные изменения
+                model.objects.filter(pk__in=drifted).update(**{field: actual})
+            fixed += len(drifted)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.scores import update_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги популярности и трендовости рецептов '
+        'по записям избранного и корзины с прошлого пересчёта. '
+        'Запускается по расписанию, например раз в несколько минут.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Обновлено рейтингов: {update_scores()}')
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.3 on 2026-10-18 20:10
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_pub_date(apps, schema_editor):
+    """
+    Проставляет существующим рецептам даты публикации с шагом в секунду
+    в порядке id, чтобы сортировка по новизне совпадала с прежней.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ids = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+    if not ids:
+        return
+    now = timezone.now()
+    max_id = ids[-1]
+    recipes = [
+        Recipe(id=pk, pub_date=now - timedelta(seconds=max_id - pk))
+        for pk in ids
+    ]
+    Recipe.objects.bulk_update(
+        recipes, ['pub_date'], batch_size=BACKFILL_BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-pub_date', '-id'), 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата публикации'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_pub_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 3.2.3 on 2026-10-18 20:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INGREDIENT_NAMES = (
+    "SELECT {aggregate} FROM recipes_ingredientrecipe ir "
+    "JOIN recipes_ingredient i ON i.id = ir.ingredient_id "
+    "WHERE ir.recipe_id = r.id"
+)
+
+POSTGRESQL_FORWARD = [
+    'CREATE INDEX recipe_search_vector_idx ON recipes_recipe '
+    'USING gin (search_vector)',
+    "UPDATE recipes_recipe r SET search_vector = "
+    "setweight(to_tsvector('russian', r.name), 'A') || "
+    "setweight(to_tsvector('russian', r.text), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(("
+    + INGREDIENT_NAMES.format(aggregate="string_agg(i.name, ' ')")
+    + "), '')), 'C')",
+]
+
+POSTGRESQL_BACKWARD = ['DROP INDEX IF EXISTS recipe_search_vector_idx']
+
+SQLITE_FORWARD = [
+    'CREATE VIRTUAL TABLE recipes_recipe_search USING fts5('
+    "name, text, ingredients, tokenize='unicode61 remove_diacritics 2')",
+    'INSERT INTO recipes_recipe_search (rowid, name, text, ingredients) '
+    "SELECT r.id, r.name, r.text, coalesce(("
+    + INGREDIENT_NAMES.format(aggregate="group_concat(i.name, ' ')")
+    + "), '') FROM recipes_recipe r",
+]
+
+SQLITE_BACKWARD = ['DROP TABLE IF EXISTS recipes_recipe_search']
+
+
+def execute(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        # GIN-индекс на PostgreSQL и теневая таблица FTS5 на SQLite
+        # создаются только для своей СУБД
+        migrations.RunPython(
+            execute({
+                'postgresql': POSTGRESQL_FORWARD,
+                'sqlite': SQLITE_FORWARD,
+            }),
+            execute({
+                'postgresql': POSTGRESQL_BACKWARD,
+                'sqlite': SQLITE_BACKWARD,
+            }),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.3 on 2026-10-18 21:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# рейтинги популярности существующих рецептов по их счётчикам,
+# трендовые набираются пересчётами
+BACKFILL = (
+    'INSERT INTO recipes_recipescore (recipe_id, popular, trending, '
+    'updated_at) SELECT id, favorites_count * 1.0 + in_carts_count * 2.0, '
+    '0, CURRENT_TIMESTAMP FROM recipes_recipe'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popular', models.FloatField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(default=0, verbose_name='Трендовость')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата пересчёта')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ScoreCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата пересчёта')),
+                ('favorite_id', models.PositiveBigIntegerField(verbose_name='Последняя учтённая запись избранного')),
+                ('shopping_cart_id', models.PositiveBigIntegerField(verbose_name='Последняя учтённая запись корзины')),
+                ('epoch', models.DateTimeField(verbose_name='Опорная дата трендовых рейтингов')),
+            ],
+            options={
+                'verbose_name': 'Пересчёт рейтингов',
+                'verbose_name_plural': 'Пересчёты рейтингов',
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-popular', '-recipe'], name='recipescore_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-trending', '-recipe'], name='recipescore_trending_idx'),
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 3.2.3 on 2026-10-18 22:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def convert_checkpoint(apps, schema_editor):
+    """
+    Переводит отметку пересчёта с id записей на даты: учтённые записи
+    получают дату прошлого пересчёта, остальные - дату миграции.
+    Остаётся одна отметка с id 1.
+    """
+    ScoreCheckpoint = apps.get_model('recipes', 'ScoreCheckpoint')
+    checkpoint = ScoreCheckpoint.objects.order_by('-id').first()
+    if checkpoint is None:
+        return
+    for model, field in (('Favorite', 'favorite_id'),
+                         ('ShoppingCart', 'shopping_cart_id')):
+        apps.get_model('recipes', model).objects.filter(
+            pk__lte=getattr(checkpoint, field)
+        ).update(created_at=checkpoint.created_at)
+    ScoreCheckpoint.objects.all().delete()
+    ScoreCheckpoint.objects.create(
+        pk=1,
+        created_at=checkpoint.created_at,
+        favorite_id=checkpoint.favorite_id,
+        shopping_cart_id=checkpoint.shopping_cart_id,
+        counted_until=checkpoint.created_at,
+        epoch=checkpoint.epoch,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='scorecheckpoint',
+            name='counted_until',
+            field=models.DateTimeField(help_text='Пусто, если пересчётов ещё не было.', null=True, verbose_name='Учтены записи, добавленные до'),
+        ),
+        migrations.RunPython(convert_checkpoint, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='scorecheckpoint',
+            options={'verbose_name': 'Пересчёт рейтингов', 'verbose_name_plural': 'Пересчёты рейтингов'},
+        ),
+        migrations.RemoveField(
+            model_name='scorecheckpoint',
+            name='created_at',
+        ),
+        migrations.RemoveField(
+            model_name='scorecheckpoint',
+            name='favorite_id',
+        ),
+        migrations.RemoveField(
+            model_name='scorecheckpoint',
+            name='shopping_cart_id',
+        ),
+        migrations.AddField(
+            model_name='scorecheckpoint',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата пересчёта'),
+        ),
+    ]
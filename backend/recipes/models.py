@@ -1,16 +1,38 @@
+import re
+from collections import defaultdict
+
 from colorfield.fields import ColorField
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField)
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (Exists, F, FloatField, OuterRef, Prefetch, Q,
+                              Subquery, Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
+from django.dispatch import Signal
+from django.utils import timezone
 
-from core.constraints import (MAX_AMOUNT, MAX_COLOR_LENGTH, MAX_COOKING_TIME,
-                              MAX_NAME_LENGTH, MAX_STR_LENGTH, MIN_AMOUNT,
-                              MIN_COOKING_TIME)
-from core.models import BaseNameModel, BaseUserModel
+from core.constraints import (FEED_BATCH_SIZE, MAX_AMOUNT, MAX_COLOR_LENGTH,
+                              MAX_COOKING_TIME, MAX_NAME_LENGTH,
+                              MAX_STR_LENGTH, MIN_AMOUNT, MIN_COOKING_TIME)
+from core.models import BaseNameModel, BaseUpdatedAtModel, BaseUserModel
 from recipes.utils import generate_random_color
-from users.models import CustomUser
+from users.models import CustomUser, Subscription
+
+# конфигурация полнотекстового поиска PostgreSQL
+SEARCH_CONFIG = 'russian'
+# теневая таблица FTS5 для поиска рецептов на SQLite
+SEARCH_TABLE = 'recipes_recipe_search'
+# веса столбцов name, text и ingredients в bm25 на SQLite
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+
+# удалены строки ингредиентов рецептов recipe_ids
+ingredient_rows_deleted = Signal()
 
 
-class Tag(models.Model):
+class Tag(BaseUpdatedAtModel):
     name = models.CharField(
         verbose_name='Название',
         unique=True,
@@ -37,7 +59,7 @@ class Tag(models.Model):
         return self.name[:MAX_STR_LENGTH]
 
 
-class Ingredient(BaseNameModel):
+class Ingredient(BaseNameModel, BaseUpdatedAtModel):
     measurement_unit = models.CharField(
         verbose_name='Единицы измерения',
         max_length=MAX_NAME_LENGTH
@@ -58,17 +80,193 @@ class Ingredient(BaseNameModel):
         return self.name[:MAX_STR_LENGTH]
 
 
-class Recipe(BaseNameModel):
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        """Аннотирует признаки избранного и корзины для пользователя."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
+
+    def for_read(self, user):
+        """
+        Подготавливает выборку рецептов для сериализации:
+        подгружает автора, теги и ингредиенты фиксированным числом запросов.
+        """
+        return self.with_user_flags(user).prefetch_related(
+            Prefetch(
+                'author',
+                queryset=CustomUser.objects.with_is_subscribed(user),
+            ),
+            'tags',
+            Prefetch(
+                'ingredientes',
+                # без сортировки по рецепту, наследуемой из Meta.ordering,
+                # которая добавляла JOIN с рецептами
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient'
+                ).order_by('recipe_id', 'id'),
+            ),
+        )
+
+    def previews(self, author_ids, limit=None):
+        """
+        Выбирает не более limit последних рецептов каждого автора
+        одним запросом.
+
+        На PostgreSQL рецепты нумеруются оконной функцией ROW_NUMBER()
+        в пределах автора, на остальных СУБД используется коррелированный
+        подзапрос с LIMIT.
+        """
+        queryset = self.filter(author_id__in=author_ids).only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time',
+            'author_id',
+        )
+        if limit is None:
+            return queryset
+        if connections[self.db].vendor == 'postgresql':
+            ranked = self.model.objects.filter(
+                author_id__in=author_ids
+            ).annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('id').desc()),
+                )
+            ).values('id', 'row_number')
+            sql, params = ranked.query.sql_with_params()
+            return queryset.filter(pk__in=RawSQL(
+                f'SELECT ranked.id FROM ({sql}) ranked '
+                f'WHERE ranked.row_number <= %s',
+                (*params, limit),
+            ))
+        return queryset.filter(pk__in=Subquery(
+            self.model.objects.filter(
+                author_id=OuterRef('author_id')
+            ).order_by('-pub_date', '-id').values('id')[:limit]
+        ))
+
+    def search(self, query):
+        """
+        Полнотекстовый поиск по названию, описанию и названиям
+        ингредиентов. Рецепты аннотируются релевантностью search_rank
+        и сортируются по ней.
+
+        На PostgreSQL используется сохранённый search_vector с GIN-индексом
+        и русской морфологией, на SQLite - теневая таблица FTS5 с поиском
+        по началу слов, на остальных СУБД - icontains.
+        """
+        vendor = connections[self.db].vendor
+        if vendor == 'postgresql':
+            query = SearchQuery(
+                query, config=SEARCH_CONFIG, search_type='websearch'
+            )
+            queryset = self.filter(search_vector=query).annotate(
+                search_rank=SearchRank(F('search_vector'), query)
+            )
+        elif vendor == 'sqlite':
+            words = re.findall(r'\w+', query)
+            if not words:
+                return self.none()
+            match = ' '.join(f'"{word}"*' for word in words)
+            weights = ', '.join(map(str, SEARCH_WEIGHTS))
+            table = self.model._meta.db_table
+            # соединение с FTS5 вместо коррелированного подзапроса:
+            # MATCH выполняется один раз, а не для каждого рецепта
+            queryset = self.extra(
+                select={
+                    # bm25 тем меньше, чем выше релевантность
+                    'search_rank': f'-bm25({SEARCH_TABLE}, {weights})',
+                },
+                tables=[SEARCH_TABLE],
+                where=[
+                    f'{SEARCH_TABLE} MATCH %s',
+                    f'{SEARCH_TABLE}.rowid = {table}.id',
+                ],
+                params=[match],
+            )
+        else:
+            queryset = self.filter(
+                Q(name__icontains=query)
+                | Q(text__icontains=query)
+                | Q(ingredients__name__icontains=query)
+            ).distinct().annotate(search_rank=Value(0.0, FloatField()))
+        return queryset.order_by('-search_rank', *self.model._meta.ordering)
+
+    def update_search_index(self, recipe_ids):
+        """Пересчитывает поисковые данные рецептов recipe_ids."""
+        recipe_ids = list(recipe_ids)
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            names = IngredientRecipe.objects.filter(
+                recipe_id=OuterRef('pk')
+            ).order_by().values('recipe_id').annotate(
+                names=StringAgg('ingredient__name', ' ')
+            ).values('names')
+            self.filter(pk__in=recipe_ids).update(search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+                + SearchVector(
+                    Coalesce(Subquery(names), Value('')),
+                    weight='C',
+                    config=SEARCH_CONFIG,
+                )
+            ))
+        elif connection.vendor == 'sqlite':
+            names = defaultdict(list)
+            for recipe_id, name in IngredientRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list('recipe_id', 'ingredient__name'):
+                names[recipe_id].append(name)
+            rows = [
+                (pk, name, text, ' '.join(names[pk]))
+                for pk, name, text in self.filter(
+                    pk__in=recipe_ids
+                ).values_list('pk', 'name', 'text')
+            ]
+            with transaction.atomic(using=self.db):
+                with connection.cursor() as cursor:
+                    # удалённые рецепты уходят из индекса вместе с изменёнными
+                    cursor.executemany(
+                        f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                        [(pk,) for pk in recipe_ids],
+                    )
+                    cursor.executemany(
+                        f'INSERT INTO {SEARCH_TABLE} '
+                        f'(rowid, name, text, ingredients) '
+                        f'VALUES (%s, %s, %s, %s)',
+                        rows,
+                    )
+
+
+class Recipe(BaseNameModel, BaseUpdatedAtModel):
     author = models.ForeignKey(
         CustomUser,
         verbose_name='Автор',
         on_delete=models.CASCADE,
         related_name='recipes',
+        # поиск по автору обслуживает составной индекс recipe_author_idx
+        db_index=False,
     )
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='recipes/images',
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии картинки',
+        default=dict,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Описание рецепта',
     )
@@ -82,6 +280,10 @@ class Recipe(BaseNameModel):
         Tag,
         verbose_name='Теги',
     )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True,
+    )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления',
         default=MIN_COOKING_TIME,
@@ -96,15 +298,71 @@ class Recipe(BaseNameModel):
             ),
         ],
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False,
+    )
+    # заполняется только на PostgreSQL, см. RecipeQuerySet.search
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('name',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'
+            ),
+            # рецепты автора в порядке публикации: фильтр по автору
+            # и превью в подписках без сортировки
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name[:MAX_STR_LENGTH]
 
+    def get_ingredient_amounts(self):
+        """Возвращает словарь id ингредиента -> количество в рецепте."""
+        return dict(self.ingredientes.values_list('ingredient_id', 'amount'))
+
+
+class IngredientRecipeQuerySet(models.QuerySet):
+
+    def delete(self):
+        """
+        Удаляет строки и один раз на вызов отправляет сигнал
+        ingredient_rows_deleted с id их рецептов. Сигналов на каждую
+        строку нет: при удалении многих строк рецепт обновлялся бы
+        на каждую строку, а при каскадном удалении рецепта - зря.
+        """
+        recipe_ids = set(
+            self.order_by().values_list('recipe_id', flat=True)
+        )
+        deleted = super().delete()
+        if recipe_ids:
+            ingredient_rows_deleted.send(
+                sender=self.model, recipe_ids=recipe_ids
+            )
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
 
 class IngredientRecipe(models.Model):
     ingredient = models.ForeignKey(
@@ -118,6 +376,8 @@ class IngredientRecipe(models.Model):
         on_delete=models.CASCADE,
         related_name='ingredientes',
         verbose_name='Ингредиент',
+        # поиск по рецепту обслуживает индекс ingredientrecipe_recipe_idx
+        db_index=False,
     )
     amount = models.PositiveSmallIntegerField(
         verbose_name='Количество',
@@ -133,14 +393,32 @@ class IngredientRecipe(models.Model):
         ],
     )
 
+    objects = IngredientRecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
         ordering = ('recipe',)
+        indexes = [
+            # строки рецепта с id ингредиента и количеством читаются
+            # из индекса без обращения к таблице (INCLUDE на PostgreSQL)
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                include=['amount'],
+                name='ingredientrecipe_recipe_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.ingredient} в {self.recipe} в кол-ве {self.amount}'[:30]
 
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        ingredient_rows_deleted.send(
+            sender=IngredientRecipe, recipe_ids={self.recipe_id}
+        )
+        return deleted
+
 
 class BaseUserRecipeModel(BaseUserModel):
     recipe = models.ForeignKey(
@@ -148,6 +426,11 @@ class BaseUserRecipeModel(BaseUserModel):
         on_delete=models.CASCADE,
         verbose_name='Рецепт',
     )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now,
+        db_index=True,
+    )
 
     class Meta:
         abstract = True
@@ -177,3 +460,355 @@ class ShoppingCart(BaseUserRecipeModel):
         verbose_name = 'Рецепт в корзине'
         verbose_name_plural = 'Рецепты в корзине'
         default_related_name = 'shopping_carts'
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+
+    def add_amounts(self, *sources):
+        """
+        Прибавляет к позициям списка покупок строки выборок sources
+        с аннотациями row_user, row_ingredient и row_amount одним
+        INSERT ... ON CONFLICT; отсутствующие позиции создаются.
+        """
+        first, *others = (
+            source.order_by().values_list(
+                'row_user', 'row_ingredient', 'row_amount'
+            )
+            for source in sources
+        )
+        source = first.union(*others, all=True) if others else first
+        sql, params = source.query.sql_with_params()
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, ingredient_id, total_amount) '
+                f'{sql} ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+                f'SET total_amount = {table}.total_amount '
+                f'+ excluded.total_amount',
+                params,
+            )
+
+    def add_recipe(self, user_id, recipe_id, sign=1):
+        """Добавляет (sign=1) или вычитает (sign=-1) рецепт из списка."""
+        self.add_amounts(
+            IngredientRecipe.objects.filter(recipe_id=recipe_id).annotate(
+                row_user=Value(user_id),
+                row_ingredient=F('ingredient_id'),
+                row_amount=F('amount') * sign,
+            )
+        )
+        if sign < 0:
+            self.filter(user_id=user_id, total_amount__lte=0).delete()
+
+    def apply_recipe_change(self, recipe_id, before, after):
+        """
+        Переносит изменение ингредиентов рецепта (словари id -> количество
+        до и после) в списки покупок всех, у кого рецепт в корзине.
+        """
+        deltas = {
+            ingredient_id: after.get(ingredient_id, 0)
+            - before.get(ingredient_id, 0)
+            for ingredient_id in before.keys() | after.keys()
+        }
+        sources = [
+            ShoppingCart.objects.filter(recipe_id=recipe_id).annotate(
+                row_user=F('user_id'),
+                row_ingredient=Value(ingredient_id),
+                row_amount=Value(delta),
+            )
+            for ingredient_id, delta in sorted(deltas.items())
+            if delta
+        ]
+        if not sources:
+            return
+        self.add_amounts(*sources)
+        if min(deltas.values()) < 0:
+            self.filter(
+                user__shopping_carts__recipe_id=recipe_id,
+                total_amount__lte=0,
+            ).delete()
+
+
+class ShoppingListItem(BaseUserModel):
+    """
+    Материализованный список покупок: сумма количества ингредиента
+    по всем рецептам в корзине пользователя. Поддерживается
+    приращениями при изменении корзины и ингредиентов рецептов.
+    """
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.IntegerField(
+        verbose_name='Количество',
+    )
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        default_related_name = 'shopping_list_items'
+        ordering = ('user',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}'[:30]
+
+
+class FeedEntryQuerySet(models.QuerySet):
+
+    def add_rows(self, source):
+        """
+        Добавляет записи из выборки рецептов source с аннотацией row_user
+        одним INSERT ... SELECT; существующие записи пропускаются.
+        """
+        # столбцы модели попадают в SELECT раньше аннотаций,
+        # поэтому порядок задаётся только аннотациями
+        sql, params = source.order_by().annotate(
+            row_recipe=F('pk'), row_pub_date=F('pub_date')
+        ).values_list(
+            'row_user', 'row_recipe', 'row_pub_date'
+        ).query.sql_with_params()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.model._meta.db_table} '
+                f'(user_id, recipe_id, pub_date) {sql} '
+                f'ON CONFLICT (user_id, recipe_id) DO NOTHING',
+                params,
+            )
+
+    def fan_out(self, recipe_ids, batch_size=FEED_BATCH_SIZE):
+        """
+        Добавляет рецепты recipe_ids в ленты подписчиков их авторов.
+        Подписчики обрабатываются диапазонами по batch_size, каждый
+        диапазон - отдельный INSERT в своей транзакции.
+        """
+        recipe_ids = list(recipe_ids)
+        subscribers = sorted(set(Subscription.objects.filter(
+            author__in=Recipe.objects.filter(
+                pk__in=recipe_ids
+            ).values('author_id')
+        ).values_list('user_id', flat=True)))
+        recipes = Recipe.objects.filter(pk__in=recipe_ids).annotate(
+            row_user=F('author__subscribers__user_id')
+        )
+        for start in range(0, len(subscribers), batch_size):
+            batch = subscribers[start:start + batch_size]
+            with transaction.atomic(using=self.db):
+                # подписки перечитываются в INSERT: отписавшиеся
+                # за время рассылки пользователи пропускаются
+                self.add_rows(recipes.filter(
+                    row_user__range=(batch[0], batch[-1])
+                ))
+
+    def backfill(self, user_id, author_id):
+        """Добавляет в ленту пользователя все рецепты автора."""
+        self.add_rows(Recipe.objects.filter(author_id=author_id).annotate(
+            row_user=Value(user_id)
+        ))
+
+    def prune(self, user_id, author_id):
+        """Убирает из ленты пользователя рецепты автора."""
+        self.filter(user_id=user_id, recipe__author_id=author_id).delete()
+
+
+class FeedEntry(BaseUserModel):
+    """
+    Лента подписок: запись на каждый рецепт автора, на которого
+    подписан пользователь. Заполняется при публикации рецепта
+    (рассылка подписчикам) и при подписке, поэтому лента читается
+    по индексу без JOIN подписок с рецептами.
+    """
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        # поиск по пользователю обслуживает индекс feedentry_user_idx
+        db_index=False,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        default_related_name = 'feed_entries'
+        ordering = ('-pub_date', '-id')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry',
+            )
+        ]
+        indexes = [
+            # keyset-пагинация ленты пользователя по (-pub_date, -id)
+            models.Index(
+                fields=['user', '-pub_date', '-id'],
+                name='feedentry_user_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'[:30]
+
+
+class RecipeScore(models.Model):
+    """
+    Рейтинги рецепта для сортировки списка: популярность по счётчикам
+    избранного и корзины и трендовость с затуханием по времени.
+    Пересчитываются командой update_recipe_scores.
+
+    trending хранится относительно опорной даты ScoreCheckpoint.epoch:
+    вклад события умножается на 2 ** (t / период полураспада), поэтому
+    старые значения не нужно уменьшать при каждом пересчёте, а порядок
+    совпадает с порядком затухающих рейтингов.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт',
+    )
+    popular = models.FloatField(
+        verbose_name='Популярность',
+        default=0,
+    )
+    trending = models.FloatField(
+        verbose_name='Трендовость',
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата пересчёта',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(
+                fields=['-popular', '-recipe'],
+                name='recipescore_popular_idx',
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'],
+                name='recipescore_trending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popular} / {self.trending}'
+
+
+class ScoreCheckpoint(models.Model):
+    """
+    Отметка пересчёта рейтингов, единственная запись: дата, до которой
+    учтены записи избранного и корзины, и опорная дата трендовых
+    рейтингов.
+    """
+
+    updated_at = models.DateTimeField(
+        verbose_name='Дата пересчёта',
+        auto_now=True,
+    )
+    counted_until = models.DateTimeField(
+        verbose_name='Учтены записи, добавленные до',
+        null=True,
+        help_text='Пусто, если пересчётов ещё не было.',
+    )
+    epoch = models.DateTimeField(
+        verbose_name='Опорная дата трендовых рейтингов',
+    )
+
+    class Meta:
+        verbose_name = 'Пересчёт рейтингов'
+        verbose_name_plural = 'Пересчёты рейтингов'
+
+    def __str__(self):
+        return f'{self.updated_at:%Y-%m-%d %H:%M}'
+
+
+class RecipeSignature(models.Model):
+    """
+    MinHash-подпись множества ингредиентов и тегов рецепта: по значению
+    на хеш-функцию, доля совпавших значений двух подписей оценивает
+    коэффициент Жаккара. Обновляется при сохранении рецепта через API
+    и командой rebuild_recipe_signatures.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт',
+    )
+    signature = models.BinaryField(
+        verbose_name='Подпись',
+    )
+
+    class Meta:
+        verbose_name = 'Подпись рецепта'
+        verbose_name_plural = 'Подписи рецептов'
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class SignatureBand(models.Model):
+    """
+    Полоса LSH-индекса: хеш части подписи рецепта. Рецепты с общим
+    хешем хотя бы в одной полосе - кандидаты в похожие.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='signature_bands',
+        verbose_name='Рецепт',
+        db_index=False,
+    )
+    band = models.PositiveSmallIntegerField(
+        verbose_name='Номер полосы',
+    )
+    bucket = models.BigIntegerField(
+        verbose_name='Хеш полосы',
+    )
+
+    class Meta:
+        verbose_name = 'Полоса подписи'
+        verbose_name_plural = 'Полосы подписей'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'band'],
+                name='unique_signature_band',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['band', 'bucket'],
+                name='signatureband_bucket_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.band}'
@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.constraints import (SCORE_CART_WEIGHT, SCORE_COMMIT_DELAY,
+                              SCORE_FAVORITE_WEIGHT, TRENDING_HALF_LIFE_HOURS,
+                              TRENDING_REBASE_HALF_LIVES)
+from recipes.models import (Favorite, Recipe, RecipeScore, ScoreCheckpoint,
+                            ShoppingCart)
+
+# рейтинги изменены через UPDATE, без post_save: аргумент updated
+scores_updated = Signal()
+
+# id единственной отметки пересчёта
+CHECKPOINT_ID = 1
+
+
+def half_lives(since, now):
+    """Количество периодов полураспада трендового рейтинга."""
+    return (now - since).total_seconds() / 3600 / TRENDING_HALF_LIFE_HOURS
+
+
+def popular_expression(prefix=''):
+    return (
+        SCORE_FAVORITE_WEIGHT * F(f'{prefix}favorites_count')
+        + SCORE_CART_WEIGHT * F(f'{prefix}in_carts_count')
+    )
+
+
+def new_rows(model, counted_from, counted_until):
+    """Записи model, добавленные в промежуток (counted_from, counted_until]."""
+    rows = model.objects.filter(created_at__lte=counted_until)
+    if counted_from is not None:
+        rows = rows.filter(created_at__gt=counted_from)
+    return rows
+
+
+def count_new_rows(rows):
+    """Подзапрос: количество записей rows для рецепта рейтинга."""
+    return Coalesce(Subquery(
+        rows.filter(recipe=OuterRef('recipe')).order_by().values(
+            'recipe'
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def create_missing_scores():
+    RecipeScore.objects.bulk_create(
+        (
+            RecipeScore(recipe_id=pk)
+            for pk in Recipe.objects.filter(
+                score__isnull=True
+            ).values_list('pk', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def rebase_trending(factor):
+    RecipeScore.objects.filter(trending__gt=0).update(
+        trending=F('trending') * factor
+    )
+
+
+def add_new_events(favorites, carts, weight, now):
+    """
+    Добавляет к трендовым рейтингам новые записи избранного и корзины
+    одним UPDATE по затронутым рецептам.
+    """
+    return RecipeScore.objects.filter(
+        Q(recipe__in=favorites.values('recipe'))
+        | Q(recipe__in=carts.values('recipe'))
+    ).update(
+        trending=F('trending') + weight * (
+            SCORE_FAVORITE_WEIGHT * count_new_rows(favorites)
+            + SCORE_CART_WEIGHT * count_new_rows(carts)
+        ),
+        updated_at=now,
+    )
+
+
+def sync_popular(now):
+    """
+    Переносит в рейтинги популярности счётчики рецептов. Обновляются
+    только расходящиеся строки, в том числе после удалений.
+    """
+    return RecipeScore.objects.exclude(
+        popular=popular_expression('recipe__')
+    ).update(
+        popular=Subquery(
+            Recipe.objects.filter(pk=OuterRef('recipe')).values(
+                popular=popular_expression()
+            )
+        ),
+        updated_at=now,
+    )
+
+
+@transaction.atomic
+def update_scores(now=None):
+    """
+    Пересчитывает рейтинги рецептов с последнего пересчёта и
+    возвращает количество изменённых строк.
+
+    Новые записи избранного и корзины находятся по дате добавления
+    после отметки прошлого пересчёта и получают вес на момент текущего.
+    Записи моложе SCORE_COMMIT_DELAY секунд ждут следующего пересчёта,
+    поэтому учитываются и транзакции, зафиксированные уже после начала
+    пересчёта. Вес растёт как 2 ** (t / период полураспада) от опорной
+    даты, так что уже накопленные рейтинги не пересчитываются.
+    """
+    now = now or timezone.now()
+    # отметка создаётся до блокировки: одновременные первые пересчёты
+    # ждут друг друга на одной строке, а не учитывают записи дважды
+    ScoreCheckpoint.objects.get_or_create(
+        pk=CHECKPOINT_ID, defaults={'epoch': now}
+    )
+    checkpoint = ScoreCheckpoint.objects.select_for_update().get(
+        pk=CHECKPOINT_ID
+    )
+    counted_from = checkpoint.counted_until
+    counted_until = now - timedelta(seconds=SCORE_COMMIT_DELAY)
+    if counted_from is not None:
+        counted_until = max(counted_until, counted_from)
+    epoch = checkpoint.epoch
+    create_missing_scores()
+    if half_lives(epoch, now) > TRENDING_REBASE_HALF_LIVES:
+        rebase_trending(2 ** -half_lives(epoch, now))
+        epoch = now
+    updated = add_new_events(
+        new_rows(Favorite, counted_from, counted_until),
+        new_rows(ShoppingCart, counted_from, counted_until),
+        2 ** half_lives(epoch, now), now,
+    )
+    updated += sync_popular(now)
+    checkpoint.counted_until = counted_until
+    checkpoint.epoch = epoch
+    checkpoint.save()
+    if updated:
+        transaction.on_commit(
+            lambda: scores_updated.send(sender=RecipeScore, updated=updated)
+        )
+    return updated
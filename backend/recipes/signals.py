@@ -0,0 +1,188 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.counters import change_counter
+from recipes.feed import schedule_fan_out
+from recipes.images import schedule_variants
+from recipes.models import (Favorite, FeedEntry, Ingredient, IngredientRecipe,
+                            Recipe, RecipeScore, ShoppingCart,
+                            ShoppingListItem, Tag, ingredient_rows_deleted)
+from users.models import CustomUser, Subscription
+
+# модель записи: (модель со счётчиком, внешний ключ записи, поле счётчика)
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Recipe: (CustomUser, 'author_id', 'recipes_count'),
+}
+
+
+def touch_recipes(queryset):
+    """Обновляет дату изменения рецептов без вызова save()."""
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=IngredientRecipe)
+def touch_recipe_of_ingredient_row(instance, **kwargs):
+    touch_recipes(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(ingredient_rows_deleted)
+def touch_recipes_of_deleted_rows(recipe_ids, **kwargs):
+    touch_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_relation_change(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        relation = 'tags' if sender is Recipe.tags.through else 'ingredients'
+        touch_recipes(Recipe.objects.filter(**{relation: instance}))
+
+
+@receiver(post_save, sender=Tag)
+def touch_recipes_with_tag(instance, created, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_with_ingredient(instance, created, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_losing_ingredient(instance, **kwargs):
+    """Строки удаляемого ингредиента удаляются каскадом без сигналов."""
+    recipe_ids = list(
+        Recipe.objects.filter(ingredients=instance).values_list(
+            'pk', flat=True
+        )
+    )
+    touch_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+    schedule_search_index(recipe_ids)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+def increment_counter(sender, instance, created, **kwargs):
+    if created:
+        model, attname, field = COUNTERS[sender]
+        change_counter(model, getattr(instance, attname), field, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+def decrement_counter(sender, instance, **kwargs):
+    model, attname, field = COUNTERS[sender]
+    change_counter(model, getattr(instance, attname), field, -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(instance, **kwargs):
+    # до удаления: при каскаде от рецепта его ингредиенты ещё на месте
+    ShoppingListItem.objects.add_recipe(
+        instance.user_id, instance.recipe_id, sign=-1
+    )
+
+
+def schedule_search_index(recipe_ids):
+    """Обновляет поисковый индекс рецептов после фиксации транзакции."""
+    transaction.on_commit(
+        partial(Recipe.objects.update_search_index, list(recipe_ids))
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def index_recipe(instance, update_fields=None, **kwargs):
+    if update_fields and not {'name', 'text'} & set(update_fields):
+        return
+    schedule_search_index([instance.pk])
+
+
+@receiver(post_save, sender=IngredientRecipe)
+def index_recipe_of_ingredient_row(instance, **kwargs):
+    schedule_search_index([instance.recipe_id])
+
+
+@receiver(ingredient_rows_deleted)
+def index_recipes_of_deleted_rows(recipe_ids, **kwargs):
+    schedule_search_index(recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_recipes_on_ingredients_change(instance, action, reverse, pk_set,
+                                        **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_search_index([instance.pk])
+    elif pk_set:
+        schedule_search_index(pk_set)
+
+
+@receiver(post_save, sender=Ingredient)
+def index_recipes_with_ingredient(instance, created, **kwargs):
+    if not created:
+        schedule_search_index(
+            Recipe.objects.filter(ingredients=instance).values_list(
+                'pk', flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_image_variants(instance, **kwargs):
+    """Новое изображение рецепта получает копии после фиксации транзакции."""
+    if instance.image and (
+        instance.image_variants.get('source') != instance.image.name
+    ):
+        transaction.on_commit(partial(schedule_variants, instance))
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_feeds(instance, created, **kwargs):
+    """Новый рецепт попадает в ленты подписчиков после фиксации."""
+    if created:
+        transaction.on_commit(partial(schedule_fan_out, [instance.pk]))
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_score(instance, created, **kwargs):
+    """Новый рецепт сразу попадает в сортировки по рейтингам."""
+    if created:
+        RecipeScore.objects.create(recipe=instance)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(instance, created, **kwargs):
+    if created:
+        FeedEntry.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def prune_feed(instance, **kwargs):
+    FeedEntry.objects.prune(instance.user_id, instance.author_id)
@@ -0,0 +1,157 @@
+from collections import defaultdict, namedtuple
+from functools import reduce
+from itertools import chain
+from operator import or_
+
+import numpy as np
+from django.db.models import Q
+
+from core.constraints import (SIGNATURE_BAND_ROWS, SIGNATURE_BANDS,
+                              SIGNATURE_SEED)
+from core.db import insert_rows
+from recipes.models import (IngredientRecipe, Recipe, RecipeSignature,
+                            SignatureBand)
+
+# простое число Мерсенна: a * x + b по модулю не переполняет uint64
+PRIME = (1 << 31) - 1
+SIGNATURE_SIZE = SIGNATURE_BANDS * SIGNATURE_BAND_ROWS
+
+# коэффициенты хеш-функций (a * x + b) % PRIME и свёртки полосы в хеш
+_generator = np.random.default_rng(SIGNATURE_SEED)
+A = _generator.integers(1, PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+B = _generator.integers(0, PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+BAND_WEIGHTS = _generator.integers(
+    1, 1 << 63, SIGNATURE_BAND_ROWS, dtype=np.uint64
+)
+
+SimilarRecipe = namedtuple('SimilarRecipe', 'recipe_id similarity')
+
+
+def get_tokens(ingredient_ids, tag_ids):
+    """
+    Множество рецепта: чётные элементы - ингредиенты, нечётные - теги,
+    чтобы id ингредиента и тега не совпадали.
+    """
+    return [2 * pk for pk in ingredient_ids] + [2 * pk + 1 for pk in tag_ids]
+
+
+def recipe_tokens(recipe_ids):
+    """Собирает множества рецептов из БД двумя запросами."""
+    ingredients = defaultdict(list)
+    rows = IngredientRecipe.objects.filter(
+        recipe__in=recipe_ids
+    ).order_by().values_list('recipe_id', 'ingredient_id')
+    for recipe_id, ingredient_id in rows:
+        ingredients[recipe_id].append(ingredient_id)
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('recipe_id', 'tag_id')
+    for recipe_id, tag_id in rows:
+        tags[recipe_id].append(tag_id)
+    return {
+        recipe_id: get_tokens(ingredients[recipe_id], tags[recipe_id])
+        for recipe_id in recipe_ids
+    }
+
+
+def minhash(token_lists):
+    """
+    MinHash-подписи непустых множеств: минимумы хеш-функций по
+    элементам. Хеши всех элементов считаются одной матрицей, минимумы
+    по множествам - np.minimum.reduceat по её отрезкам.
+    """
+    sizes = np.fromiter(map(len, token_lists), dtype=np.int64)
+    values = np.fromiter(
+        chain.from_iterable(token_lists), dtype=np.uint64
+    )[:, None] % PRIME
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return np.minimum.reduceat(
+        (values * A + B) % PRIME, starts, axis=0
+    ).astype(np.uint32)
+
+
+def band_buckets(signatures):
+    """Хеши полос подписей: массив (рецепты, полосы) int64."""
+    bands = signatures.astype(np.uint64).reshape(
+        -1, SIGNATURE_BANDS, SIGNATURE_BAND_ROWS
+    )
+    # умножение и сложение uint64 по модулю 2 ** 64
+    return (bands * BAND_WEIGHTS).sum(axis=2).view(np.int64)
+
+
+def to_signature(value):
+    return np.frombuffer(value, dtype=np.uint32)
+
+
+def save_signatures(tokens):
+    """
+    Сохраняет подписи и полосы LSH рецептов по словарю id рецепта ->
+    множество. Подписи считаются в NumPy, полосы всех рецептов -
+    одним вычислением по матрице подписей.
+    """
+    recipe_ids = list(tokens)
+    signed = [recipe_id for recipe_id in recipe_ids if tokens[recipe_id]]
+    RecipeSignature.objects.filter(recipe__in=recipe_ids).delete()
+    SignatureBand.objects.filter(recipe__in=recipe_ids).delete()
+    if not signed:
+        return 0
+    signatures = minhash([tokens[recipe_id] for recipe_id in signed])
+    # строк полос в SIGNATURE_BANDS раз больше, чем рецептов: они
+    # пишутся executemany без создания объектов моделей
+    insert_rows(
+        RecipeSignature, ('recipe', 'signature'),
+        (
+            (recipe_id, signature.tobytes())
+            for recipe_id, signature in zip(signed, signatures)
+        ),
+    )
+    insert_rows(
+        SignatureBand, ('recipe', 'band', 'bucket'),
+        (
+            (recipe_id, band, bucket)
+            for recipe_id, buckets in zip(signed, band_buckets(signatures))
+            for band, bucket in enumerate(buckets.tolist())
+        ),
+    )
+    return len(signed)
+
+
+def refresh_signatures(recipe_ids):
+    """Пересчитывает подписи рецептов по их составу и тегам в БД."""
+    return save_signatures(recipe_tokens(list(dict.fromkeys(recipe_ids))))
+
+
+def find_similar(recipe_id, limit):
+    """
+    Возвращает до limit рецептов, похожих на recipe_id, по убыванию
+    оценки коэффициента Жаккара, или None, если у рецепта нет подписи.
+
+    Кандидаты - рецепты с общим хешем хотя бы одной полосы, они
+    выбираются по индексу (полоса, хеш) вместе с подписями одним
+    запросом; оценки считаются сравнением подписей в NumPy.
+    """
+    value = RecipeSignature.objects.filter(recipe=recipe_id).values_list(
+        'signature', flat=True
+    ).first()
+    if value is None:
+        return None
+    signature = to_signature(value)
+    buckets = band_buckets(signature)[0].tolist()
+    candidates = list(RecipeSignature.objects.filter(
+        recipe__in=SignatureBand.objects.filter(reduce(or_, (
+            Q(band=band, bucket=bucket) for band, bucket in enumerate(buckets)
+        ))).exclude(recipe=recipe_id).values('recipe')
+    ).values_list('recipe_id', 'signature'))
+    if not candidates:
+        return []
+    recipe_ids = np.array([pk for pk, _ in candidates], dtype=np.int64)
+    similarity = (np.vstack([
+        to_signature(value) for _, value in candidates
+    ]) == signature).mean(axis=1)
+    order = np.lexsort((-recipe_ids, -similarity))[:limit]
+    return [
+        SimilarRecipe(*row) for row in zip(
+            recipe_ids[order].tolist(), similarity[order].tolist()
+        )
+    ]
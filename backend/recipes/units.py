@@ -0,0 +1,132 @@
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+
+# единица измерения -> (каноническая единица, множитель): масса
+# приводится к граммам, объём - к миллилитрам
+UNIT_CONVERSIONS = {
+    'мг': ('г', 0.001),
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'капля': ('мл', 0.05),
+    'ч. л.': ('мл', 5),
+    'ст. л.': ('мл', 15),
+    'стакан': ('мл', 200),
+}
+
+# другие написания единиц из UNIT_CONVERSIONS
+UNIT_ALIASES = {
+    'гр': 'г',
+    'грамм': 'г',
+    'килограмм': 'кг',
+    'миллилитр': 'мл',
+    'литр': 'л',
+    'ч.л.': 'ч. л.',
+    'чайная ложка': 'ч. л.',
+    'ст.л.': 'ст. л.',
+    'столовая ложка': 'ст. л.',
+}
+
+# количество знаков после запятой в сумме в канонической единице
+AMOUNT_PRECISION = 2
+
+# сколько строк списка покупок суммируется за один раз
+AGGREGATE_CHUNK_SIZE = 2000
+
+Conversion = namedtuple('Conversion', 'unit factor')
+
+
+def normalize_unit(unit):
+    """Приводит запись единицы к виду для поиска: регистр, пробелы."""
+    return ' '.join(unit.casefold().replace('ё', 'е').split())
+
+
+class UnitRegistry:
+    """
+    Реестр единиц измерения с множителями к каноническим единицам.
+    Единицы без множителя (шт., по вкусу, пучок) не переводятся
+    и остаются отдельными строками списка.
+    """
+
+    def __init__(self, conversions, aliases):
+        self.conversions = {
+            normalize_unit(unit): Conversion(*conversion)
+            for unit, conversion in conversions.items()
+        }
+        for alias, unit in aliases.items():
+            self.conversions[normalize_unit(alias)] = self.conversions[
+                normalize_unit(unit)
+            ]
+
+    def get(self, unit):
+        return self.conversions.get(normalize_unit(unit), Conversion(unit, 1))
+
+    def aggregate(self, rows):
+        """
+        Суммирует строки (название, единица, количество), упорядоченные
+        по названию, по названию и канонической единице.
+
+        Строки читаются пачками не меньше AGGREGATE_CHUNK_SIZE из целых
+        групп одного названия, поэтому память ограничена размером пачки,
+        а результат отдаётся генератором в порядке входных названий.
+        Реестр опрашивается один раз на каждую различную единицу.
+        """
+        conversions = {}
+        chunk = []
+        for _, group in groupby(rows, key=itemgetter(0)):
+            chunk.extend(group)
+            if len(chunk) >= AGGREGATE_CHUNK_SIZE:
+                yield from self.aggregate_chunk(chunk, conversions)
+                chunk = []
+        yield from self.aggregate_chunk(chunk, conversions)
+
+    def aggregate_chunk(self, rows, conversions):
+        """
+        Переводит и суммирует количества пачки одним np.bincount.
+        conversions - найденные множители единиц, общие для всех пачек.
+        """
+        names = {}
+        groups = {}
+        unit_index = []
+        group_index = []
+        amounts = []
+        for name, unit, amount in rows:
+            if unit not in conversions:
+                conversions[unit] = (len(conversions), self.get(unit))
+            position, conversion = conversions[unit]
+            unit_index.append(position)
+            names.setdefault(name, len(names))
+            group_index.append(
+                groups.setdefault((name, conversion.unit), len(groups))
+            )
+            amounts.append(amount)
+        factors = np.array(
+            [conversion.factor for _, conversion in conversions.values()],
+            dtype=float,
+        )
+        totals = np.bincount(
+            np.array(group_index, dtype=np.int64),
+            weights=np.array(amounts, dtype=float) * factors[
+                np.array(unit_index, dtype=np.int64)
+            ],
+            minlength=len(groups),
+        ).round(AMOUNT_PRECISION)
+        return [
+            (name, unit, format_amount(totals[group]))
+            for (name, unit), group in sorted(
+                groups.items(), key=lambda item: (names[item[0][0]], item[0])
+            )
+        ]
+
+
+def format_amount(value):
+    """Целые количества остаются целыми числами."""
+    return int(value) if value.is_integer() else float(value)
+
+
+# реестр строится один раз при импорте модуля в процессе
+unit_registry = UnitRegistry(UNIT_CONVERSIONS, UNIT_ALIASES)
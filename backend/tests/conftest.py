@@ -0,0 +1,219 @@
+from contextlib import contextmanager
+from time import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import bump_pending_versions, pending_bumps
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import CustomUser, Subscription
+
+# размеры наполнения базы: число запросов не должно от них зависеть
+DATA_SIZES = (1, 5, 25)
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1Pe'
+    'AAAADElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC'
+)
+
+TAGS_PER_RECIPE = 2
+INGREDIENTS_PER_RECIPE = 3
+RECIPES_PER_AUTHOR = 2
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Проверяет, что блок выполнил не больше num SQL-запросов.
+    При превышении бюджета выводит все перехваченные запросы.
+    """
+
+    @contextmanager
+    def check(num):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        performed = len(context.captured_queries)
+        if performed > num:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            pytest.fail(
+                f'Бюджет {num} SQL-запросов превышен: выполнено '
+                f'{performed}.\n{queries}',
+                pytrace=False,
+            )
+
+    return check
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_VARIANT_WORKERS = 0
+    settings.FEED_FANOUT_WORKERS = 0
+    settings.PASSWORD_HASHERS = [
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+    cache.clear()
+    # смены версий, отложенные до фиксации в прошлых тестах, не выполнятся
+    pending_bumps.namespaces = set()
+
+
+def other_process_cache():
+    """
+    Подменяет кэш Django отдельным LocMemCache: так работает
+    management-команда или другой воркер, кэш которых не общий
+    с процессом сервера.
+    """
+    return override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'other-process',
+        },
+    })
+
+
+@contextmanager
+def after_version_timeout():
+    """Переводит часы кэша за срок CACHE_VERSION_TIMEOUT."""
+    now = time() + settings.CACHE_VERSION_TIMEOUT + 1
+    with mock.patch.object(locmem, 'time', SimpleNamespace(time=lambda: now)):
+        yield
+
+
+def create_user(username):
+    return CustomUser.objects.create_user(
+        email=f'{username}@foodgram.ru',
+        username=username,
+        password='foodgram-password',
+        first_name=username,
+        last_name=username,
+    )
+
+
+@contextmanager
+def committed():
+    """
+    Меняет отложенные до фиксации версии кэша, как после фиксации
+    данных фикстуры. Остальные действия после фиксации не выполняются.
+    """
+    yield
+    bump_pending_versions()
+
+
+@pytest.fixture
+def user():
+    with committed():
+        return create_user('reader')
+
+
+@pytest.fixture
+def author():
+    with committed():
+        return create_user('writer')
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def author_client(author):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=author)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def tags():
+    with committed():
+        return [
+            Tag.objects.create(
+                name=f'Тег {i}', slug=f'tag-{i}', color=f'#0000{i:02x}'
+            )
+            for i in range(TAGS_PER_RECIPE + 1)
+        ]
+
+
+@pytest.fixture
+def ingredients():
+    with committed():
+        return [
+            Ingredient.objects.create(
+                name=f'Ингредиент {i}', measurement_unit='г'
+            )
+            for i in range(INGREDIENTS_PER_RECIPE * 2)
+        ]
+
+
+def create_recipe(author, tags, ingredients, name='Рецепт'):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание',
+        image='recipes/images/recipe.png',
+        cooking_time=10,
+    )
+    recipe.tags.set(tags[:TAGS_PER_RECIPE])
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=i + 1)
+        for i, ingredient in enumerate(ingredients[:INGREDIENTS_PER_RECIPE])
+    )
+    return recipe
+
+
+@pytest.fixture
+def recipe(author, tags, ingredients):
+    with committed():
+        return create_recipe(author, tags, ingredients)
+
+
+@pytest.fixture
+def seed(user, tags, ingredients):
+    """
+    Наполняет базу: size авторов с рецептами, на всех подписан user,
+    половина рецептов в избранном и корзине user.
+    """
+
+    def make(size):
+        with committed():
+            return fill(size)
+
+    def fill(size):
+        recipes = []
+        for i in range(size):
+            author = create_user(f'author{i}')
+            Subscription.objects.create(user=user, author=author)
+            for j in range(RECIPES_PER_AUTHOR):
+                recipes.append(create_recipe(
+                    author, tags, ingredients, name=f'Рецепт {i}-{j}'
+                ))
+        Favorite.objects.bulk_create(
+            Favorite(user=user, recipe=recipe) for recipe in recipes[::2]
+        )
+        # корзина создаётся по одной записи: сигналы ведут список покупок
+        for recipe in recipes[::2]:
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        return recipes
+
+    return make
@@ -0,0 +1,48 @@
+import re
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from api.management.commands.audit_queries import EXPLAINERS
+
+pytestmark = pytest.mark.django_db
+
+
+def audit(**options):
+    stdout = StringIO()
+    call_command('audit_queries', repeat=1, stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+def test_endpoints_are_explained(seed, user):
+    seed(2)
+
+    output = audit(user=user.username)
+
+    statuses = re.findall(r'^GET \S+ -> (\d+)$', output, re.MULTILINE)
+    assert len(statuses) == 11
+    assert set(statuses) == {'200'}
+    assert re.search(r'Запросов: [1-9]\d*, с замечаниями: \d+$', output)
+
+
+def test_scans_are_flagged_and_index_lookups_are_not(recipe):
+    explain = EXPLAINERS[connection.vendor]
+    with connection.cursor() as cursor:
+        scan = explain(
+            cursor, 'SELECT id FROM recipes_recipe WHERE cooking_time = 1'
+        )
+        lookup = explain(
+            cursor,
+            f'SELECT id FROM recipes_recipe WHERE author_id = '
+            f'{recipe.author_id} ORDER BY pub_date DESC, id DESC',
+        )
+
+    assert any('recipes_recipe' in issue for issue in scan)
+    assert lookup == []
+
+
+def test_unknown_user_is_rejected():
+    with pytest.raises(CommandError):
+        audit(user='nobody')
@@ -0,0 +1,114 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.autocomplete import IngredientIndex, get_ingredient_index, normalize
+from recipes.models import Ingredient, IngredientRecipe
+
+pytestmark = pytest.mark.django_db
+
+
+def names(response):
+    assert response.status_code == HTTPStatus.OK
+    return [item['name'] for item in response.data]
+
+
+def test_normalize_casefolds_cyrillic():
+    assert normalize('  Ёжевика  ЛЕСНАЯ ') == 'ежевика лесная'
+
+
+def test_prefix_matches_rank_before_substring_by_usage():
+    rows = [
+        (1, 'сахар', 'г'),
+        (2, 'ванильный сахар', 'г'),
+        (3, 'сахарная пудра', 'г'),
+        (4, 'тростниковый сахар', 'г'),
+        (5, 'соль', 'г'),
+    ]
+    index = IngredientIndex(rows, usage={3: 10, 4: 2})
+    assert [item.id for item in index.search('САХ')] == [3, 1, 4, 2]
+    assert [item.id for item in index.search('сахар', limit=2)] == [3, 1]
+    assert index.search('перец') == []
+
+
+def test_search_is_case_insensitive_for_cyrillic(anonymous_client):
+    Ingredient.objects.create(name='Яблоко', measurement_unit='шт')
+    Ingredient.objects.create(name='ёрш', measurement_unit='г')
+    assert names(
+        anonymous_client.get('/api/ingredients/', {'name': 'ЯБЛ'})
+    ) == ['Яблоко']
+    assert names(
+        anonymous_client.get('/api/ingredients/', {'name': 'Ерш'})
+    ) == ['ёрш']
+
+
+def test_search_ranks_by_recipe_usage(recipe, anonymous_client):
+    used = recipe.ingredientes.values_list('ingredient__name', flat=True)
+    found = names(anonymous_client.get('/api/ingredients/', {'name': 'ингр'}))
+    assert set(found[:len(used)]) == set(used)
+    assert len(found) == Ingredient.objects.count()
+
+
+def test_warm_index_serves_without_database(ingredients, anonymous_client):
+    anonymous_client.get('/api/ingredients/', {'name': 'ингр'})
+    with CaptureQueriesContext(connection) as context:
+        response = anonymous_client.get('/api/ingredients/', {'name': 'дие'})
+    assert names(response) == sorted(item.name for item in ingredients)
+    assert context.captured_queries == []
+
+
+def test_index_rebuilds_on_ingredient_change(
+    ingredients, anonymous_client, django_capture_on_commit_callbacks
+):
+    assert names(
+        anonymous_client.get('/api/ingredients/', {'name': 'мук'})
+    ) == []
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredient.objects.create(name='Мука', measurement_unit='г')
+    assert names(
+        anonymous_client.get('/api/ingredients/', {'name': 'мук'})
+    ) == ['Мука']
+
+
+def test_search_response_matches_orm_fields(ingredients, anonymous_client):
+    response = anonymous_client.get('/api/ingredients/', {'name': 'Ингр'})
+    expected = Ingredient.objects.filter(name__startswith='Ингр')
+    assert response.data == [
+        {'id': item.id, 'name': item.name,
+         'measurement_unit': item.measurement_unit}
+        for item in expected
+    ]
+
+
+def test_usage_counts_recipe_rows(recipe):
+    index = IngredientIndex.from_db()
+    used = set(
+        IngredientRecipe.objects.values_list('ingredient_id', flat=True)
+    )
+    for position, entry in enumerate(index.entries):
+        assert index.usage[position] == (1 if entry.id in used else 0)
+
+
+def test_recipe_change_refreshes_usage_without_rebuild(
+    settings, recipe, ingredients, anonymous_client,
+    django_capture_on_commit_callbacks,
+):
+    unused = Ingredient.objects.exclude(recipes__recipe=recipe).first()
+    search = {'name': unused.name}
+    anonymous_client.get('/api/ingredients/', search)
+    index = get_ingredient_index()
+    position = index.entries.index(
+        (unused.id, unused.name, unused.measurement_unit)
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        IngredientRecipe.objects.create(
+            recipe=recipe, ingredient=unused, amount=1
+        )
+    assert get_ingredient_index() is index
+    assert index.usage[position] == 0
+
+    settings.INGREDIENT_USAGE_TIMEOUT = 0
+    assert get_ingredient_index() is index
+    assert index.usage[position] == 1
@@ -0,0 +1,119 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import get_namespace_version
+from api.filters import get_tag_ids
+from recipes.models import IngredientRecipe, Tag
+from tests.conftest import after_version_timeout, other_process_cache
+
+pytestmark = pytest.mark.django_db
+
+
+def test_anonymous_recipe_list_is_cached(recipe, anonymous_client,
+                                         assert_max_queries):
+    first = anonymous_client.get('/api/recipes/', {'limit': 5})
+    with assert_max_queries(0):
+        second = anonymous_client.get('/api/recipes/', {'limit': 5})
+    assert second.status_code == HTTPStatus.OK
+    assert second.data == first.data
+
+
+def test_query_string_is_normalized(recipe, tags, anonymous_client,
+                                    assert_max_queries):
+    anonymous_client.get(
+        f'/api/recipes/?tags={tags[0].slug}&tags={tags[1].slug}&limit=5'
+    )
+    with assert_max_queries(0):
+        anonymous_client.get(
+            f'/api/recipes/?limit=5&tags={tags[1].slug}&tags={tags[0].slug}'
+        )
+
+
+def test_unknown_params_bypass_cache(recipe, anonymous_client):
+    anonymous_client.get('/api/recipes/', {'is_favorited': 1})
+    with CaptureQueriesContext(connection) as context:
+        response = anonymous_client.get('/api/recipes/', {'is_favorited': 1})
+    assert response.status_code == HTTPStatus.OK
+    assert context.captured_queries
+
+
+def test_authenticated_requests_are_not_cached(recipe, user_client):
+    user_client.get(f'/api/recipes/{recipe.id}/')
+    response = user_client.get(f'/api/recipes/{recipe.id}/')
+    assert response.status_code == HTTPStatus.OK
+    assert not response.data['is_favorited']
+
+
+def test_recipe_write_invalidates_recipes(
+    recipe, ingredients, anonymous_client, django_capture_on_commit_callbacks
+):
+    anonymous_client.get(f'/api/recipes/{recipe.id}/')
+    with django_capture_on_commit_callbacks(execute=True):
+        IngredientRecipe.objects.create(
+            recipe=recipe, ingredient=ingredients[-1], amount=7
+        )
+    response = anonymous_client.get(f'/api/recipes/{recipe.id}/')
+    assert {'id': ingredients[-1].id, 'amount': 7}.items() <= (
+        response.data['ingredients'][-1].items()
+    )
+
+
+def test_version_changes_once_after_commit(
+    recipe, ingredients, django_capture_on_commit_callbacks
+):
+    version = get_namespace_version('recipes')
+    with django_capture_on_commit_callbacks() as callbacks:
+        with transaction.atomic():
+            for ingredient in ingredients[-2:]:
+                IngredientRecipe.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+            recipe.save()
+        # до фиксации параллельный запрос не должен видеть новую версию
+        assert get_namespace_version('recipes') == version
+
+    with CaptureQueriesContext(connection) as context:
+        for callback in callbacks:
+            callback()
+    assert get_namespace_version('recipes') != version
+    assert len([
+        query for query in context.captured_queries
+        if 'api_cacheversion' in query['sql']
+    ]) == 1
+
+
+def test_tag_write_invalidates_tags_and_recipes(
+    recipe, tags, anonymous_client, assert_max_queries,
+    django_capture_on_commit_callbacks,
+):
+    anonymous_client.get('/api/tags/')
+    anonymous_client.get('/api/ingredients/')
+    anonymous_client.get(f'/api/recipes/{recipe.id}/')
+    tag = Tag.objects.get(pk=tags[0].pk)
+    tag.name = 'Завтрак'
+    with django_capture_on_commit_callbacks(execute=True):
+        tag.save()
+    assert anonymous_client.get('/api/tags/').data[0]['name'] == 'Завтрак'
+    recipe_tags = anonymous_client.get(f'/api/recipes/{recipe.id}/').data
+    assert 'Завтрак' in {tag['name'] for tag in recipe_tags['tags']}
+    with assert_max_queries(0):
+        anonymous_client.get('/api/ingredients/')
+
+
+def test_bump_from_other_process_reaches_process_cache(
+    tags, django_capture_on_commit_callbacks
+):
+    assert 'lunch' not in get_tag_ids()
+
+    with other_process_cache(), django_capture_on_commit_callbacks(
+        execute=True
+    ):
+        Tag.objects.create(name='Обед', slug='lunch', color='#00ff00')
+
+    # до истечения CACHE_VERSION_TIMEOUT процесс берёт версию из кэша
+    assert 'lunch' not in get_tag_ids()
+    with after_version_timeout():
+        assert 'lunch' in get_tag_ids()
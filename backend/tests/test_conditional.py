@@ -0,0 +1,127 @@
+from http import HTTPStatus
+
+import pytest
+
+from recipes.models import Favorite, IngredientRecipe, Tag
+from tests.conftest import INGREDIENTS_PER_RECIPE
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('url', [
+    '/api/recipes/', '/api/tags/', '/api/ingredients/',
+])
+def test_list_sends_validators(url, recipe, anonymous_client):
+    response = anonymous_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.has_header('ETag')
+    assert response.has_header('Last-Modified')
+
+
+@pytest.mark.parametrize('use_cache', [True, False])
+def test_if_none_match_returns_not_modified(use_cache, settings, recipe,
+                                            anonymous_client):
+    settings.API_CACHE_TIMEOUT = 60 if use_cache else 0
+    url = f'/api/recipes/{recipe.id}/'
+    etag = anonymous_client.get(url)['ETag']
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag
+
+
+def test_if_modified_since_returns_not_modified(ingredients,
+                                                anonymous_client):
+    last_modified = anonymous_client.get('/api/ingredients/')['Last-Modified']
+    response = anonymous_client.get(
+        '/api/ingredients/', HTTP_IF_MODIFIED_SINCE=last_modified
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_ingredient_row_change_updates_etag(
+    recipe, ingredients, anonymous_client, django_capture_on_commit_callbacks
+):
+    url = f'/api/recipes/{recipe.id}/'
+    etag = anonymous_client.get(url)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        IngredientRecipe.objects.create(
+            recipe=recipe, ingredient=ingredients[-1], amount=1
+        )
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+# способы удалить одну строку ингредиента рецепта
+ROW_DELETES = {
+    'instance': lambda row: row.delete(),
+    'queryset': lambda row: IngredientRecipe.objects.filter(
+        pk=row.pk
+    ).delete(),
+    'ingredient': lambda row: row.ingredient.delete(),
+}
+
+
+@pytest.mark.parametrize('how', ROW_DELETES)
+@pytest.mark.parametrize('use_cache', [True, False])
+def test_ingredient_row_delete_updates_etag(
+    use_cache, how, settings, recipe, anonymous_client,
+    django_capture_on_commit_callbacks,
+):
+    settings.API_CACHE_TIMEOUT = 60 if use_cache else 0
+    url = f'/api/recipes/{recipe.id}/'
+    etag = anonymous_client.get(url)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        ROW_DELETES[how](
+            IngredientRecipe.objects.filter(recipe=recipe).first()
+        )
+
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+    assert len(response.data['ingredients']) == INGREDIENTS_PER_RECIPE - 1
+
+
+def test_tag_change_updates_recipe_list_etag(settings, recipe, tags,
+                                             anonymous_client):
+    settings.API_CACHE_TIMEOUT = 0
+    etag = anonymous_client.get('/api/recipes/')['ETag']
+    tag = Tag.objects.get(pk=tags[0].pk)
+    tag.name = 'Ужин'
+    tag.save()
+    response = anonymous_client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_favorite_change_updates_etag_for_user(
+    recipe, user, user_client, django_capture_on_commit_callbacks
+):
+    url = f'/api/recipes/{recipe.id}/'
+    response = user_client.get(url)
+    assert not response.has_header('Last-Modified')
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorite.objects.create(user=user, recipe=recipe)
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.OK
+    assert response.data['is_favorited']
+
+
+def test_cursor_page_etag_follows_recipe_change(
+    recipe, anonymous_client, django_capture_on_commit_callbacks
+):
+    params = {'pagination': 'cursor'}
+    response = anonymous_client.get('/api/recipes/', params)
+    assert not response.has_header('Last-Modified')
+    etag = response['ETag']
+    response = anonymous_client.get(
+        '/api/recipes/', params, HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.name = 'Другой рецепт'
+        recipe.save()
+    response = anonymous_client.get(
+        '/api/recipes/', params, HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.data['results'][0]['name'] == 'Другой рецепт'
@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+import pytest
+
+from recipes.models import FeedEntry
+from tests.conftest import IMAGE, create_recipe, create_user
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+def feed_ids(client, params=None):
+    response = client.get('/api/recipes/feed/', params)
+    assert response.status_code == HTTPStatus.OK
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+def test_subscription_backfills_and_prunes_feed(
+    user, author, tags, ingredients, user_client
+):
+    old = create_recipe(author, tags, ingredients, name='Старый')
+    other = create_recipe(create_user('other'), tags, ingredients)
+    assert feed_ids(user_client) == []
+
+    Subscription.objects.create(user=user, author=author)
+
+    assert feed_ids(user_client) == [old.id]
+    assert not FeedEntry.objects.filter(recipe=other).exists()
+
+    Subscription.objects.filter(user=user, author=author).delete()
+
+    assert feed_ids(user_client) == []
+
+
+def test_new_recipe_is_fanned_out_in_batches(
+    author, tags, ingredients, author_client,
+    django_capture_on_commit_callbacks
+):
+    subscribers = [create_user(f'subscriber{i}') for i in range(3)]
+    Subscription.objects.bulk_create(
+        Subscription(user=subscriber, author=author)
+        for subscriber in subscribers
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.post('/api/recipes/', {
+            'name': 'Новый',
+            'text': 'Описание',
+            'image': IMAGE,
+            'cooking_time': 5,
+            'tags': [tags[0].id],
+            'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+        }, format='json')
+    assert response.status_code == HTTPStatus.CREATED
+
+    assert set(FeedEntry.objects.filter(
+        recipe_id=response.data['id']
+    ).values_list('user_id', flat=True)) == {
+        subscriber.id for subscriber in subscribers
+    }
+    # повторная рассылка мелкими пачками ничего не дублирует
+    FeedEntry.objects.fan_out([response.data['id']], batch_size=1)
+    assert FeedEntry.objects.count() == len(subscribers)
+
+
+def test_feed_is_paginated_by_cursor(
+    user, author, tags, ingredients, user_client
+):
+    Subscription.objects.create(user=user, author=author)
+    recipes = [
+        create_recipe(author, tags, ingredients, name=f'Рецепт {i}')
+        for i in range(5)
+    ]
+    FeedEntry.objects.fan_out(recipe.id for recipe in recipes)
+
+    seen = []
+    response = user_client.get('/api/recipes/feed/', {'limit': 2})
+    while True:
+        assert response.status_code == HTTPStatus.OK
+        seen += [recipe['id'] for recipe in response.data['results']]
+        if response.data['next'] is None:
+            break
+        response = user_client.get(response.data['next'])
+
+    assert seen == [recipe.id for recipe in reversed(recipes)]
+
+
+def test_feed_requires_authentication(anonymous_client):
+    response = anonymous_client.get('/api/recipes/feed/')
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
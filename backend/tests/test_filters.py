@@ -0,0 +1,115 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, Tag
+from tests.conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def recipe_ids(client, params):
+    response = client.get('/api/recipes/', params)
+    assert response.status_code == HTTPStatus.OK
+    return sorted(recipe['id'] for recipe in response.data['results'])
+
+
+def test_tags_filter_matches_any_slug_without_duplicates(
+    recipe, tags, user_client
+):
+    assert recipe_ids(
+        user_client, {'tags': [tag.slug for tag in tags]}
+    ) == [recipe.id]
+    assert recipe_ids(user_client, {'tags': tags[-1].slug}) == []
+
+
+@pytest.fixture
+def tagged_recipes(author, tags, ingredients):
+    """Рецепты с тегами (0, 1) и (1, 2)."""
+    first = create_recipe(author, tags, ingredients, name='Первый')
+    second = create_recipe(author, tags[1:], ingredients, name='Второй')
+    return first, second
+
+
+def test_tags_modes_do_not_duplicate_recipes(
+    tagged_recipes, tags, user_client
+):
+    first, second = tagged_recipes
+    slugs = [tag.slug for tag in tags]
+
+    response = user_client.get('/api/recipes/', {'tags': slugs})
+
+    assert response.data['count'] == 2
+    assert sorted(
+        recipe['id'] for recipe in response.data['results']
+    ) == sorted([first.id, second.id])
+    assert recipe_ids(
+        user_client, {'tags': slugs[:2], 'tags_mode': 'all'}
+    ) == [first.id]
+    assert recipe_ids(
+        user_client, {'tags': slugs[1:], 'tags_mode': 'all'}
+    ) == [second.id]
+    assert recipe_ids(user_client, {'tags': slugs, 'tags_mode': 'all'}) == []
+    assert recipe_ids(
+        user_client, {'tags': slugs[1], 'tags_mode': 'all'}
+    ) == sorted([first.id, second.id])
+
+
+def test_relation_filters_do_not_use_distinct(
+    tagged_recipes, tags, user, user_client
+):
+    first, second = tagged_recipes
+    Favorite.objects.create(user=user, recipe=first)
+    params = {
+        'tags': [tag.slug for tag in tags],
+        'is_favorited': 1,
+        'is_in_shopping_cart': 0,
+    }
+
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get('/api/recipes/', params)
+
+    assert response.data['count'] == 1
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        first.id
+    ]
+    assert not [
+        query for query in context.captured_queries
+        if 'DISTINCT' in query['sql']
+    ]
+
+
+def test_unknown_tags_mode_is_rejected(recipe, tags, user_client):
+    response = user_client.get(
+        '/api/recipes/', {'tags': tags[0].slug, 'tags_mode': 'some'}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_unknown_tag_slug_is_rejected(recipe, user_client):
+    response = user_client.get('/api/recipes/', {'tags': 'unknown'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_new_tag_slug_is_accepted_after_invalidation(
+    recipe, user_client, django_capture_on_commit_callbacks
+):
+    assert user_client.get(
+        '/api/recipes/', {'tags': 'new'}
+    ).status_code == HTTPStatus.BAD_REQUEST
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Новый', slug='new', color='#00FF00')
+    assert recipe_ids(user_client, {'tags': 'new'}) == []
+
+
+def test_warm_tag_cache_adds_no_queries(recipe, tags, user_client):
+    params = {'tags': tags[0].slug}
+    recipe_ids(user_client, params)
+    with CaptureQueriesContext(connection) as context:
+        recipe_ids(user_client, params)
+    assert not [
+        query for query in context.captured_queries
+        if query['sql'].startswith('SELECT "recipes_tag"."slug"')
+    ]
@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+import pytest
+from PIL import Image
+
+from core.images import available_formats, render_variants
+from recipes.images import save_variants
+from recipes.models import Recipe
+from tests.conftest import IMAGE
+
+pytestmark = pytest.mark.django_db
+
+
+def test_render_variants_does_not_upscale(tmp_path):
+    source = tmp_path / 'source.png'
+    Image.new('RGBA', (800, 400), (255, 0, 0, 128)).save(source)
+    variants = render_variants(
+        source, tmp_path, 'recipe', (320, 640, 1280), available_formats(), 80
+    )
+    assert set(variants) == set(available_formats())
+    for files in variants.values():
+        assert sorted(files) == [320, 640, 800]
+        for width, filename in files.items():
+            with Image.open(tmp_path / filename) as image:
+                assert image.size == (width, width // 2)
+
+
+def test_srcset_falls_back_to_original_until_ready(
+    tags, ingredients, author_client, anonymous_client,
+    django_capture_on_commit_callbacks,
+):
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = author_client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': IMAGE,
+            'tags': [tags[0].id],
+            'ingredients': [{'id': ingredients[0].id, 'amount': 1}],
+        }, format='json')
+    assert response.status_code == HTTPStatus.CREATED
+    assert set(response.data['image_srcset']) == {'original'}
+    assert response.data['image_srcset']['original'].endswith('.png')
+
+    for callback in callbacks:
+        callback()
+    recipe = Recipe.objects.get(pk=response.data['id'])
+    assert recipe.image_variants['source'] == recipe.image.name
+
+    srcset = anonymous_client.get(
+        f'/api/recipes/{recipe.id}/'
+    ).data['image_srcset']
+    assert set(srcset) == set(available_formats())
+    assert srcset['jpeg'].startswith('http://testserver/media/')
+    assert srcset['jpeg'].endswith('.jpg 1w')
+
+
+def test_variants_of_replaced_image_are_discarded(recipe):
+    save_variants(
+        [recipe.pk], 'recipes/images/old.png', {'jpeg': {1: 'a.jpg'}}
+    )
+    recipe.refresh_from_db()
+    assert recipe.image_variants == {}
@@ -0,0 +1,179 @@
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import get_namespace_version
+from api.importer import RecipeImporter
+from core.storage import is_content_name
+from recipes.models import Ingredient, Recipe
+from tests.conftest import IMAGE
+
+pytestmark = pytest.mark.django_db
+
+
+def recipe_line(name, tags, ingredients, **fields):
+    return json.dumps({
+        'name': name,
+        'text': 'Описание',
+        'cooking_time': 15,
+        'image': IMAGE,
+        'tags': tags,
+        'ingredients': ingredients,
+        **fields,
+    }, ensure_ascii=False)
+
+
+@pytest.fixture
+def lines(tags, ingredients):
+    first, second = ingredients[:2]
+    valid = [
+        {'name': first.name, 'measurement_unit': 'г', 'amount': 100},
+        {'name': second.name, 'amount': 2},
+    ]
+    return [
+        recipe_line('Первый', [tags[0].slug, tags[1].name], valid),
+        '{"name": ',
+        recipe_line('Без тегов', ['нет-такого'], valid),
+        '',
+        recipe_line('Без ингредиента', [tags[0].slug], [
+            {'name': 'Нет такого', 'amount': 1},
+        ]),
+        recipe_line('Долгий', [tags[0].slug], valid, cooking_time=0),
+        recipe_line('Второй', [tags[2].slug], valid[:1]),
+        recipe_line('Третий', [tags[2].slug], valid[1:]),
+    ]
+
+
+def test_import_command(lines, tmp_path, author, ingredients):
+    path = tmp_path / 'recipes.jsonl'
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    stdout, stderr = StringIO(), StringIO()
+
+    call_command(
+        'import_recipes', str(path), author=author.username, batch_size=3,
+        stdout=stdout, stderr=stderr,
+    )
+
+    assert 'Импортировано рецептов: 3, ошибок: 4' in stdout.getvalue()
+    errors = stderr.getvalue().splitlines()
+    assert [error.split(':')[0] for error in errors] == [
+        'Строка 2', 'Строка 3', 'Строка 5', 'Строка 6',
+    ]
+    recipes = {recipe.name: recipe for recipe in Recipe.objects.all()}
+    assert set(recipes) == {'Первый', 'Второй', 'Третий'}
+    assert recipes['Первый'].get_ingredient_amounts() == {
+        ingredients[0].id: 100, ingredients[1].id: 2,
+    }
+    assert recipes['Первый'].tags.count() == 2
+    assert is_content_name(recipes['Первый'].image.name)
+    # одна и та же картинка хранится один раз
+    assert len({recipe.image.name for recipe in recipes.values()}) == 1
+    author.refresh_from_db()
+    assert author.recipes_count == 3
+    assert list(Recipe.objects.search('второй')) == [recipes['Второй']]
+
+
+def test_import_requires_unit_for_ambiguous_ingredient(tmp_path, author,
+                                                       tags):
+    Ingredient.objects.create(name='соль', measurement_unit='г')
+    Ingredient.objects.create(name='соль', measurement_unit='щепотка')
+    path = tmp_path / 'recipes.jsonl'
+    path.write_text(recipe_line(
+        'Солёный', [tags[0].slug], [{'name': 'соль', 'amount': 1}]
+    ))
+    stderr = StringIO()
+
+    call_command(
+        'import_recipes', str(path), author=author.email,
+        stdout=StringIO(), stderr=stderr,
+    )
+
+    assert 'нужна единица измерения' in stderr.getvalue()
+    assert not Recipe.objects.exists()
+
+
+def test_import_endpoint(lines, user_client, user):
+    response = user_client.post(
+        '/api/recipes/import/', '\n'.join(lines),
+        content_type='application/x-ndjson',
+    )
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+    user.is_staff = True
+    user.save()
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.get(user=user).key}'
+    )
+    response = client.post(
+        '/api/recipes/import/', '\n'.join(lines),
+        content_type='application/x-ndjson',
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.data['created'] == 3
+    assert [error['line'] for error in response.data['errors']] == [
+        2, 3, 5, 6,
+    ]
+    assert 'cooking_time' in response.data['errors'][-1]['errors']
+    assert Recipe.objects.filter(author=user).count() == 3
+
+
+def test_import_stops_on_non_utf8_line(lines, user, user_client, tmp_path,
+                                       author):
+    body = b'\n'.join([
+        lines[0].encode(),
+        recipe_line('Не UTF-8', [], []).encode('cp1251'),
+        lines[-1].encode(),
+    ])
+    user.is_staff = True
+    user.save()
+
+    response = user_client.post(
+        '/api/recipes/import/', body, content_type='application/x-ndjson',
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.data['created'] == 1
+    assert [error['line'] for error in response.data['errors']] == [2]
+    assert 'UTF-8' in response.data['errors'][0]['errors'][0]
+
+    path = tmp_path / 'recipes.jsonl'
+    path.write_bytes(body)
+    stderr = StringIO()
+    with pytest.raises(CommandError, match='UTF-8'):
+        call_command(
+            'import_recipes', str(path), author=author.username,
+            stdout=StringIO(), stderr=stderr,
+        )
+    assert stderr.getvalue().startswith('Строка 2:')
+    assert Recipe.objects.count() == 2
+
+
+def test_import_does_not_reuse_deleted_recipe_ids(lines, recipe, author):
+    deleted_pk = recipe.pk
+    recipe.delete()
+
+    importer = RecipeImporter(author).run(lines[:1])
+
+    assert importer.created == 1
+    assert Recipe.objects.get().pk > deleted_pk
+
+
+def test_import_bumps_cache_version_after_commit(
+    lines, author, django_capture_on_commit_callbacks
+):
+    version = get_namespace_version('recipes')
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        RecipeImporter(author).run(lines[:1])
+        assert get_namespace_version('recipes') == version
+
+    for callback in callbacks:
+        callback()
+    assert get_namespace_version('recipes') != version
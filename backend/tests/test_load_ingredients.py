@@ -0,0 +1,92 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.cache import get_namespace_version
+from api.management.commands.load_ingredients import DEFAULT_PATH
+from recipes.models import Ingredient
+from tests.conftest import after_version_timeout, other_process_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def load(django_capture_on_commit_callbacks):
+    """Запускает команду; действия после фиксации выполняются."""
+
+    def run(*args, **options):
+        stdout = StringIO()
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command('load_ingredients', *map(str, args), stdout=stdout,
+                         **options)
+        return stdout.getvalue()
+
+    return run
+
+
+def test_csv_and_json_are_deduplicated_and_idempotent(tmp_path, load):
+    Ingredient.objects.create(name='соль', measurement_unit='г')
+    csv_path = tmp_path / 'ingredients.csv'
+    csv_path.write_text(
+        'соль,г\nсахар,г\n сахар , г\nсахар,кг\n,г\n', encoding='utf-8'
+    )
+    json_path = tmp_path / 'ingredients.json'
+    json_path.write_text(json.dumps([
+        {'name': 'сахар', 'measurement_unit': 'г'},
+        {'name': 'мука', 'measurement_unit': 'г'},
+    ], ensure_ascii=False), encoding='utf-8')
+    version = get_namespace_version('ingredients')
+
+    output = load(csv_path, batch_size=2)
+
+    assert 'Прочитано строк: 5, пропущено: 2, добавлено ингредиентов: 2' in (
+        output
+    )
+    assert get_namespace_version('ingredients') != version
+    assert 'добавлено ингредиентов: 1' in load(json_path)
+    assert 'добавлено ингредиентов: 0' in load(json_path)
+    assert set(
+        Ingredient.objects.values_list('name', 'measurement_unit')
+    ) == {('соль', 'г'), ('сахар', 'г'), ('сахар', 'кг'), ('мука', 'г')}
+
+
+def test_catalog_files_load_the_same_ingredients(load):
+    load(DEFAULT_PATH)
+    count = Ingredient.objects.count()
+    assert count > 2000
+
+    load(DEFAULT_PATH.with_suffix('.json'))
+
+    assert Ingredient.objects.count() == count
+
+
+def test_broken_file_is_rejected(tmp_path, load):
+    path = tmp_path / 'ingredients.json'
+    path.write_text('[{"name": "соль"', encoding='utf-8')
+
+    with pytest.raises(CommandError):
+        load(path)
+    with pytest.raises(CommandError):
+        load(path.with_suffix('.xml'))
+
+
+def test_server_index_sees_ingredients_loaded_by_command(
+    tmp_path, anonymous_client, load
+):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('мука,г\n', encoding='utf-8')
+
+    def search():
+        response = anonymous_client.get('/api/ingredients/', {'name': 'мук'})
+        return [ingredient['name'] for ingredient in response.data]
+
+    assert search() == []
+
+    # команда запускается в отдельном процессе со своим кэшем
+    with other_process_cache():
+        load(path)
+
+    with after_version_timeout():
+        assert search() == ['мука']
@@ -0,0 +1,55 @@
+from http import HTTPStatus
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+def collect(client, url, params=None):
+    pages = []
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == HTTPStatus.OK
+        pages.append(response.data)
+        if not response.data['next']:
+            return pages
+        response = client.get(response.data['next'])
+
+
+def test_cursor_pages_follow_pub_date(seed, anonymous_client):
+    recipes = seed(4)
+    pages = collect(
+        anonymous_client, '/api/recipes/', {'pagination': 'cursor', 'limit': 3}
+    )
+    ids = [recipe['id'] for page in pages for recipe in page['results']]
+    assert ids == [recipe.id for recipe in reversed(recipes)]
+    assert 'count' not in pages[0]
+    assert pages[0]['previous'] is None
+
+
+def test_cursor_previous_returns_same_page(seed, anonymous_client):
+    seed(4)
+    first = anonymous_client.get(
+        '/api/recipes/', {'pagination': 'cursor', 'limit': 3}
+    ).data
+    second = anonymous_client.get(first['next']).data
+    back = anonymous_client.get(second['previous']).data
+    assert back['results'] == first['results']
+    assert back['next'] == first['next']
+
+
+def test_invalid_cursor(anonymous_client):
+    response = anonymous_client.get('/api/recipes/', {'cursor': 'broken'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_page_number_count_is_cached(seed, user, user_client,
+                                     assert_max_queries):
+    recipes = seed(2)
+    assert user_client.get('/api/recipes/').data['count'] == len(recipes)
+    with assert_max_queries(8):
+        response = user_client.get('/api/recipes/')
+    assert response.data['count'] == len(recipes)
+    user.favorites.all().delete()
+    response = user_client.get('/api/recipes/', {'is_favorited': 1})
+    assert response.data['count'] == 0
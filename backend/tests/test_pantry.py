@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.pantry import PantryIndex, PantryMatch, get_pantry_index
+from recipes.models import IngredientRecipe, Recipe
+from tests.conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+# рецепт -> ингредиенты
+RECIPES = {
+    1: (10, 11),
+    2: (10, 11, 12, 13),
+    3: (11, 12),
+    4: (12, 13),
+}
+
+
+def build_index(recipes=RECIPES):
+    pairs = [
+        (ingredient_id, recipe_id)
+        for recipe_id, ingredient_ids in recipes.items()
+        for ingredient_id in ingredient_ids
+    ]
+    return PantryIndex(
+        [ingredient_id for ingredient_id, _ in pairs],
+        [recipe_id for _, recipe_id in pairs],
+    )
+
+
+def test_recipes_are_ranked_by_coverage():
+    index = build_index()
+
+    assert index.match([10, 11, 12], limit=10) == [
+        PantryMatch(3, 2, 2),
+        PantryMatch(1, 2, 2),
+        PantryMatch(2, 3, 4),
+        PantryMatch(4, 1, 2),
+    ]
+    assert index.match([11], limit=2) == [
+        PantryMatch(3, 1, 2), PantryMatch(1, 1, 2)
+    ]
+    assert index.match([99], limit=10) == []
+
+
+@pytest.mark.parametrize('overlay_limit', [1000, 0])
+def test_updates_replace_recipe_ingredients(overlay_limit, monkeypatch):
+    monkeypatch.setattr('api.pantry.PANTRY_OVERLAY_LIMIT', overlay_limit)
+    index = build_index()
+
+    index.update({1: [13], 5: [10, 13]})
+    index.remove([3])
+
+    assert len(index) == 4
+    assert index.match([10, 13], limit=10) == [
+        PantryMatch(5, 2, 2),
+        PantryMatch(1, 1, 1),
+        PantryMatch(4, 1, 2),
+        PantryMatch(2, 2, 4),
+    ]
+
+
+def pantry(client, ingredients, **params):
+    response = client.get(
+        '/api/recipes/pantry/', {'ingredients': ingredients, **params}
+    )
+    assert response.status_code == HTTPStatus.OK
+    return [
+        (recipe['id'], recipe['coverage'], recipe['missing_count'])
+        for recipe in response.data
+    ]
+
+
+def test_pantry_endpoint_follows_recipe_writes(
+    author, tags, ingredients, anonymous_client,
+    django_capture_on_commit_callbacks,
+):
+    first, second, third = ingredients[:3]
+    full = create_recipe(author, tags, [first, second])
+    partial = create_recipe(author, tags, [first, third])
+
+    assert pantry(anonymous_client, [first.id, second.id]) == [
+        (full.id, 1.0, 0), (partial.id, 0.5, 1),
+    ]
+    index = get_pantry_index()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        new = create_recipe(author, tags, [second])
+        IngredientRecipe.objects.filter(recipe=partial).delete()
+        partial.save()
+        Recipe.objects.get(pk=full.pk).delete()
+
+    assert pantry(anonymous_client, [first.id, second.id]) == [
+        (new.id, 1.0, 0),
+    ]
+    assert get_pantry_index() is index
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'ingredients': 'соль'},
+    {'ingredients': 1, 'limit': 0},
+])
+def test_invalid_pantry_query_is_rejected(params, anonymous_client):
+    response = anonymous_client.get('/api/recipes/pantry/', params)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
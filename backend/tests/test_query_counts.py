@@ -0,0 +1,362 @@
+"""
+Бюджеты SQL-запросов для эндпоинтов API.
+
+Каждый эндпоинт вызывается на базе разного размера и с разным размером
+страницы; число запросов не должно превышать заявленного бюджета.
+При превышении бюджета тест выводит все выполненные запросы.
+Бюджеты равны фактическому числу запросов, а число запросов на запись
+рецепта не должно зависеть от числа его тегов и ингредиентов.
+Действия после фиксации транзакции в бюджет не входят.
+"""
+from http import HTTPStatus
+from itertools import count
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, FeedEntry, Ingredient, ShoppingCart, Tag
+from tests.conftest import DATA_SIZES, IMAGE
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.parametrize('size', DATA_SIZES),
+]
+
+# запросы на аутентификацию по токену
+AUTH = 1
+# число тегов и ингредиентов в большом рецепте
+MANY = 6
+
+
+def recipe_data(tags, ingredients, name='Новый рецепт'):
+    return {
+        'name': name,
+        'text': 'Описание',
+        'cooking_time': 5,
+        'image': IMAGE,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10}
+            for ingredient in ingredients
+        ],
+    }
+
+
+@pytest.fixture
+def make_relations():
+    """Создаёт number новых тегов и столько же ингредиентов."""
+    numbers = count(1)
+
+    def make(number):
+        created = [next(numbers) for _ in range(number)]
+        tags = [
+            Tag.objects.create(
+                name=f'Новый тег {n}', slug=f'new-tag-{n}',
+                color=f'#ff{n:04x}',
+            )
+            for n in created
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Новый ингредиент {n}', measurement_unit='г'
+            )
+            for n in created
+        ]
+        return tags, ingredients
+
+    return make
+
+
+class TestAnonymousBudget:
+
+    def test_recipe_list(self, size, seed, anonymous_client,
+                         assert_max_queries):
+        seed(size)
+        with assert_max_queries(6):
+            response = anonymous_client.get(
+                '/api/recipes/', {'limit': size * 2}
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.data['results']) == size * 2
+
+    def test_recipe_list_filtered(self, size, seed, tags, anonymous_client,
+                                  assert_max_queries):
+        recipes = seed(size)
+        with assert_max_queries(9):
+            response = anonymous_client.get('/api/recipes/', {
+                'limit': size * 2,
+                'tags': [tag.slug for tag in tags[:2]],
+                'author': recipes[0].author_id,
+            })
+        assert response.status_code == HTTPStatus.OK
+
+    def test_recipe_list_cursor(self, size, seed, anonymous_client,
+                                assert_max_queries):
+        seed(size)
+        with assert_max_queries(4):
+            response = anonymous_client.get(
+                '/api/recipes/', {'limit': size * 2, 'pagination': 'cursor'}
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.data['results']) == size * 2
+
+    def test_recipe_detail(self, size, seed, anonymous_client,
+                           assert_max_queries):
+        recipes = seed(size)
+        with assert_max_queries(5):
+            response = anonymous_client.get(f'/api/recipes/{recipes[0].id}/')
+        assert response.status_code == HTTPStatus.OK
+
+    def test_tag_list(self, size, seed, anonymous_client,
+                      assert_max_queries):
+        seed(size)
+        with assert_max_queries(2):
+            response = anonymous_client.get('/api/tags/')
+        assert response.status_code == HTTPStatus.OK
+
+    def test_tag_detail(self, size, seed, tags, anonymous_client,
+                        assert_max_queries):
+        seed(size)
+        with assert_max_queries(2):
+            response = anonymous_client.get(f'/api/tags/{tags[0].id}/')
+        assert response.status_code == HTTPStatus.OK
+
+    def test_ingredient_list(self, size, seed, anonymous_client,
+                             assert_max_queries):
+        seed(size)
+        with assert_max_queries(2):
+            response = anonymous_client.get(
+                '/api/ingredients/', {'name': 'Ингр'}
+            )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_ingredient_detail(self, size, seed, ingredients,
+                               anonymous_client,
+                               assert_max_queries):
+        seed(size)
+        with assert_max_queries(2):
+            response = anonymous_client.get(
+                f'/api/ingredients/{ingredients[0].id}/'
+            )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_user_list(self, size, seed, anonymous_client,
+                       assert_max_queries):
+        seed(size)
+        with assert_max_queries(2):
+            response = anonymous_client.get('/api/users/', {'limit': size})
+        assert response.status_code == HTTPStatus.OK
+
+    def test_user_detail(self, size, seed, user, anonymous_client,
+                         assert_max_queries):
+        seed(size)
+        with assert_max_queries(1):
+            response = anonymous_client.get(f'/api/users/{user.id}/')
+        assert response.status_code == HTTPStatus.OK
+
+
+class TestAuthenticatedBudget:
+
+    def test_recipe_list(self, size, seed, user_client,
+                         assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 9):
+            response = user_client.get('/api/recipes/', {'limit': size * 2})
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.data['results']) == size * 2
+
+    @pytest.mark.parametrize(
+        'flag', ['is_favorited', 'is_in_shopping_cart']
+    )
+    def test_recipe_list_by_flag(self, size, flag, seed, user_client,
+                                 assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 9):
+            response = user_client.get(
+                '/api/recipes/', {'limit': size * 2, flag: 1}
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert all(recipe[flag] for recipe in response.data['results'])
+
+    def test_recipe_detail(self, size, seed, user_client,
+                           assert_max_queries):
+        recipes = seed(size)
+        with assert_max_queries(AUTH + 8):
+            response = user_client.get(f'/api/recipes/{recipes[0].id}/')
+        assert response.status_code == HTTPStatus.OK
+
+    def test_recipe_revalidation(self, size, seed, user_client,
+                                 assert_max_queries):
+        recipes = seed(size)
+        url = f'/api/recipes/{recipes[0].id}/'
+        etag = user_client.get(url)['ETag']
+        with assert_max_queries(AUTH):
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_recipe_create(self, size, seed, tags, ingredients, author_client,
+                           assert_max_queries):
+        seed(size)
+        data = recipe_data(tags, ingredients)
+        with assert_max_queries(AUTH + 20):
+            response = author_client.post(
+                '/api/recipes/', data, format='json'
+            )
+        assert response.status_code == HTTPStatus.CREATED, response.data
+
+    def test_recipe_create_does_not_grow(self, size, seed, make_relations,
+                                         author_client):
+        seed(size)
+        performed = []
+        for number in (1, MANY):
+            data = recipe_data(
+                *make_relations(number), name=f'Рецепт на {number}'
+            )
+            with CaptureQueriesContext(connection) as context:
+                response = author_client.post(
+                    '/api/recipes/', data, format='json'
+                )
+            assert response.status_code == HTTPStatus.CREATED, response.data
+            performed.append(len(context.captured_queries))
+        assert performed[0] == performed[1]
+
+    def test_recipe_update(self, size, seed, recipe, tags, ingredients,
+                           author_client, assert_max_queries):
+        seed(size)
+        data = recipe_data(tags, ingredients, name='Изменённый рецепт')
+        with assert_max_queries(AUTH + 24):
+            response = author_client.patch(
+                f'/api/recipes/{recipe.id}/', data, format='json'
+            )
+        assert response.status_code == HTTPStatus.OK, response.data
+
+    def test_recipe_update_does_not_grow(self, size, seed, make_relations,
+                                         author_client):
+        """Все теги и ингредиенты рецепта заменяются новыми."""
+        seed(size)
+        performed = []
+        for number in (1, MANY):
+            response = author_client.post('/api/recipes/', recipe_data(
+                *make_relations(number), name=f'Рецепт на {number}'
+            ), format='json')
+            data = recipe_data(
+                *make_relations(number), name=f'Изменённый на {number}'
+            )
+            with CaptureQueriesContext(connection) as context:
+                response = author_client.patch(
+                    f'/api/recipes/{response.data["id"]}/', data,
+                    format='json',
+                )
+            assert response.status_code == HTTPStatus.OK, response.data
+            performed.append(len(context.captured_queries))
+        assert performed[0] == performed[1]
+
+    def test_recipe_delete(self, size, seed, recipe, author_client,
+                           assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 14):
+            response = author_client.delete(f'/api/recipes/{recipe.id}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+    def test_recipe_delete_does_not_grow(self, size, seed, user,
+                                         make_relations, author_client):
+        """Рецепт в корзине, поэтому меняется и список покупок."""
+        seed(size)
+        performed = []
+        for number in (1, MANY):
+            response = author_client.post('/api/recipes/', recipe_data(
+                *make_relations(number), name=f'Рецепт на {number}'
+            ), format='json')
+            recipe_id = response.data['id']
+            ShoppingCart.objects.create(user=user, recipe_id=recipe_id)
+            with CaptureQueriesContext(connection) as context:
+                response = author_client.delete(f'/api/recipes/{recipe_id}/')
+            assert response.status_code == HTTPStatus.NO_CONTENT
+            performed.append(len(context.captured_queries))
+        assert performed[0] == performed[1]
+
+    @pytest.mark.parametrize('url, model, budget', [
+        ('favorite', Favorite, AUTH + 6),
+        # корзина ещё пополняет список покупок
+        ('shopping_cart', ShoppingCart, AUTH + 7),
+    ])
+    def test_add_to_list(self, size, url, model, budget, seed, recipe, user,
+                         user_client, assert_max_queries):
+        seed(size)
+        with assert_max_queries(budget):
+            response = user_client.post(f'/api/recipes/{recipe.id}/{url}/')
+        assert response.status_code == HTTPStatus.CREATED
+        assert model.objects.filter(user=user, recipe=recipe).exists()
+
+    @pytest.mark.parametrize('url, model, budget', [
+        ('favorite', Favorite, AUTH + 4),
+        # корзина ещё вычитает рецепт из списка покупок
+        ('shopping_cart', ShoppingCart, AUTH + 6),
+    ])
+    def test_delete_from_list(self, size, url, model, budget, seed, recipe,
+                              user, user_client, assert_max_queries):
+        seed(size)
+        model.objects.create(user=user, recipe=recipe)
+        with assert_max_queries(budget):
+            response = user_client.delete(f'/api/recipes/{recipe.id}/{url}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+    def test_download_shopping_cart(self, size, seed, user_client,
+                                    assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 1):
+            response = user_client.get('/api/recipes/download_shopping_cart/')
+            b''.join(response.streaming_content)
+        assert response.status_code == HTTPStatus.OK
+
+    def test_user_list(self, size, seed, user_client,
+                       assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 2):
+            response = user_client.get('/api/users/', {'limit': size})
+        assert response.status_code == HTTPStatus.OK
+
+    def test_user_me(self, size, seed, user_client,
+                     assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 1):
+            response = user_client.get('/api/users/me/')
+        assert response.status_code == HTTPStatus.OK
+
+    def test_subscriptions(self, size, seed, user_client,
+                           assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 3):
+            response = user_client.get(
+                '/api/users/subscriptions/',
+                {'limit': size, 'recipes_limit': 1},
+            )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_feed(self, size, seed, user_client, assert_max_queries):
+        recipes = seed(size)
+        FeedEntry.objects.fan_out(recipe.id for recipe in recipes)
+        with assert_max_queries(AUTH + 5):
+            response = user_client.get(
+                '/api/recipes/feed/', {'limit': size * 2}
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.data['results']) == size * 2
+
+    def test_subscribe(self, size, seed, author, user_client,
+                       assert_max_queries):
+        seed(size)
+        with assert_max_queries(AUTH + 9):
+            response = user_client.post(f'/api/users/{author.id}/subscribe/')
+        assert response.status_code == HTTPStatus.CREATED
+
+    def test_unsubscribe(self, size, seed, author, user, user_client,
+                         assert_max_queries):
+        seed(size)
+        user.subscriptions.create(author=author)
+        with assert_max_queries(AUTH + 5):
+            response = user_client.delete(
+                f'/api/users/{author.id}/subscribe/'
+            )
+        assert response.status_code == HTTPStatus.NO_CONTENT
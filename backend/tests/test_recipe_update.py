@@ -0,0 +1,140 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import IngredientRecipe, ShoppingCart, ShoppingListItem
+from tests.conftest import IMAGE, INGREDIENTS_PER_RECIPE, TAGS_PER_RECIPE
+
+pytestmark = pytest.mark.django_db
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def update_data(tags, amounts):
+    return {
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': IMAGE,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': pk, 'amount': amount} for pk, amount in amounts.items()
+        ],
+    }
+
+
+def get_writes(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith(WRITE_STATEMENTS)
+    ]
+
+
+def test_one_ingredient_edit_writes(recipe, tags, ingredients,
+                                    author_client):
+    rows_before = set(
+        IngredientRecipe.objects.filter(recipe=recipe).values_list(
+            'pk', flat=True
+        )
+    )
+    amounts = recipe.get_ingredient_amounts()
+    amounts[ingredients[0].id] += 10
+
+    with CaptureQueriesContext(connection) as context:
+        response = author_client.patch(
+            f'/api/recipes/{recipe.id}/',
+            update_data(tags[:TAGS_PER_RECIPE], amounts),
+            format='json',
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    writes = get_writes(context)
+    # количество в строке ингредиента, перенос изменения в списки
+    # покупок и сохранение самого рецепта; версия кэша меняется
+    # после фиксации
+    assert len(writes) == 3, '\n'.join(writes)
+    assert 'recipes_ingredientrecipe' in writes[0]
+    assert recipe.get_ingredient_amounts() == amounts
+    assert set(
+        IngredientRecipe.objects.filter(recipe=recipe).values_list(
+            'pk', flat=True
+        )
+    ) == rows_before
+
+
+def test_update_applies_ingredient_and_tag_diff(recipe, tags, ingredients,
+                                                user, author_client):
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    kept, changed, removed = ingredients[:INGREDIENTS_PER_RECIPE]
+    added = ingredients[INGREDIENTS_PER_RECIPE]
+    amounts = recipe.get_ingredient_amounts()
+    amounts.pop(removed.id)
+    amounts[changed.id] += 5
+    amounts[added.id] = 7
+
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        update_data([tags[0], tags[-1]], amounts),
+        format='json',
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert recipe.get_ingredient_amounts() == amounts
+    assert set(recipe.tags.values_list('pk', flat=True)) == {
+        tags[0].id, tags[-1].id
+    }
+    assert dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient_id', 'total_amount'
+        )
+    ) == amounts
+    assert kept.id in amounts
+
+
+def test_failed_update_is_rolled_back(recipe, tags, ingredients,
+                                      author_client, monkeypatch):
+    amounts = recipe.get_ingredient_amounts()
+
+    def fail(*args):
+        raise RuntimeError
+
+    monkeypatch.setattr(
+        ShoppingListItem.objects, 'apply_recipe_change', fail
+    )
+    with pytest.raises(RuntimeError):
+        author_client.patch(
+            f'/api/recipes/{recipe.id}/',
+            update_data([tags[-1]], {ingredients[-1].id: 1}),
+            format='json',
+        )
+
+    assert recipe.get_ingredient_amounts() == amounts
+    assert set(recipe.tags.values_list('pk', flat=True)) == {
+        tag.id for tag in tags[:TAGS_PER_RECIPE]
+    }
+
+
+@pytest.mark.parametrize('field', ['tags', 'ingredients'])
+def test_update_rejects_unknown_ids(field, recipe, tags, ingredients,
+                                    author_client):
+    amounts = recipe.get_ingredient_amounts()
+    data = update_data(tags[:TAGS_PER_RECIPE], amounts)
+    missing = 10 ** 6
+    if field == 'tags':
+        data['tags'].append(missing)
+    else:
+        data['ingredients'].append({'id': missing, 'amount': 1})
+
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/', data, format='json'
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    errors = response.data[field]
+    if field == 'ingredients':
+        assert not any(errors[:-1])
+        errors = errors[-1]['id']
+    assert str(missing) in str(errors)
+    assert recipe.get_ingredient_amounts() == amounts
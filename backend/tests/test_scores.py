@@ -0,0 +1,164 @@
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.constraints import (SCORE_CART_WEIGHT, SCORE_COMMIT_DELAY,
+                              SCORE_FAVORITE_WEIGHT, TRENDING_HALF_LIFE_HOURS,
+                              TRENDING_REBASE_HALF_LIVES)
+from recipes.models import Favorite, RecipeScore, ScoreCheckpoint, ShoppingCart
+from recipes.scores import update_scores
+from tests.conftest import create_recipe, create_user
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(author, tags, ingredients):
+    return [
+        create_recipe(author, tags, ingredients, name=f'Рецепт {i}')
+        for i in range(3)
+    ]
+
+
+def ordered_ids(client, ordering):
+    response = client.get('/api/recipes/', {'ordering': ordering})
+    assert response.status_code == HTTPStatus.OK
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+# пересчёт, для которого только что добавленные записи уже учитываются
+def settled_now():
+    return timezone.now() + timedelta(seconds=SCORE_COMMIT_DELAY)
+
+
+def scores(field):
+    return dict(RecipeScore.objects.values_list('recipe', field))
+
+
+def test_scores_are_updated_incrementally(recipes):
+    users = [create_user(f'fan{i}') for i in range(3)]
+    first, second, third = recipes
+    Favorite.objects.create(user=users[0], recipe=first)
+    ShoppingCart.objects.create(user=users[0], recipe=second)
+    # записи моложе SCORE_COMMIT_DELAY в трендовых ещё не учитываются
+    update_scores()
+    assert not any(scores('trending').values())
+    update_scores(settled_now())
+
+    assert scores('popular') == {
+        first.id: SCORE_FAVORITE_WEIGHT,
+        second.id: SCORE_CART_WEIGHT,
+        third.id: 0,
+    }
+    trending = scores('trending')
+    # вес на момент пересчёта: через SCORE_COMMIT_DELAY после опорной даты
+    assert trending[first.id] == pytest.approx(
+        SCORE_FAVORITE_WEIGHT, rel=1e-3
+    )
+
+    # повторный пересчёт без новых записей ничего не меняет
+    assert update_scores(settled_now()) == 0
+    assert scores('trending') == trending
+
+    Favorite.objects.create(user=users[1], recipe=first)
+    Favorite.objects.filter(user=users[0]).delete()
+    update_scores(settled_now())
+
+    assert scores('popular')[first.id] == SCORE_FAVORITE_WEIGHT
+    assert scores('trending')[first.id] == pytest.approx(
+        2 * SCORE_FAVORITE_WEIGHT, rel=1e-3
+    )
+
+
+def test_late_commit_with_lower_id_is_counted(recipes):
+    first, second, _ = recipes
+    now = timezone.now()
+    Favorite.objects.create(
+        pk=10, user=create_user('fast'), recipe=first,
+        created_at=now - timedelta(seconds=SCORE_COMMIT_DELAY + 1),
+    )
+    update_scores(now)
+
+    # запись получила меньший id, но зафиксирована после пересчёта
+    Favorite.objects.create(
+        pk=5, user=create_user('slow'), recipe=second,
+        created_at=now - timedelta(seconds=1),
+    )
+    update_scores(now + timedelta(seconds=SCORE_COMMIT_DELAY))
+
+    trending = scores('trending')
+    assert trending[first.id] == pytest.approx(SCORE_FAVORITE_WEIGHT)
+    assert trending[second.id] > 0
+
+
+def test_first_runs_share_one_checkpoint(recipes):
+    Favorite.objects.create(
+        user=create_user('fan'), recipe=recipes[0],
+        created_at=timezone.now() - timedelta(seconds=SCORE_COMMIT_DELAY),
+    )
+    update_scores()
+    trending = scores('trending')
+
+    assert update_scores() == 0
+    assert scores('trending') == trending
+    assert ScoreCheckpoint.objects.count() == 1
+
+
+def test_older_events_decay(recipes):
+    old, new, _ = recipes
+    epoch = timezone.now()
+    delay = timedelta(seconds=SCORE_COMMIT_DELAY)
+    Favorite.objects.create(
+        user=create_user('early'), recipe=old, created_at=epoch
+    )
+    update_scores(epoch + delay)
+    late = epoch + timedelta(hours=TRENDING_HALF_LIFE_HOURS)
+    Favorite.objects.create(
+        user=create_user('late'), recipe=new, created_at=late
+    )
+    update_scores(late + delay)
+
+    trending = scores('trending')
+    assert trending[new.id] == pytest.approx(2 * trending[old.id])
+
+    # при смене опорной даты соотношение рейтингов сохраняется
+    later = epoch + timedelta(
+        hours=TRENDING_HALF_LIFE_HOURS * (TRENDING_REBASE_HALF_LIVES + 1)
+    )
+    update_scores(later)
+    assert ScoreCheckpoint.objects.get().epoch == later
+    rebased = scores('trending')
+    assert rebased[new.id] == pytest.approx(2 * rebased[old.id])
+    assert rebased[new.id] < trending[new.id]
+
+
+def test_recipes_are_ordered_by_scores(recipes, anonymous_client):
+    first, second, third = recipes
+    created_at = timezone.now() - timedelta(seconds=SCORE_COMMIT_DELAY)
+    for i in range(3):
+        Favorite.objects.create(
+            user=create_user(f'fan{i}'), recipe=second, created_at=created_at
+        )
+    ShoppingCart.objects.create(
+        user=create_user('buyer'), recipe=third, created_at=created_at
+    )
+    call_command('update_recipe_scores', stdout=StringIO())
+
+    assert 3 * SCORE_FAVORITE_WEIGHT > SCORE_CART_WEIGHT
+    expected = [second.id, third.id, first.id]
+    assert ordered_ids(anonymous_client, 'popular') == expected
+    assert ordered_ids(anonymous_client, 'trending') == expected
+
+
+def test_new_recipe_gets_score_row(author, tags, ingredients):
+    recipe = create_recipe(author, tags, ingredients)
+    assert RecipeScore.objects.filter(recipe=recipe, popular=0).exists()
+
+
+def test_invalid_ordering_is_rejected(anonymous_client):
+    response = anonymous_client.get('/api/recipes/', {'ordering': 'name'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
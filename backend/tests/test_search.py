@@ -0,0 +1,70 @@
+from http import HTTPStatus
+
+import pytest
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+from tests.conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(author, user, tags, ingredients,
+            django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        soup = create_recipe(author, tags[:1], ingredients, name='Борщ')
+        soup.text = 'Свекольный суп со сметаной'
+        soup.save()
+        salad = create_recipe(user, tags[1:], ingredients, name='Винегрет')
+        salad.text = 'Салат из свеклы, картофеля и борща вчерашнего'
+        salad.save()
+        IngredientRecipe.objects.create(
+            recipe=salad,
+            ingredient=Ingredient.objects.create(
+                name='капуста квашеная', measurement_unit='г'
+            ),
+            amount=100,
+        )
+    return soup, salad
+
+
+def search(client, query, **params):
+    response = client.get('/api/recipes/', {'search': query, **params})
+    assert response.status_code == HTTPStatus.OK
+    return [recipe['name'] for recipe in response.data['results']]
+
+
+def test_search_ranks_name_matches_first(recipes, anonymous_client):
+    assert search(anonymous_client, 'борщ') == ['Борщ', 'Винегрет']
+    assert search(anonymous_client, 'свекольный') == ['Борщ']
+    assert search(anonymous_client, 'капуст') == ['Винегрет']
+    assert search(anonymous_client, 'пицца') == []
+    assert search(anonymous_client, '!!!') == []
+
+
+def test_search_combines_with_filters(recipes, tags, user, anonymous_client):
+    assert search(
+        anonymous_client, 'борщ', tags=tags[1].slug
+    ) == ['Винегрет']
+    assert search(anonymous_client, 'борщ', author=user.id) == ['Винегрет']
+
+
+def test_index_follows_recipe_and_ingredient_changes(
+    recipes, ingredients, anonymous_client,
+    django_capture_on_commit_callbacks,
+):
+    soup, salad = recipes
+    with django_capture_on_commit_callbacks(execute=True):
+        soup.name = 'Щи'
+        soup.save()
+        ingredient = ingredients[0]
+        ingredient.name = 'укроп'
+        ingredient.save()
+    assert search(anonymous_client, 'борщ') == ['Винегрет']
+    assert search(anonymous_client, 'щи') == ['Щи']
+    assert set(search(anonymous_client, 'укроп')) == {'Щи', 'Винегрет'}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        salad.delete()
+    assert search(anonymous_client, 'квашеная') == []
+    assert Recipe.objects.search('укроп').count() == 1
@@ -0,0 +1,155 @@
+import csv
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.renderers import ShoppingListRenderer
+from recipes.models import ShoppingCart, ShoppingListItem
+from tests.conftest import IMAGE, INGREDIENTS_PER_RECIPE
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+def download(client, **params):
+    response = client.get(URL, params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.streaming
+    return response, b''.join(response.streaming_content).decode()
+
+
+def expected_rows(ingredients, recipes_in_cart):
+    # каждый рецепт содержит первые ингредиенты с количеством 1, 2, 3...
+    return [
+        [ingredient.name, ingredient.measurement_unit,
+         str((i + 1) * recipes_in_cart)]
+        for i, ingredient in enumerate(ingredients[:INGREDIENTS_PER_RECIPE])
+    ]
+
+
+def test_txt_is_default(seed, ingredients, user_client):
+    recipes = seed(2)
+    response, content = download(user_client)
+    assert response['Content-Type'] == 'text/plain; charset=utf-8'
+    assert 'shopping_list.txt' in response['Content-Disposition']
+    lines = content.splitlines()
+    assert lines[0] == 'Список покупок'
+    assert lines[1:] == [
+        f'{i}. {name.capitalize()} ({unit}) - {amount}'
+        for i, (name, unit, amount) in enumerate(
+            expected_rows(ingredients, len(recipes[::2])), start=1
+        )
+    ]
+
+
+def test_csv_sums_amounts_per_ingredient(seed, ingredients, user_client):
+    recipes = seed(2)
+    response, content = download(user_client, format='csv')
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    rows = list(csv.reader(content.splitlines()))
+    assert rows[0] == ['name', 'measurement_unit', 'amount']
+    assert rows[1:] == expected_rows(ingredients, len(recipes[::2]))
+
+
+def test_json(seed, ingredients, user_client):
+    recipes = seed(2)
+    response, content = download(user_client, format='json')
+    assert response['Content-Type'] == 'application/json; charset=utf-8'
+    assert json.loads(content) == [
+        {'name': name, 'measurement_unit': unit, 'amount': int(amount)}
+        for name, unit, amount in expected_rows(
+            ingredients, len(recipes[::2])
+        )
+    ]
+
+
+def test_empty_cart(user_client):
+    _, content = download(user_client, format='json')
+    assert json.loads(content) == []
+
+
+def test_unknown_format(user_client):
+    response = user_client.get(URL, {'format': 'pdf'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_anonymous_gets_error_in_requested_format(anonymous_client):
+    response = anonymous_client.get(URL, {'format': 'csv'})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert 'detail' in json.loads(response.content)
+
+
+def stored(user):
+    return dict(
+        ShoppingListItem.objects.filter(user=user)
+        .values_list('ingredient_id', 'total_amount')
+    )
+
+
+def test_renderer_must_define_stream():
+    with pytest.raises(TypeError, match='stream'):
+        ShoppingListRenderer()
+
+    class PlainRenderer(ShoppingListRenderer):
+        media_type = 'text/plain'
+        format = 'plain'
+
+        def stream(self, rows):
+            yield from (name for name, _, _ in rows)
+
+    assert list(PlainRenderer().stream([('соль', 'г', 1)])) == ['соль']
+
+
+def test_cart_changes_apply_recipe_amounts(recipe, user, user_client):
+    amounts = recipe.get_ingredient_amounts()
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert stored(user) == amounts
+    user_client.delete(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert stored(user) == {}
+
+
+def test_recipe_edit_updates_every_cart(recipe, user, tags, ingredients,
+                                        author_client):
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=recipe.author, recipe=recipe)
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'image': IMAGE,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': ingredients[0].id, 'amount': 7},
+                {'id': ingredients[-1].id, 'amount': 5},
+            ],
+        },
+        format='json',
+    )
+    assert response.status_code == HTTPStatus.OK
+    expected = {ingredients[0].id: 7, ingredients[-1].id: 5}
+    assert stored(user) == expected
+    assert stored(recipe.author) == expected
+
+
+def test_recipe_delete_clears_carts(recipe, user):
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    recipe.delete()
+    assert stored(user) == {}
+
+
+def test_rebuild_command_fixes_drift(seed, user):
+    seed(2)
+    expected = stored(user)
+    ShoppingListItem.objects.filter(user=user).update(total_amount=100)
+    out = StringIO()
+    call_command('rebuild_shopping_lists', '--check', stdout=out)
+    assert 'найдено расхождений: 1' in out.getvalue()
+    assert set(stored(user).values()) == {100}
+    call_command('rebuild_shopping_lists', stdout=StringIO())
+    assert stored(user) == expected
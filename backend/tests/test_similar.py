@@ -0,0 +1,111 @@
+from http import HTTPStatus
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from recipes.models import RecipeSignature, SignatureBand
+from recipes.similarity import (SIGNATURE_SIZE, find_similar, get_tokens,
+                                minhash)
+from tests.conftest import IMAGE, create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def test_signatures_estimate_jaccard_similarity():
+    base = list(range(100))
+    close = list(range(10, 110))
+    far = list(range(90, 190))
+    signatures = minhash([base, close, far, base[::-1]])
+
+    assert signatures.shape == (4, SIGNATURE_SIZE)
+    assert np.array_equal(signatures[0], signatures[3])
+    estimates = (signatures[1:3] == signatures[0]).mean(axis=1)
+    # точные коэффициенты: 90 / 110 и 10 / 190
+    assert estimates[0] == pytest.approx(90 / 110, abs=0.2)
+    assert estimates[1] == pytest.approx(10 / 190, abs=0.2)
+
+
+def test_ingredients_and_tags_do_not_collide():
+    assert set(get_tokens([1, 2], [])).isdisjoint(get_tokens([], [1, 2]))
+
+
+def similar_ids(client, recipe, **params):
+    response = client.get(f'/api/recipes/{recipe.id}/similar/', params)
+    assert response.status_code == HTTPStatus.OK
+    return [item['id'] for item in response.data]
+
+
+def test_similar_recipes_are_found_by_bands(
+    author, tags, ingredients, anonymous_client
+):
+    same = [
+        create_recipe(author, tags, ingredients[:3], name=f'Рецепт {i}')
+        for i in range(3)
+    ]
+    other = create_recipe(author, tags[1:], ingredients[3:6])
+    call_command('rebuild_recipe_signatures', stdout=StringIO())
+
+    assert similar_ids(anonymous_client, same[0], limit=2) == [
+        same[2].id, same[1].id,
+    ]
+    assert similar_ids(anonymous_client, same[0], limit=1) == [same[2].id]
+    assert [item.similarity for item in find_similar(same[0].id, 2)] == [
+        1.0, 1.0,
+    ]
+    assert all(
+        item.similarity < 0.5 for item in find_similar(other.id, 6)
+    )
+    assert SignatureBand.objects.filter(recipe=other).count() > 0
+
+
+def test_signature_follows_recipe_writes(
+    author, tags, ingredients, author_client, anonymous_client
+):
+    original = create_recipe(author, tags, ingredients[:3])
+    call_command('rebuild_recipe_signatures', stdout=StringIO())
+    data = {
+        'name': 'Копия',
+        'text': 'Описание',
+        'image': IMAGE,
+        'cooking_time': 5,
+        'tags': [tag.id for tag in tags[:1]],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10}
+            for ingredient in ingredients[:3]
+        ],
+    }
+    response = author_client.post('/api/recipes/', data, format='json')
+    assert response.status_code == HTTPStatus.CREATED
+    copy_id = response.data['id']
+    original.tags.set(tags[:1])
+    call_command('rebuild_recipe_signatures', stdout=StringIO())
+
+    assert similar_ids(anonymous_client, original) == [copy_id]
+
+    data['ingredients'] = [
+        {'id': ingredient.id, 'amount': 10}
+        for ingredient in ingredients[3:6]
+    ]
+    response = author_client.patch(
+        f'/api/recipes/{copy_id}/', data, format='json'
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    assert all(
+        item.similarity < 0.5 for item in find_similar(original.id, 6)
+    )
+
+
+def test_recipe_without_signature(recipe, anonymous_client):
+    assert not RecipeSignature.objects.exists()
+    assert similar_ids(anonymous_client, recipe) == []
+    response = anonymous_client.get(f'/api/recipes/{recipe.id + 1}/similar/')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.parametrize('pk', ['abc', '1.5', '0'])
+def test_invalid_recipe_id_is_not_found(pk, anonymous_client):
+    response = anonymous_client.get(f'/api/recipes/{pk}/similar/')
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,90 @@
+import hashlib
+import os
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from core.storage import is_content_name
+from recipes.images import VARIANTS_DIRECTORY
+
+pytestmark = pytest.mark.django_db
+
+
+def test_same_content_is_stored_once(settings):
+    first = default_storage.save('recipes/images/a.PNG', ContentFile(b'1'))
+    second = default_storage.save('recipes/images/b.png', ContentFile(b'1'))
+    other = default_storage.save('recipes/images/c.png', ContentFile(b'2'))
+    assert first == second == (
+        f'recipes/images/{hashlib.sha256(b"1").hexdigest()}.png'
+    )
+    assert is_content_name(first)
+    assert other != first
+    assert len(default_storage.listdir('recipes/images')[1]) == 2
+
+
+def test_concurrent_save_of_same_content_keeps_hash_name(monkeypatch):
+    name = default_storage.save('recipes/images/a.png', ContentFile(b'1'))
+    exists = default_storage.exists
+    checked = set()
+
+    def exists_before_write(path):
+        # первая проверка прошла до записи файла другой загрузкой
+        if path not in checked:
+            checked.add(path)
+            return False
+        return exists(path)
+
+    monkeypatch.setattr(default_storage, 'exists', exists_before_write)
+
+    assert default_storage.save(
+        'recipes/images/b.png', ContentFile(b'1')
+    ) == name
+    assert default_storage.listdir('recipes/images')[1] == [
+        Path(name).name
+    ]
+
+
+def test_gc_keeps_file_saved_again(recipe):
+    name = default_storage.save('recipes/images/a.png', ContentFile(b'1'))
+    path = default_storage.path(name)
+    os.utime(path, (0, 0))
+    # новая загрузка того же содержимого, рецепт ещё не сохранён
+    assert default_storage.save(
+        'recipes/images/b.png', ContentFile(b'1')
+    ) == name
+    call_command('gc_media', stdout=StringIO())
+    assert default_storage.exists(name)
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+
+def test_gc_removes_only_orphans(recipe):
+    used = default_storage.save('recipes/images/x.png', ContentFile(b'used'))
+    orphan = default_storage.save('recipes/images/y.png', ContentFile(b'old'))
+    variant = f'{VARIANTS_DIRECTORY}/{"0" * 64}-320.jpg'
+    # копии пишет пул процессов напрямую в файловую систему
+    path = Path(default_storage.path(variant))
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b'variant')
+    recipe.image = used
+    recipe.image_variants = {'source': used, 'jpeg': {'320': variant}}
+    recipe.save()
+
+    out = StringIO()
+    call_command('gc_media', '--min-age=0', '--dry-run', stdout=out)
+    assert orphan in out.getvalue()
+    assert default_storage.exists(orphan)
+
+    call_command('gc_media', '--min-age=0', stdout=StringIO())
+    assert not default_storage.exists(orphan)
+    assert default_storage.exists(used)
+    assert default_storage.exists(variant)
+
+
+def test_gc_keeps_fresh_files(recipe):
+    fresh = default_storage.save('recipes/images/z.png', ContentFile(b'new'))
+    call_command('gc_media', stdout=StringIO())
+    assert default_storage.exists(fresh)
@@ -0,0 +1,53 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+
+from recipes.models import Recipe
+from tests.conftest import RECIPES_PER_AUTHOR
+
+pytestmark = pytest.mark.django_db
+
+
+def latest_ids(recipes, author, limit):
+    ids = sorted(
+        (recipe.id for recipe in recipes if recipe.author_id == author),
+        reverse=True,
+    )
+    return ids[:limit]
+
+
+def test_subscriptions_limit_recipes_per_author(seed, user_client):
+    recipes = seed(3)
+    response = user_client.get(
+        '/api/users/subscriptions/', {'recipes_limit': 1}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.data['count'] == 3
+    for item in response.data['results']:
+        assert item['is_subscribed'] is True
+        assert item['recipes_count'] == RECIPES_PER_AUTHOR
+        assert [recipe['id'] for recipe in item['recipes']] == latest_ids(
+            recipes, item['id'], 1
+        )
+
+
+def test_subscriptions_without_limit_return_all_recipes(seed, user_client):
+    recipes = seed(2)
+    response = user_client.get('/api/users/subscriptions/')
+    for item in response.data['results']:
+        assert [recipe['id'] for recipe in item['recipes']] == latest_ids(
+            recipes, item['id'], None
+        )
+
+
+@pytest.mark.parametrize('limit', (0, 1, RECIPES_PER_AUTHOR + 1))
+def test_window_and_subquery_previews_match(seed, monkeypatch, limit):
+    recipes = seed(3)
+    author_ids = {recipe.author_id for recipe in recipes}
+    expected = list(Recipe.objects.previews(author_ids, limit))
+    # SQLite поддерживает оконные функции, поэтому вариант
+    # для PostgreSQL можно проверить на тестовой базе
+    monkeypatch.setattr(connection, 'vendor', 'postgresql')
+    assert list(Recipe.objects.previews(author_ids, limit)) == expected
+    assert len(expected) == len(author_ids) * min(limit, RECIPES_PER_AUTHOR)
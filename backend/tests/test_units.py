@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from recipes import units
+from recipes.models import Ingredient, ShoppingListItem
+from recipes.units import (UNIT_ALIASES, UNIT_CONVERSIONS, UnitRegistry,
+                           unit_registry)
+
+pytestmark = pytest.mark.django_db
+
+
+ROWS = [
+    ('ваниль', 'капля', 3),
+    ('молоко', 'Л', 1),
+    ('молоко', 'мл', 100),
+    ('молоко', 'ст. л.', 3),
+    ('мука', 'г', 300),
+    ('мука', 'кг', 1),
+    ('мука', 'стакан', 2),
+    ('соль', 'по вкусу', 1),
+    ('соль', 'ч.л.', 1),
+]
+
+
+def test_amounts_are_converted_to_canonical_units():
+    assert list(unit_registry.aggregate(ROWS)) == [
+        ('ваниль', 'мл', 0.15),
+        ('молоко', 'мл', 1145),
+        ('мука', 'г', 1300),
+        ('мука', 'мл', 400),
+        ('соль', 'мл', 5),
+        ('соль', 'по вкусу', 1),
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 4])
+def test_chunks_keep_ingredient_groups_whole(chunk_size, monkeypatch):
+    expected = list(unit_registry.aggregate(ROWS))
+    monkeypatch.setattr(units, 'AGGREGATE_CHUNK_SIZE', chunk_size)
+    rows = iter(ROWS)
+    result = unit_registry.aggregate(rows)
+
+    # первая пачка отдаётся до чтения всех строк
+    assert next(result) == expected[0]
+    assert list(rows)
+    assert list(unit_registry.aggregate(ROWS)) == expected
+
+
+def test_aliases_share_conversions():
+    registry = UnitRegistry(UNIT_CONVERSIONS, UNIT_ALIASES)
+    assert registry.get('Столовая  ложка') == registry.get('ст. л.')
+    assert registry.get('пучок') == ('пучок', 1)
+    assert list(registry.aggregate([])) == []
+
+
+def test_shopping_list_merges_units(user, user_client):
+    grams = Ingredient.objects.create(name='мука', measurement_unit='г')
+    kilograms = Ingredient.objects.create(name='мука', measurement_unit='кг')
+    ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(user=user, ingredient=grams, total_amount=500),
+        ShoppingListItem(user=user, ingredient=kilograms, total_amount=2),
+    ])
+
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/', {'format': 'json'}
+    )
+
+    assert json.loads(b''.join(response.streaming_content)) == [
+        {'name': 'мука', 'measurement_unit': 'г', 'amount': 2500},
+    ]
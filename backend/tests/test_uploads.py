@@ -0,0 +1,114 @@
+import json
+from base64 import b64decode
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import LimitedTemporaryFileUploadHandler, MultiPartJSONParser
+from core.storage import is_content_name
+from recipes.models import Recipe
+from tests.conftest import IMAGE
+
+pytestmark = pytest.mark.django_db
+
+
+def image_file():
+    return SimpleUploadedFile(
+        'image.png', b64decode(IMAGE.split(',')[1]), content_type='image/png'
+    )
+
+
+def multipart_data(tags, ingredients, /, **fields):
+    return {
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+        'image': image_file(),
+        'tags': json.dumps([tag.id for tag in tags[:2]]),
+        'ingredients': json.dumps([
+            {'id': ingredient.id, 'amount': 3}
+            for ingredient in ingredients[:2]
+        ]),
+        **fields,
+    }
+
+
+def test_parser_streams_files_to_disk_and_decodes_json():
+    request = Request(
+        APIRequestFactory().post(
+            '/', {'image': image_file(), 'tags': '[1, 2]', 'name': '[1]'},
+            format='multipart',
+        ),
+        parsers=[MultiPartJSONParser()],
+        parser_context={
+            'view': SimpleNamespace(multipart_json_fields=('tags',)),
+        },
+    )
+    assert isinstance(request.data['image'], TemporaryUploadedFile)
+    assert request.data['tags'] == [1, 2]
+    assert request.data['name'] == '[1]'
+
+
+def test_create_and_update_with_multipart(tags, ingredients, author_client):
+    response = author_client.post(
+        '/api/recipes/', multipart_data(tags, ingredients), format='multipart'
+    )
+    assert response.status_code == HTTPStatus.CREATED, response.data
+    recipe = Recipe.objects.get(pk=response.data['id'])
+    assert is_content_name(recipe.image.name)
+    assert recipe.get_ingredient_amounts() == {
+        ingredient.id: 3 for ingredient in ingredients[:2]
+    }
+
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        multipart_data(tags[1:], ingredients[1:], name='Новое название'),
+        format='multipart',
+    )
+    assert response.status_code == HTTPStatus.OK, response.data
+    assert response.data['name'] == 'Новое название'
+    assert [tag['id'] for tag in response.data['tags']] == [
+        tag.id for tag in tags[1:3]
+    ]
+
+
+def test_invalid_json_field(tags, ingredients, author_client):
+    response = author_client.post(
+        '/api/recipes/',
+        multipart_data(tags, ingredients, ingredients='[{'),
+        format='multipart',
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_large_request_is_rejected_before_parsing(
+    tags, ingredients, author_client, monkeypatch
+):
+    monkeypatch.setattr(LimitedTemporaryFileUploadHandler, 'max_size', 100)
+    response = author_client.post(
+        '/api/recipes/', multipart_data(tags, ingredients), format='multipart'
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.parametrize('format', ('multipart', 'json'))
+def test_image_pixels_are_limited(format, tags, ingredients, author_client,
+                                  monkeypatch):
+    monkeypatch.setattr('api.fields.MAX_IMAGE_PIXELS', 0)
+    data = multipart_data(tags, ingredients)
+    if format == 'json':
+        data = {
+            **data,
+            'image': IMAGE,
+            'tags': json.loads(data['tags']),
+            'ingredients': json.loads(data['ingredients']),
+        }
+    response = author_client.post('/api/recipes/', data, format=format)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'пикселей' in str(response.data['image'])